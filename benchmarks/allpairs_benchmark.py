@@ -0,0 +1,71 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Size and generation time of the covering arrays of allpairs-random:
+# allpairspy (pairs only, when installed) against the in-tree IPOG
+# generator at strengths 2 and 3, and the IPOG generator on models whose
+# rules constrain the values.
+# Run from the repository root: python -m benchmarks.allpairs_benchmark
+
+from __future__ import print_function
+
+import time
+
+from src.robomachine import parsing
+from src.robomachine.allpairsstrategy import covering_array, _RuleConstraints
+from .models import machine_text
+
+try:
+    from allpairspy import AllPairs
+except ImportError:
+    AllPairs = None
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def allpairspy_rows(domains):
+    return list(AllPairs(domains))
+
+
+def ipog_rows(variables, rules, strength):
+    constraints = _RuleConstraints(variables, rules)
+    rows = covering_array([len(variable.values) for variable in variables], strength, constraints)
+    return [constraints.complete(row) for row in rows]
+
+
+def main():
+    print('{:>5s} {:>6s} {:>6s} {:>14s} {:>14s} {:>14s}'.format(
+        'vars', 'values', 'rules', 'allpairspy', 'ipog t=2', 'ipog t=3'))
+    for variables, values, rules in ((10, 3, 0), (10, 5, 0), (20, 3, 0), (20, 5, 0), (30, 3, 0), (30, 5, 0),
+                                     (10, 5, 10), (20, 4, 20), (30, 3, 30)):
+        machine = parsing.parse(machine_text(2, variables=variables, values=values, rules=rules), parsing.FAST)
+        machine_variables = list(machine.variables)
+        if AllPairs and not rules:
+            rows, elapsed = timed(allpairspy_rows, [variable.values for variable in machine_variables])
+            reference = '{:5d} {:7.3f}s'.format(len(rows), elapsed)
+        else:
+            reference = 'n/a'
+        results = []
+        for strength in (2, 3):
+            rows, elapsed = timed(ipog_rows, machine_variables, machine.rules, strength)
+            results.append('{:5d} {:7.3f}s'.format(len(rows), elapsed))
+        print('{:5d} {:6d} {:6d} {:>14s} {:>14s} {:>14s}'.format(variables, values, rules, reference, *results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Time to enumerate the valid variable assignments of a machine: filtering
+# the full product, backtracking in machine order and in pruning order, and
+# filtering the product with NumPy. The last models are heavily constrained
+# (over 99% of the product is invalid).
+# Run from the repository root: python -m benchmarks.assignment_benchmark
+
+from __future__ import print_function
+
+import itertools
+
+from src.robomachine import parsing
+from src.robomachine.assignments import AssignmentSearch
+from src.robomachine.compiledmachine import CompiledMachine
+from src.robomachine.vectorrules import VectorizedRules
+from .models import machine_text, best_of
+
+
+def filtered(rules_are_ok, variables):
+    return sum(1 for values in itertools.product(*[v.values for v in variables]) if rules_are_ok(values))
+
+
+def enumerated(assignments):
+    return sum(1 for _ in assignments)
+
+
+def main():
+    print('{:>5s} {:>6s} {:>6s} {:>9s} {:>7s} {:>9s} {:>9s} {:>9s} {:>9s}'.format(
+        'vars', 'values', 'rules', 'product', 'valid', 'filter s', 'ordered s', 'pruning s', 'numpy s'))
+    for variables, values, rules in ((6, 6, 4), (8, 5, 6), (8, 6, 8), (8, 6, 16), (10, 5, 20), (10, 6, 30)):
+        machine = parsing.parse(machine_text(2, variables=variables, values=values, rules=rules), parsing.FAST)
+        rules_are_ok = CompiledMachine(machine).rules_are_ok
+        product = values ** variables
+        valid = AssignmentSearch(machine.variables, machine.rules).count()
+        slow = '{:9.3f}'.format(best_of(1, filtered, rules_are_ok, machine.variables)) \
+            if product <= 2000000 else 'skipped'
+        ordered = best_of(3, enumerated, AssignmentSearch(machine.variables, machine.rules))
+        pruning = best_of(3, enumerated, AssignmentSearch(machine.variables, machine.rules, ordered=False))
+        vectorized_rules = VectorizedRules.create(machine.variables, machine.rules, min_product=1)
+        fast = '{:9.3f}'.format(best_of(1, enumerated, vectorized_rules.valid_assignments())) \
+            if vectorized_rules else 'n/a'
+        print('{:5d} {:6d} {:6d} {:9d} {:7d} {:>9s} {:9.3f} {:9.3f} {:>9s}'.format(
+            variables, values, rules, product, valid, slow, ordered, pruning, fast))
+
+
+if __name__ == '__main__':
+    main()
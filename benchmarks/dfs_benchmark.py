@@ -0,0 +1,51 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Cost of depth first path enumeration as a function of the maximum number
+# of actions, on atest/infinite.robomachine (every state reaches all states).
+# Run from the repository root: python -m benchmarks.dfs_benchmark
+
+from __future__ import print_function
+
+import itertools
+import os
+
+from src.robomachine import parsing
+from src.robomachine.strategies import DepthFirstSearchStrategy
+from .models import best_of
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATHS = 5000
+
+
+def enumerate_paths(machine, max_actions):
+    return sum(1 for _ in itertools.islice(DepthFirstSearchStrategy(machine, max_actions).paths(), PATHS))
+
+
+def main():
+    with open(os.path.join(_ROOT, 'atest', 'infinite.robomachine')) as model:
+        machine = parsing.parse(model.read(), parsing.FAST)
+    print('{:>8s} {:>10s} {:>12s}'.format('actions', 'us/path', 'us/action'))
+    for max_actions in (10, 50, 100, 400, 2000):
+        try:
+            elapsed = best_of(3, enumerate_paths, machine, max_actions)
+        except RecursionError:
+            print('{:8d} {:>10s}'.format(max_actions, 'recursion limit'))
+            continue
+        print('{:8d} {:10.2f} {:12.3f}'.format(
+            max_actions, elapsed / PATHS * 1e6, elapsed / PATHS / max_actions * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Guard evaluations and time of random walks and depth first search with
+# the per assignment table of enabled actions and with the guards evaluated
+# at every step. Run from the repository root:
+# python -m benchmarks.enabled_benchmark
+
+from __future__ import print_function
+
+import itertools
+import random
+
+from src.robomachine import parsing
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy
+from .models import best_of, machine_text
+
+TESTS = 2000
+
+
+class _PerStep(object):
+    # Stands in for a table: evaluates the guards on every lookup
+
+    def __init__(self, compiled, values):
+        self._compiled = compiled
+        self._values = values
+
+    def __getitem__(self, state):
+        return self._compiled.enabled(state, self._values)
+
+
+def run(machine, strategy_class, max_actions, per_step):
+    random.seed(0)
+    strategy = strategy_class(machine, max_actions)
+    compiled = strategy.compiled
+    if per_step:
+        compiled.enabled_table = lambda values: _PerStep(compiled, values)
+    for _ in itertools.islice(strategy.paths(), TESTS):
+        pass
+    return compiled.guard_evaluations
+
+
+def main():
+    machine = parsing.parse(machine_text(50, variables=3, values=4, actions=4), parsing.FAST)
+    print('{:>8s} {:>9s} {:>14s} {:>10s}'.format('strategy', 'mode', 'guard evals', 'ms'))
+    for strategy_class, max_actions in ((RandomStrategy, 20), (DepthFirstSearchStrategy, 6)):
+        for per_step in (True, False):
+            evaluations = run(machine, strategy_class, max_actions, per_step)
+            elapsed = best_of(3, run, machine, strategy_class, max_actions, per_step)
+            print('{:>8s} {:>9s} {:14d} {:10.1f}'.format(
+                'random' if strategy_class is RandomStrategy else 'dfs',
+                'per step' if per_step else 'table', evaluations, elapsed * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Test generation throughput and peak memory of the strategies.
+# Run from the repository root: python -m benchmarks.generation_benchmark
+
+from __future__ import print_function
+
+import contextlib
+import io
+import os
+import random
+import time
+import tracemalloc
+
+from src.robomachine import parsing
+from src.robomachine.generator import Generator
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy
+from .models import machine_text
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _NullOutput(object):
+
+    def write(self, text):
+        pass
+
+
+def run(machine, strategy, max_tests, max_actions):
+    random.seed(0)
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        Generator().generate(machine, max_tests=max_tests, max_actions=max_actions,
+                             output=_NullOutput(), strategy=strategy)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    with open(os.path.join(_ROOT, 'atest', 'infinite.robomachine')) as model:
+        infinite = parsing.parse(model.read(), parsing.FAST)
+    guarded = parsing.parse(machine_text(200, variables=4, values=4, rules=4, actions=4), parsing.FAST)
+    cases = [('infinite dfs', infinite, DepthFirstSearchStrategy, 100000, 6),
+             ('infinite random', infinite, RandomStrategy, 20000, 30),
+             ('guarded dfs', guarded, DepthFirstSearchStrategy, 100000, 8),
+             ('guarded random', guarded, RandomStrategy, 20000, 30)]
+    print('{:>16s} {:>8s} {:>8s} {:>10s} {:>10s}'.format('case', 'tests', 'actions', 'us/test', 'peak MB'))
+    for name, machine, strategy, max_tests, max_actions in cases:
+        elapsed, peak = run(machine, strategy, max_tests, max_actions)
+        print('{:>16s} {:8d} {:8d} {:10.2f} {:10.1f}'.format(
+            name, max_tests, max_actions, elapsed / max_tests * 1e6, peak / 1e6))
+
+
+if __name__ == '__main__':
+    main()
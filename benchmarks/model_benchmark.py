@@ -0,0 +1,54 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Cost of building a machine and of a single step of a walk through it as a
+# function of the number of states.
+# Run from the repository root: python -m benchmarks.model_benchmark
+
+from __future__ import print_function
+
+import random
+
+from src.robomachine.model import RoboMachine, State, Action
+from .models import best_of
+
+STEPS = 20000
+
+
+def build(states, actions=3, seed=0):
+    rnd = random.Random(seed)
+    return RoboMachine([State('State {:d}'.format(i), [],
+                              [Action('Action {:d}'.format(a), 'State {:d}'.format(rnd.randrange(states)))
+                               for a in range(actions)])
+                        for i in range(states)], [], [])
+
+
+def walk(machine, steps, seed=0):
+    rnd = random.Random(seed)
+    state = machine.start_state
+    for _ in range(steps):
+        state = rnd.choice(state.actions).next_state
+
+
+def main():
+    print('{:>7s} {:>10s} {:>10s}'.format('states', 'build s', 'us/step'))
+    for states in (10, 100, 1000, 5000):
+        build_time = best_of(3, build, states)
+        machine = build(states)
+        walk_time = best_of(3, walk, machine, STEPS)
+        print('{:7d} {:10.4f} {:10.2f}'.format(states, build_time, walk_time / STEPS * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Synthetic machine files for the benchmarks.
+
+from __future__ import print_function
+
+import random
+import time
+
+
+def machine_text(states, variables=0, values=5, rules=0, actions=3, seed=0):
+    rnd = random.Random(seed)
+    names = ['${{V{:d}}}'.format(i) for i in range(variables)]
+    lines = ['*** Machine ***']
+    for name in names:
+        lines.append('{:s}  any of  {:s}'.format(name, '  '.join('v{:d}'.format(v) for v in range(values))))
+    lines.append('')
+    for _ in range(rules if names else 0):
+        lines.append('{:s}  ==>  {:s}'.format(_condition(rnd, names, values), _condition(rnd, names, values)))
+    lines.append('')
+    for i in range(states):
+        lines.append('State {:d}'.format(i))
+        lines.append('  Log  In state {:d}'.format(i))
+        lines.append('  [Actions]')
+        for a in range(actions):
+            guard = ''
+            if names and rnd.random() < 0.3:
+                guard = '  when  ' + _condition(rnd, names, values)
+            lines.append('    Action {:d}  ==>  State {:d}{:s}'.format(a, rnd.randrange(states), guard))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def _condition(rnd, names, values):
+    return '{:s} {:s} v{:d}'.format(rnd.choice(names), rnd.choice(['==', '!=']), rnd.randrange(values))
+
+
+def best_of(repeat, function, *args, **kwargs):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
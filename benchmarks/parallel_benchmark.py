@@ -0,0 +1,53 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Depth first generation time with 1..N worker processes.
+# Run from the repository root: python -m benchmarks.parallel_benchmark
+
+from __future__ import print_function
+
+import contextlib
+import io
+import multiprocessing
+import os
+
+from src.robomachine import parsing
+from src.robomachine.generator import Generator
+from .generation_benchmark import _NullOutput
+from .models import machine_text, best_of
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def generate(machine, max_tests, max_actions, jobs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        Generator().generate(machine, max_tests=max_tests, max_actions=max_actions,
+                             output=_NullOutput(), jobs=jobs)
+
+
+def main():
+    with open(os.path.join(_ROOT, 'atest', 'infinite.robomachine')) as model:
+        infinite = parsing.parse(model.read(), parsing.FAST)
+    guarded = parsing.parse(machine_text(200, variables=4, values=4, rules=4, actions=4), parsing.FAST)
+    cases = [('infinite', infinite, 200000, 5), ('guarded', guarded, 200000, 8)]
+    jobs = [1, 2, 4, multiprocessing.cpu_count()]
+    print('{:>10s} {:>8s} {:>8s}'.format('case', 'jobs', 'seconds'))
+    for name, machine, max_tests, max_actions in cases:
+        for count in sorted(set(jobs)):
+            elapsed = best_of(1, generate, machine, max_tests, max_actions, count)
+            print('{:>10s} {:8d} {:8.2f}'.format(name, count, elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Parse time of both parser engines as a function of model size.
+# Run from the repository root: python -m benchmarks.parsing_benchmark
+
+from __future__ import print_function
+
+from src.robomachine import parsing
+from .models import machine_text, best_of
+
+
+def main():
+    print('{:>7s} {:>7s} {:>12s} {:>12s} {:>14s} {:>8s}'.format(
+        'states', 'lines', 'pyparsing s', 'fast s', 'fast us/line', 'speedup'))
+    for states in (25, 50, 100, 200, 400, 800):
+        text = machine_text(states, variables=8, values=6, rules=states // 10, actions=4)
+        lines = text.count('\n') + 1
+        slow = best_of(3, parsing.parse, text, parsing.PYPARSING)
+        fast = best_of(3, parsing.parse, text, parsing.FAST)
+        print('{:7d} {:7d} {:12.4f} {:12.4f} {:14.2f} {:7.1f}x'.format(
+            states, lines, slow, fast, fast / lines * 1e6, slow / fast))
+
+
+if __name__ == '__main__':
+    main()
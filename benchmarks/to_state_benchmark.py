@@ -0,0 +1,63 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Time to generate tests ending in a given state when most of the machine
+# can not reach it: a corridor of states leads to the target and every
+# corridor state also has actions into a trap of states without a way out.
+# Run from the repository root: python -m benchmarks.to_state_benchmark
+
+from __future__ import print_function
+
+import itertools
+import random
+
+from src.robomachine.model import RoboMachine, State, Action
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy
+from .models import best_of
+
+TESTS = 200
+
+
+def corridor(length, trap_states=20, trap_actions=3):
+    states = []
+    for i in range(length):
+        actions = [Action('Forward', 'Corridor {:d}'.format(i + 1))]
+        actions += [Action('Trap {:d}'.format(t), 'Trap {:d}'.format(t)) for t in range(trap_actions)]
+        actions += [Action('Back', 'Corridor {:d}'.format(max(i - 1, 0)))]
+        states.append(State('Corridor {:d}'.format(i), [], actions))
+    states.append(State('Corridor {:d}'.format(length), [], [Action('Back', 'Corridor {:d}'.format(length - 1))]))
+    rnd = random.Random(0)
+    for t in range(trap_states):
+        states.append(State('Trap {:d}'.format(t), [],
+                            [Action('Step {:d}'.format(a), 'Trap {:d}'.format(rnd.randrange(trap_states)))
+                             for a in range(trap_actions)]))
+    return RoboMachine(states, [], []), 'Corridor {:d}'.format(length)
+
+
+def generate(strategy, machine, max_actions, to_state):
+    random.seed(0)
+    return sum(1 for _ in itertools.islice(strategy(machine, max_actions, to_state).paths(), TESTS))
+
+
+def main():
+    print('{:>8s} {:>8s} {:>10s} {:>10s}'.format('corridor', 'actions', 'dfs s', 'random s'))
+    for length, max_actions in ((4, 8), (6, 10), (8, 12)):
+        machine, to_state = corridor(length)
+        dfs = best_of(1, generate, DepthFirstSearchStrategy, machine, max_actions, to_state)
+        walk = best_of(1, generate, RandomStrategy, machine, max_actions, to_state)
+        print('{:8d} {:8d} {:10.3f} {:10.3f}'.format(length, max_actions, dfs, walk))
+
+
+if __name__ == '__main__':
+    main()
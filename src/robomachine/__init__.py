@@ -19,13 +19,28 @@ except:
 
 __version__ = "0.10.0"
 from .parsing import parse
+from .cache import MachineCache
 
 from .generator import Generator, DepthFirstSearchStrategy
+from .duplicates import ExactFilter, BloomFilter
+from .decisiondiagram import ModelAnalysis
 
 def generate(machine, max_tests=1000, max_actions=None, to_state=None, output=None,
-    strategy=DepthFirstSearchStrategy):
+    strategy=DepthFirstSearchStrategy, jobs=1, shard=None, duplicate_filter=ExactFilter):
     generator = Generator()
-    return generator.generate(machine, max_tests, max_actions, to_state, output, strategy)
+    return generator.generate(machine, max_tests, max_actions, to_state, output, strategy, jobs, shard,
+                              duplicate_filter)
+
+def count_tests(machine, max_actions=None, to_state=None, representatives=None):
+    # Number of different depth first search tests by their number of
+    # actions, counted without generating them
+    max_actions = -1 if max_actions is None else max_actions
+    return DepthFirstSearchStrategy(machine, max_actions, to_state, representatives).length_counts()
+
+def analyze(machine):
+    # Valid assignment count, rule impacts and guard satisfiability from a
+    # decision diagram of the rules
+    return ModelAnalysis(machine)
 
 def transform(text):
     output = StringIO()
@@ -12,27 +12,335 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
-from allpairspy import AllPairs
+import hashlib
+import itertools
+import random
+import re
+
+from .assignments import AssignmentSearch
+from .equivalence import ValuePartition
 from .strategies import RandomStrategy
 
 
+def covering_array(sizes, strength, constraints=None):
+    # IPOG (in-parameter-order) covering array. Rows hold one value index
+    # per variable (None where any value will do) and together contain
+    # every combination of values of every strength variables that the
+    # constraints allow. The first strength variables start as their full
+    # product, then each further variable is added as a column (horizontal
+    # growth) and the combinations the column leaves uncovered get rows of
+    # their own or fill free cells of earlier rows (vertical growth).
+    constraints = constraints or _NoConstraints()
+    count = len(sizes)
+    strength = min(strength, count)
+    if not constraints.allows([None] * count):
+        return []
+    rows = []
+    for values in itertools.product(*[range(size) for size in sizes[:strength]]):
+        row = list(values) + [None] * (count - strength)
+        if constraints.allows(row):
+            rows.append(row)
+    for position in range(strength, count):
+        uncovered = _uncovered(sizes, strength, position, constraints)
+        _grow_horizontally(rows, sizes, position, uncovered, constraints)
+        _grow_vertically(rows, sizes, position, uncovered, constraints)
+    return rows
+
+
+def _uncovered(sizes, strength, position, constraints):
+    # Allowed value combinations of position and each strength - 1 earlier
+    # variables, by those variables. A combination is coded as a mixed
+    # radix number with the value of position as its last digit.
+    uncovered = {}
+    for combination in itertools.combinations(range(position), strength - 1):
+        positions = combination + (position,)
+        total = 1
+        for p in positions:
+            total *= sizes[p]
+        if not constraints.constrains(positions):
+            uncovered[combination] = set(range(total))
+            continue
+        codes = uncovered[combination] = set()
+        row = [None] * len(sizes)
+        for code, values in enumerate(itertools.product(*[range(sizes[p]) for p in positions])):
+            for p, value in zip(positions, values):
+                row[p] = value
+            if constraints.allows(row):
+                codes.add(code)
+    return uncovered
+
+
+def _grow_horizontally(rows, sizes, position, uncovered, constraints):
+    # Each row gets the value of position that covers most uncovered
+    # combinations. A row that would cover none is left free there.
+    size = sizes[position]
+    constrained = constraints.constrains((position,))
+    for row in rows:
+        targets = []
+        for combination, codes in uncovered.items():
+            if not codes:
+                continue
+            prefix = 0
+            for p in combination:
+                if row[p] is None:
+                    break
+                prefix = prefix * sizes[p] + row[p]
+            else:
+                targets.append((codes, prefix * size))
+        best, best_gain = None, 0
+        for value in range(size):
+            row[position] = value
+            if constrained and not constraints.allows(row):
+                continue
+            gain = sum(1 for codes, base in targets if base + value in codes)
+            if gain > best_gain:
+                best, best_gain = value, gain
+        row[position] = best
+        if best is not None:
+            for codes, base in targets:
+                codes.discard(base + best)
+
+
+def _grow_vertically(rows, sizes, position, uncovered, constraints):
+    for combination, codes in uncovered.items():
+        positions = combination + (position,)
+        for code in sorted(codes):
+            values = _decoded(code, [sizes[p] for p in positions])
+            if not any(all(row[p] == value for p, value in zip(positions, values)) for row in rows):
+                _place(rows, len(sizes), positions, values, constraints)
+
+
+def _place(rows, count, positions, values, constraints):
+    # Into the first row that is free or equal on positions and stays
+    # allowed, otherwise into a new row
+    for row in rows:
+        if not all(row[p] is None or row[p] == value for p, value in zip(positions, values)):
+            continue
+        free = [p for p in positions if row[p] is None]
+        for p, value in zip(positions, values):
+            row[p] = value
+        if constraints.allows(row):
+            return
+        for p in free:
+            row[p] = None
+    row = [None] * count
+    for p, value in zip(positions, values):
+        row[p] = value
+    rows.append(row)
+
+
+def _decoded(code, sizes):
+    values = []
+    for size in reversed(sizes):
+        code, value = divmod(code, size)
+        values.append(value)
+    return values[::-1]
+
+
+class _NoConstraints(object):
+
+    def constrains(self, positions):
+        return False
+
+    def allows(self, row):
+        return True
+
+
+class _RuleConstraints(object):
+    # The machine rules as constraints of a covering array: a row of value
+    # indexes is allowed when some assignment satisfying the rules agrees
+    # with it. Only the variables the rules refer to matter, so the
+    # answers are remembered by their values.
+
+    def __init__(self, variables, rules):
+        self._variables = variables
+        self._search = AssignmentSearch(variables, rules, ordered=False)
+        constrained = self._search.constrained
+        self._positions = sorted(range(len(variables)) if constrained is None else constrained)
+        self._constrained = set(self._positions)
+        self._completions = {}
+        self._last = None
+
+    def constrains(self, positions):
+        return not self._constrained.isdisjoint(positions)
+
+    def allows(self, row):
+        return self._completion(row) is not None
+
+    def complete(self, row, rng=random):
+        # Variable values of a row. Free cells take values drawn from rng,
+        # those of constrained variables one at a time among the values that
+        # some assignment satisfying the rules still agrees with.
+        values = [rng.choice(variable.values) if index is None else variable.values[index]
+                  for variable, index in zip(self._variables, row)]
+        if not self._positions:
+            return values
+        fixed = [None] * len(self._variables)
+        for p in self._positions:
+            fixed[p] = values[p]
+        assignment = self._search.completion(fixed)
+        if assignment is None:
+            free = [p for p in self._positions if row[p] is None]
+            rng.shuffle(free)
+            for p in free:
+                fixed[p] = None
+            for p in free:
+                for value in rng.sample(self._variables[p].values, len(self._variables[p].values)):
+                    fixed[p] = value
+                    assignment = self._search.completion(fixed)
+                    if assignment is not None:
+                        break
+        for p in self._positions:
+            values[p] = assignment[p]
+        return values
+
+    def _completion(self, row):
+        # Rows mostly differ from an earlier one in a value or two, so an
+        # earlier completion often still agrees and saves a search
+        key = tuple(row[p] for p in self._positions)
+        if key not in self._completions:
+            fixed = [None if index is None else self._variables[p].values[index]
+                     for p, index in zip(self._positions, key)]
+            if self._last is not None and all(f is None or f == value for f, value in zip(fixed, self._last)):
+                self._completions[key] = self._last
+            else:
+                everything = [None] * len(self._variables)
+                for p, value in zip(self._positions, fixed):
+                    everything[p] = value
+                assignment = self._search.completion(everything)
+                self._completions[key] = None if assignment is None else [assignment[p] for p in self._positions]
+                if assignment is not None:
+                    self._last = self._completions[key]
+        return self._completions[key]
+
+
+class _RuleSignature(object):
+    # Same interface as rules.RuleCompiler; compiles a rule into text that
+    # names variables by position and their values by index. Rules that
+    # allow the same value indexes of the same positions get the same text
+    # whatever the values are. None when the rule can not be analysed.
+
+    def __init__(self, variables):
+        self._positions = dict((variable.name, position) for position, variable in enumerate(variables))
+        self._domains = [[value.strip() for value in variable.values] for variable in variables]
+
+    def signature(self, rules):
+        # Rules only constrain together, so their order does not matter
+        signatures = [self.compile_rule(rule) for rule in rules]
+        if None in signatures:
+            return None
+        return hashlib.sha256('\n'.join(sorted(signatures)).encode('utf-8')).hexdigest()
+
+    def compile_rule(self, rule):
+        if not hasattr(rule, 'compile'):
+            return None
+        return rule.compile(self)
+
+    def comparison(self, name, compare, constant):
+        return self._matching(name, lambda value: compare(value, constant))
+
+    def regex(self, name, pattern, negated):
+        try:
+            search = re.compile(pattern.strip()).search
+        except re.error:
+            return None
+        return self._matching(name, lambda value: (search(value) is None) == negated)
+
+    def negation(self, signature):
+        return None if signature is None else '!' + signature
+
+    def equivalence(self, first, second):
+        return self._operation('=', [first, second])
+
+    def all_of(self, operands):
+        return self._operation('&', operands)
+
+    def any_of(self, operands):
+        return self._operation('|', operands)
+
+    @staticmethod
+    def _operation(operator, operands):
+        if None in operands:
+            return None
+        return '{:s}({:s})'.format(operator, ' '.join(operands))
+
+    def _matching(self, name, test):
+        # Position and the indexes of the values the test accepts
+        position = self._positions.get(name)
+        if position is None:
+            return None
+        return '{:d}[{:s}]'.format(position, ','.join(str(index) for index, value in enumerate(self._domains[position])
+                                                      if test(value)))
+
+
+def cached_covering_array(variables, rules, strength, constraints, cache=None):
+    # covering_array for the variables, taken from and stored to cache
+    # when the rules can be analysed
+    sizes = [len(variable.values) for variable in variables]
+    signature = _RuleSignature(variables).signature(rules) if cache else None
+    if signature is not None:
+        rows = cache.get(sizes, strength, signature)
+        if rows is not None:
+            return rows
+    rows = covering_array(sizes, strength, constraints)
+    if signature is not None:
+        cache.put(sizes, strength, signature, rows)
+    return rows
+
+
 class AllPairsRandomStrategy(RandomStrategy):
+    # Variable values from a covering array of the given strength (2 for
+    # all pairs), one random test per row. Arrays are reused from cache, a
+    # cache.CoveringArrayCache, when given. With representatives
+    # (equivalence.FIRST or ROTATE) the array covers classes of equivalent
+    # values instead of the values.
+    STRENGTHS = (2, 3, 4)
 
-    def __init__(self, machine, max_actions, to_state=None):
-        if machine.rules:
-            raise AssertionError('ERROR! AllPairs does not work correctly with rules')
-        RandomStrategy.__init__(self, machine, max_actions, to_state)
+    def __init__(self, machine, max_actions, to_state=None, unique=False, strength=2, cache=None,
+                 representatives=None):
+        if strength not in self.STRENGTHS:
+            raise AssertionError('ERROR! Covering array strength must be 2, 3 or 4, got {:d}'.format(strength))
+        RandomStrategy.__init__(self, machine, max_actions, to_state, unique)
+        self._strength = strength
+        self._cache = cache
+        self._representatives = representatives
+        self.partition = ValuePartition(machine) if representatives else None
 
-    def tests(self):
+    def paths(self):
+        if not self._unique:
+            for _, path, values in self.draws(itertools.count()):
+                if path is not None:
+                    yield path, values
+            return
         for values in self._generate_all_pairs_variable_values():
-            test = self._generate_test(values)
-            if not test and self._to_state and self._to_state != self._machine.start_state.name:
-                continue
-            yield test, [v.current_value for v in self._machine.variables]
-
-    def _generate_all_pairs_variable_values(self):
-        if len(list(self._machine.variables)) < 2:
-            for var in self._machine.variables:
-                return [v for v in var.values]
-            return [[]]
-        return AllPairs([v.values for v in self._machine.variables])
+            # Rows resolving to the same values get different paths
+            path = self._generate_unique_path(values)
+            if path is not None:
+                yield path, self._current_values()
+
+    def draws(self, indexes):
+        # Draw n walks the assignment of row n, path is None when the walk
+        # cannot end in the to state. Every draw needs the whole array, so
+        # all rows are completed from one substream and only the walks have
+        # substreams of their own.
+        seed = random.getrandbits(64)
+        assignments = self._generate_all_pairs_variable_values(self._substream(seed, -1))
+        for index in indexes:
+            if index >= len(assignments):
+                return
+            self._random = self._substream(seed, index)
+            path = self._generate_path(assignments[index])
+            if not path and self._to_state and self._to_state != self._machine.start_state.name:
+                path = None
+            yield index, path, self._current_values()
+
+    def _generate_all_pairs_variable_values(self, rng=random):
+        variables = list(self._machine.variables if self.partition is None else self.partition.variables)
+        constraints = _RuleConstraints(variables, self._machine.rules)
+        rows = cached_covering_array(variables, self._machine.rules, self._strength, constraints, self._cache)
+        if not rows:
+            raise AssertionError('ERROR! No variable values satisfy the rules')
+        assignments = [constraints.complete(row, rng) for row in rows]
+        if self.partition is None:
+            return assignments
+        return list(self.partition.assignments(assignments, self._representatives))
@@ -0,0 +1,184 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+
+from .rules import RuleCompiler
+
+
+class AssignmentSearch(object):
+    # Backtracking search for the variable assignments that satisfy all
+    # rules. Variables are bound one at a time in search order and each rule
+    # is checked as soon as the last variable it refers to is bound, so a
+    # partial assignment that breaks a rule is never extended.
+    #
+    # With ordered=True the variables are bound in machine order and the
+    # assignments come out in the same order as from the full product. With
+    # ordered=False the search order is chosen to check rules as early as
+    # possible, and the order of the results follows it.
+
+    def __init__(self, variables, rules, ordered=True):
+        self._variables = list(variables)
+        self._positions = dict((variable.name, position) for position, variable in enumerate(self._variables))
+        references = [self._referenced_positions(rule) for rule in rules]
+        if None in references:
+            # Keep generate-and-filter semantics (rules checked in order on
+            # complete assignments) when some rule can not be analysed
+            references = [None] * len(references)
+        # Positions of the variables the rules refer to, None when that is
+        # not known
+        self.constrained = None if None in references else frozenset().union(*references)
+        compiler = RuleCompiler(self._variables)
+        predicates = [compiler.compile(rule) for rule in rules]
+        rejections = [self._rejection(positions, predicate) if positions else 0.0
+                      for positions, predicate in zip(references, predicates)]
+        if ordered:
+            self.order = list(range(len(self._variables)))
+        else:
+            self.order = self._pruning_order(references, rejections)
+        self._rules = list(zip(predicates, references))
+        self._checks = self._checks_by_depth(self.order)
+        depth_of = dict((position, depth) for depth, position in enumerate(self.order))
+        self._pass_ratios = [1.0 for _ in self.order]
+        for positions, rejection in zip(references, rejections):
+            depth = max(depth_of[position] for position in positions) if positions else len(self.order) - 1
+            self._pass_ratios[depth] *= 1.0 - rejection
+
+    def _checks_by_depth(self, order):
+        # Each rule is checked at the depth where its last variable is bound
+        depth_of = dict((position, depth) for depth, position in enumerate(order))
+        checks = [[] for _ in order]
+        for predicate, positions in self._rules:
+            depth = max(depth_of[position] for position in positions) if positions else len(order) - 1
+            checks[depth].append(predicate)
+        return checks
+
+    def __iter__(self):
+        if not self._variables:
+            return iter(([],))
+        return self._search(0, [None] * len(self._variables), self.order, self._checks)
+
+    def completion(self, fixed):
+        # First valid assignment that agrees with the values of fixed (a
+        # list in machine order with None for free variables), None when
+        # there is none. The fixed variables are bound first so that a
+        # conflict between them is found without backtracking the others.
+        if not self._variables:
+            return []
+        order = [position for position in self.order if fixed[position] is not None] + \
+                [position for position in self.order if fixed[position] is None]
+        return next(self._search(0, [None] * len(self._variables), order, self._checks_by_depth(order), fixed),
+                    None)
+
+    def count(self):
+        return sum(1 for _ in self)
+
+    def estimated_nodes(self):
+        # Expected number of values tried, assuming independent rules
+        nodes, reached = 0.0, 1.0
+        for depth, position in enumerate(self.order):
+            reached *= len(self._variables[position].values)
+            nodes += reached
+            reached *= self._pass_ratios[depth]
+        return nodes
+
+    def _search(self, depth, values, order, checks_by_depth, fixed=None):
+        position = order[depth]
+        checks = checks_by_depth[depth]
+        last = depth == len(order) - 1
+        domain = self._variables[position].values
+        if fixed is not None and fixed[position] is not None:
+            domain = (fixed[position],)
+        for value in domain:
+            values[position] = value
+            if checks and not all(check(values) for check in checks):
+                continue
+            if last:
+                yield list(values)
+            else:
+                for assignment in self._search(depth + 1, values, order, checks_by_depth, fixed):
+                    yield assignment
+        values[position] = None
+
+    def _referenced_positions(self, rule):
+        # None when the rule can not tell (it is then checked last)
+        names = _ReferencedNames().compile_rule(rule)
+        if names is None or any(name not in self._positions for name in names):
+            return None
+        return frozenset(self._positions[name] for name in names)
+
+    def _pruning_order(self, references, rejections):
+        # Greedy: next bind the variable that brings the unfinished rules
+        # closest to completion, weighting a rule that misses k variables
+        # and rejects a fraction r of its own value combinations by r/k.
+        # Ties go to the variable with fewest values.
+        unbound = set(range(len(self._variables)))
+        pending = [(positions, rejection) for positions, rejection in zip(references, rejections) if positions]
+        order = []
+        while unbound:
+            def score(position):
+                closeness = sum(rejection / len(positions & unbound)
+                                for positions, rejection in pending if position in positions)
+                return (-closeness, len(self._variables[position].values), position)
+            best = min(unbound, key=score)
+            order.append(best)
+            unbound.remove(best)
+            pending = [(positions, rejection) for positions, rejection in pending if positions & unbound]
+        return order
+
+    def _rejection(self, positions, predicate, limit=4096):
+        positions = sorted(positions)
+        domains = [self._variables[position].values for position in positions]
+        combinations = 1
+        for domain in domains:
+            combinations *= len(domain)
+        if not combinations or combinations > limit:
+            return 0.5
+        values = [None] * len(self._variables)
+        rejected = 0
+        for combination in itertools.product(*domains):
+            for position, value in zip(positions, combination):
+                values[position] = value
+            if not predicate(values):
+                rejected += 1
+        return rejected / float(combinations)
+
+
+class _ReferencedNames(object):
+    # Same interface as rules.RuleCompiler; compiles a rule into the set of
+    # variable names it refers to
+
+    def compile_rule(self, rule):
+        if not hasattr(rule, 'compile'):
+            return None
+        return rule.compile(self)
+
+    def comparison(self, name, compare, constant):
+        return frozenset([name])
+
+    def regex(self, name, pattern, negated):
+        return frozenset([name])
+
+    def negation(self, names):
+        return names
+
+    def equivalence(self, first, second):
+        return self.all_of([first, second])
+
+    def all_of(self, operands):
+        if any(names is None for names in operands):
+            return None
+        return frozenset().union(*operands)
+
+    any_of = all_of
@@ -0,0 +1,173 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import os
+import pickle
+import tempfile
+from array import array
+
+from . import __version__
+
+
+class _PickleCache(object):
+    # Objects pickled to files of one suffix in directory, keyed by a text
+    # and the RoboMachine version. Least recently used files are removed when
+    # the files of the suffix grow over max_size bytes.
+    SUFFIX = None
+    DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+    # Changed whenever the pickled classes change
+    FORMAT = None
+
+    def __init__(self, directory=None, max_size=DEFAULT_MAX_SIZE, version=__version__):
+        self.directory = directory or default_cache_directory()
+        self.max_size = max_size
+        self._version = version
+
+    def key(self, text):
+        digest = hashlib.sha256()
+        digest.update(self._version.encode('utf-8'))
+        digest.update('\0{:d}\0'.format(self.FORMAT).encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load(self, text):
+        path = self._path(text)
+        try:
+            with open(path, 'rb') as data:
+                value = pickle.load(data)
+        except (IOError, OSError):
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return value
+
+    def _store(self, text, value):
+        path = self._path(text)
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        except OSError:
+            return False
+        try:
+            with os.fdopen(handle, 'wb') as data:
+                pickle.dump(value, data, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception:
+            self._remove(temp_path)
+            return False
+        self._evict(keep=path)
+        return True
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def _path(self, text):
+        return os.path.join(self.directory, self.key(text) + self.SUFFIX)
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(self.SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self, keep):
+        entries = sorted(self._entries(), key=lambda entry: entry[1])
+        total = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class MachineCache(_PickleCache):
+    # Parsed and linked machines keyed by the machine text and the parser
+    # engine that read it
+    SUFFIX = '.machine'
+    # Changed whenever the pickled model classes change
+    FORMAT = 3
+
+    def get(self, text, engine='pyparsing'):
+        return self._load(self._text(text, engine))
+
+    def put(self, text, machine, engine='pyparsing'):
+        return self._store(self._text(text, engine), machine)
+
+    @staticmethod
+    def _text(text, engine):
+        return '{:s}\0{:s}'.format(engine, text)
+
+
+class CoveringArrayCache(_PickleCache):
+    # Covering arrays of allpairs-random keyed by the domain sizes of the
+    # variables, the strength and a signature of the rules that does not
+    # depend on the value names. An array is kept as a flat integer matrix
+    # of value indexes, -1 where any value will do.
+    SUFFIX = '.array'
+    FORMAT = 1
+
+    def get(self, sizes, strength, rules_signature):
+        packed = self._load(self._text(sizes, strength, rules_signature))
+        if packed is None:
+            return None
+        typecode, count, data = packed
+        matrix = array(typecode)
+        matrix.frombytes(data)
+        columns = len(sizes)
+        return [[None if index < 0 else index for index in matrix[row * columns:(row + 1) * columns]]
+                for row in range(count)]
+
+    def put(self, sizes, strength, rules_signature, rows):
+        typecode = 'b' if max(sizes or [0]) <= 127 else 'h' if max(sizes) <= 32767 else 'i'
+        matrix = array(typecode, (-1 if index is None else index for row in rows for index in row))
+        return self._store(self._text(sizes, strength, rules_signature), (typecode, len(rows), matrix.tobytes()))
+
+    @staticmethod
+    def _text(sizes, strength, rules_signature):
+        return '{:s}\0{:d}\0{:s}'.format(','.join(str(size) for size in sizes), strength, rules_signature)
+
+
+def default_cache_directory():
+    if os.environ.get('ROBOMACHINE_CACHE_DIR'):
+        return os.environ['ROBOMACHINE_CACHE_DIR']
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'robomachine')
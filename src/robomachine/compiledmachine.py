@@ -0,0 +1,162 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from array import array
+from collections import deque
+
+from .rules import RuleCompiler
+
+
+class CompiledMachine(object):
+    # Integer indexed form of a RoboMachine for the strategies. States and
+    # actions are numbered in definition order. The actions of state s are
+    # offsets[s]..offsets[s+1]-1 (compressed sparse rows), targets[a] is the
+    # end state of action a, labels[a] numbers its name and guards[a] indexes
+    # its condition in conditions (NO_GUARD when it is always available).
+    # Rules and guards are compiled to predicates over a tuple of variable
+    # values in the order of machine.variables. guard_evaluations counts
+    # the guard predicate calls. The machine's dead actions are left out.
+    NO_GUARD = -1
+    START = 0
+    UNREACHABLE = 1 << 30
+    MAX_TABLES = 4096
+
+    def __init__(self, machine):
+        self.machine = machine
+        self.states = list(machine.states)
+        self.actions = []
+        self.conditions = []
+        self.offsets = array('i', [0])
+        self.targets = array('i')
+        self.labels = array('i')
+        self.guards = array('i')
+        state_indexes = dict((state, index) for index, state in enumerate(self.states))
+        label_indexes = {}
+        dead = machine.dead_actions
+        for state in self.states:
+            for action in state._actions:
+                if action in dead:
+                    continue
+                self.actions.append(action)
+                self.targets.append(state_indexes[action.next_state])
+                self.labels.append(label_indexes.setdefault(action.name, len(label_indexes)))
+                if action.condition and action.condition != 'otherwise':
+                    self.guards.append(len(self.conditions))
+                    self.conditions.append(action.condition)
+                else:
+                    self.guards.append(self.NO_GUARD)
+            self.offsets.append(len(self.actions))
+        self._static_actions = [self._unguarded_actions(state) for state in range(len(self.states))]
+        compiler = RuleCompiler(machine.variables)
+        self._rules = compiler.compile_all(machine.rules)
+        self.predicates = [compiler.compile(condition) for condition in self.conditions]
+        self.guard_evaluations = 0
+        self._tables = {}
+        self._tables_by_guards = {}
+
+    def state_indexes(self, name):
+        return frozenset(index for index, state in enumerate(self.states) if state.name == name)
+
+    def rules_are_ok(self, values):
+        return self._rules(values)
+
+    def enabled(self, state, values):
+        # Same selection as State.actions: available actions in definition
+        # order, only the first one of each name. values are the current
+        # (resolved) values of the variables.
+        static = self._static_actions[state]
+        if static is not None:
+            return static
+        predicates = self.predicates
+
+        def available(guard):
+            self.guard_evaluations += 1
+            return predicates[guard](values)
+        return self._select(state, available)
+
+    def enabled_table(self, values):
+        # The enabled actions of every state under values, computed once per
+        # assignment of values and shared by the assignments that give the
+        # guards the same results
+        key = tuple(values)
+        table = self._tables.get(key)
+        if table is None:
+            if len(self._tables) >= self.MAX_TABLES:
+                self._tables.clear()
+                self._tables_by_guards.clear()
+            guard_values = self.guard_values(values)
+            table = self._tables_by_guards.get(guard_values)
+            if table is None:
+                table = [self._select(state, guard_values.__getitem__) for state in range(len(self.states))]
+                self._tables_by_guards[guard_values] = table
+            self._tables[key] = table
+        return table
+
+    def guard_values(self, values):
+        self.guard_evaluations += len(self.predicates)
+        return tuple(predicate(values) for predicate in self.predicates)
+
+    def distances(self, targets, values):
+        # Fewest actions from each state to one of the target states using
+        # the actions enabled under values (UNREACHABLE when there is no way)
+        predecessors = [[] for _ in self.states]
+        table = self.enabled_table(values)
+        for state in range(len(self.states)):
+            for action in table[state]:
+                predecessors[self.targets[action]].append(state)
+        distances = array('i', [self.UNREACHABLE] * len(self.states))
+        queue = deque()
+        for target in targets:
+            distances[target] = 0
+            queue.append(target)
+        while queue:
+            state = queue.popleft()
+            for predecessor in predecessors[state]:
+                if distances[predecessor] == self.UNREACHABLE:
+                    distances[predecessor] = distances[state] + 1
+                    queue.append(predecessor)
+        return distances
+
+    def to_actions(self, path):
+        actions = self.actions
+        return [actions[index] for index in path]
+
+    def _select(self, state, available):
+        static = self._static_actions[state]
+        if static is not None:
+            return static
+        result = []
+        seen = set()
+        guards, labels = self.guards, self.labels
+        for action in range(self.offsets[state], self.offsets[state + 1]):
+            guard = guards[action]
+            if guard != self.NO_GUARD and not available(guard):
+                continue
+            if labels[action] in seen:
+                continue
+            seen.add(labels[action])
+            result.append(action)
+        return tuple(result)
+
+    def _unguarded_actions(self, state):
+        actions = range(self.offsets[state], self.offsets[state + 1])
+        if any(self.guards[action] != self.NO_GUARD for action in actions):
+            return None
+        result = []
+        seen = set()
+        for action in actions:
+            if self.labels[action] not in seen:
+                seen.add(self.labels[action])
+                result.append(action)
+        return tuple(result)
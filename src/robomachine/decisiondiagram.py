@@ -0,0 +1,297 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import operator
+import re
+from collections import deque
+
+from .assignments import _ReferencedNames
+from .model import Variable
+
+FALSE = 0
+TRUE = 1
+
+
+class DecisionDiagram(object):
+    # Reduced ordered multi-valued decision diagram, one level per variable
+    # in the given order (machine order by default). A node is an index
+    # into nodes; an inner node has a child for each value index of its
+    # variable. Nodes are shared, so equal functions are the same node.
+
+    def __init__(self, variables, order=None):
+        variables = list(variables)
+        self.variables = variables if order is None else [variables[position] for position in order]
+        self._sizes = [len(variable.values) for variable in self.variables]
+        # Terminals are at the level past the last variable
+        self.nodes = [(len(self.variables), ()), (len(self.variables), ())]
+        self._unique = {}
+        self._applied = {}
+        self._counts = {}
+        # _products[i] is the number of assignments of the variables before
+        # level i
+        self._products = [1]
+        for size in self._sizes:
+            self._products.append(self._products[-1] * size)
+
+    def node(self, level, children):
+        children = tuple(children)
+        if all(child == children[0] for child in children):
+            return children[0] if children else FALSE
+        key = (level, children)
+        if key not in self._unique:
+            self._unique[key] = len(self.nodes)
+            self.nodes.append(key)
+        return self._unique[key]
+
+    def values_node(self, level, test):
+        # Assignments where the value of the variable at level passes test
+        return self.node(level, [TRUE if test(value) else FALSE for value in self.variables[level].values])
+
+    def value_node(self, level, index):
+        # Assignments where the variable at level has the value at index
+        return self.node(level, [TRUE if i == index else FALSE for i in range(self._sizes[level])])
+
+    def negation(self, node):
+        return self.apply(operator.ne, node, TRUE)
+
+    def all_of(self, nodes):
+        return self._fold(operator.and_, nodes, TRUE)
+
+    def any_of(self, nodes):
+        return self._fold(operator.or_, nodes, FALSE)
+
+    def equivalence(self, first, second):
+        return self.apply(operator.eq, first, second)
+
+    def _fold(self, function, nodes, result):
+        for node in nodes:
+            result = self.apply(function, result, node)
+        return result
+
+    def apply(self, function, first, second):
+        # function of two booleans applied to two diagrams
+        if first <= TRUE and second <= TRUE:
+            return TRUE if function(bool(first), bool(second)) else FALSE
+        if function is operator.and_:
+            if FALSE in (first, second):
+                return FALSE
+            if first == TRUE or first == second:
+                return second
+            if second == TRUE:
+                return first
+        elif function is operator.or_:
+            if TRUE in (first, second):
+                return TRUE
+            if first == FALSE or first == second:
+                return second
+            if second == FALSE:
+                return first
+        key = (function, first, second)
+        if key not in self._applied:
+            first_level, first_children = self.nodes[first]
+            second_level, second_children = self.nodes[second]
+            level = min(first_level, second_level)
+            size = self._sizes[level]
+            firsts = first_children if first_level == level else (first,) * size
+            seconds = second_children if second_level == level else (second,) * size
+            self._applied[key] = self.node(level, [self.apply(function, a, b) for a, b in zip(firsts, seconds)])
+        return self._applied[key]
+
+    def count(self, node):
+        # Number of assignments of all variables for which node is true
+        level = self.nodes[node][0]
+        return self._products[level] * self._count_from(node)
+
+    def _count_from(self, node):
+        # Assignments of the variables from the level of node on
+        if node <= TRUE:
+            return node
+        if node not in self._counts:
+            level, children = self.nodes[node]
+            total = 0
+            for child in children:
+                skipped = self._products[self.nodes[child][0]] // self._products[level + 1]
+                total += skipped * self._count_from(child)
+            self._counts[node] = total
+        return self._counts[node]
+
+
+def _narrow_order(variables, references):
+    # Breadth first order (Cuthill-McKee) of the graph where the variables
+    # a rule refers to are neighbours. Related variables get near levels,
+    # which keeps the diagram narrow.
+    positions = dict((variable.name, position) for position, variable in enumerate(variables))
+    neighbours = [set() for _ in variables]
+    for names in references:
+        related = [positions[name] for name in names if name in positions]
+        for position in related:
+            neighbours[position].update(related)
+    for position, adjacent in enumerate(neighbours):
+        adjacent.discard(position)
+    degree = lambda position: (len(neighbours[position]), position)
+    order = []
+    seen = set()
+    for start in sorted(range(len(variables)), key=degree):
+        if start in seen:
+            continue
+        seen.add(start)
+        queue = deque([start])
+        while queue:
+            position = queue.popleft()
+            order.append(position)
+            for adjacent in sorted(neighbours[position] - seen, key=degree):
+                seen.add(adjacent)
+                queue.append(adjacent)
+    return order
+
+
+class _DiagramCompiler(object):
+    # Same interface as rules.RuleCompiler; compiles rules and guards into
+    # decision diagram nodes. Rules see the values as they are, guards see
+    # them with the references to other machine variables resolved.
+
+    def __init__(self, diagram, machine, resolved):
+        self._diagram = diagram
+        self._levels = dict((variable.name, level) for level, variable in enumerate(diagram.variables))
+        self._machine = machine
+        self._resolved = resolved
+
+    def compile_rule(self, rule):
+        if not hasattr(rule, 'compile'):
+            raise AssertionError('ERROR! "{:s}" can not be analysed'.format(str(rule)))
+        return rule.compile(self)
+
+    def comparison(self, name, compare, constant):
+        return self._values_node(name, lambda value: compare(value.strip(), constant))
+
+    def regex(self, name, pattern, negated):
+        try:
+            search = re.compile(pattern.strip()).search
+        except re.error as error:
+            raise AssertionError('ERROR! Invalid regular expression "{:s}": {:s}'.format(pattern, str(error)))
+        return self._values_node(name, lambda value: (search(value.strip()) is None) == negated)
+
+    def negation(self, node):
+        return self._diagram.negation(node)
+
+    def equivalence(self, first, second):
+        return self._diagram.equivalence(first, second)
+
+    def all_of(self, nodes):
+        return self._diagram.all_of(nodes)
+
+    def any_of(self, nodes):
+        return self._diagram.any_of(nodes)
+
+    def _values_node(self, name, test):
+        level = self._levels.get(name)
+        if level is None:
+            raise AssertionError('ERROR! Unknown variable {:s}'.format(name))
+        variable = self._diagram.variables[level]
+        if not self._resolved or not self._machine.variable_references(variable):
+            return self._diagram.values_node(level, test)
+        # Any of the ways the value can resolve to a value that passes
+        nodes = []
+        for index, value in enumerate(variable.values):
+            for conditions, resolved in self._expanded(value, (variable.name,)):
+                conditions = dict(conditions)
+                if conditions.setdefault(level, index) != index or not test(resolved):
+                    continue
+                nodes.append(self._diagram.all_of(self._diagram.value_node(l, i)
+                                                  for l, i in sorted(conditions.items())))
+        return self._diagram.any_of(nodes)
+
+    def _expanded(self, text, resolving=()):
+        # (conditions, resolved text) for each way the machine variable
+        # references in text resolve; conditions maps the level of each
+        # variable involved to its value index. A reference to a variable
+        # in resolving closes a cycle and does not resolve.
+        names = []
+        for name in Variable.PATTERN.findall(text):
+            if name in self._levels and name not in names:
+                names.append(name)
+        if not names:
+            return [({}, text)]
+        if any(name in resolving for name in names):
+            return []
+        results = [({}, text)]
+        for name in names:
+            level = self._levels[name]
+            expanded = []
+            for conditions, partial in results:
+                for index, value in enumerate(self._diagram.variables[level].values):
+                    for inner, resolved in self._expanded(value, resolving + (name,)):
+                        merged = dict(conditions)
+                        if any(merged.setdefault(l, i) != i for l, i in list(inner.items()) + [(level, index)]):
+                            continue
+                        expanded.append((merged, partial.replace(name, resolved)))
+            results = expanded
+        return results
+
+
+class ModelAnalysis(object):
+    # Counts about the variable assignments of a machine, answered from
+    # decision diagrams of its rules and guards without enumerating the
+    # assignments
+
+    def __init__(self, machine):
+        references = [_ReferencedNames().compile_rule(rule) or frozenset() for rule in machine.rules]
+        order = _narrow_order(machine.variables, references)
+        self.diagram = DecisionDiagram(machine.variables, order)
+        self._machine = machine
+        compiler = _DiagramCompiler(self.diagram, machine, resolved=False)
+        self._rule_nodes = [compiler.compile_rule(rule) for rule in machine.rules]
+        # Conjoined from the rules on the deepest levels up, so that the
+        # partial results stay small
+        levels = dict((variable.name, level) for level, variable in enumerate(self.diagram.variables))
+        depths = [max([levels.get(name, -1) for name in names] or [-1]) for names in references]
+        self._valid = self.diagram.all_of(node for _, node in sorted(zip(depths, self._rule_nodes),
+                                                                     key=lambda pair: -pair[0]))
+        self.assignments = self.diagram.count(TRUE)
+        self.valid_assignments = self.diagram.count(self._valid)
+
+    def rule_impacts(self):
+        # (rule, assignments it removes alone, assignments no other rule
+        # removes) for each rule
+        nodes = self._rule_nodes
+        prefixes = [TRUE]
+        for node in nodes:
+            prefixes.append(self.diagram.apply(operator.and_, prefixes[-1], node))
+        suffixes = [TRUE]
+        for node in reversed(nodes):
+            suffixes.append(self.diagram.apply(operator.and_, suffixes[-1], node))
+        suffixes.reverse()
+        impacts = []
+        for index, rule in enumerate(self._machine.rules):
+            others = self.diagram.apply(operator.and_, prefixes[index], suffixes[index + 1])
+            impacts.append((rule, self.assignments - self.diagram.count(nodes[index]),
+                            self.diagram.count(others) - self.valid_assignments))
+        return impacts
+
+    def guard_counts(self):
+        # (state, action, valid assignments that enable it) for each guarded
+        # action, None for guards that can not be analysed
+        compiler = _DiagramCompiler(self.diagram, self._machine, resolved=True)
+        counts = []
+        for state in self._machine.states:
+            for action in state._actions:
+                if not action.condition or action.condition == 'otherwise':
+                    continue
+                try:
+                    guard = compiler.compile_rule(action.condition)
+                except AssertionError:
+                    counts.append((state, action, None))
+                    continue
+                counts.append((state, action, self.diagram.count(self.diagram.apply(operator.and_, self._valid, guard))))
+        return counts
@@ -0,0 +1,100 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import hashlib
+import math
+import sys
+
+
+def fingerprint(packed_test, values):
+    # 128 bit digest of a packed action index path and the variable values
+    digest = hashlib.blake2b(packed_test, digest_size=16)
+    for value in values:
+        digest.update(b'\0')
+        digest.update(value.encode('utf-8'))
+    return digest.digest()
+
+
+class ExactFilter(object):
+    # Remembers the fingerprints of all tests. Two different tests have the
+    # same fingerprint with a probability of about 2**-128.
+    name = 'exact'
+    exact = True
+
+    def __init__(self, capacity=None):
+        self._fingerprints = set()
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._fingerprints
+
+    def add(self, fingerprint):
+        # True when the test was not seen before
+        if fingerprint in self._fingerprints:
+            return False
+        self._fingerprints.add(fingerprint)
+        return True
+
+    def __len__(self):
+        return len(self._fingerprints)
+
+    def memory_usage(self):
+        return sys.getsizeof(self._fingerprints) + \
+               sum(sys.getsizeof(fingerprint) for fingerprint in self._fingerprints)
+
+
+class BloomFilter(object):
+    # Fixed size bit array sized for capacity tests. A new test is taken for
+    # a duplicate (and skipped) with at most false_positive_rate probability
+    # while at most capacity tests have been added.
+    name = 'bloom'
+    exact = False
+    DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+    def __init__(self, capacity, false_positive_rate=DEFAULT_FALSE_POSITIVE_RATE):
+        if not 0 < false_positive_rate < 1:
+            raise AssertionError('ERROR! False positive rate must be between 0 and 1')
+        capacity = max(capacity, 1)
+        self._size = max(8, int(math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)))
+        self._hashes = max(1, int(round(self._size / float(capacity) * math.log(2))))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+
+    def _positions(self, fingerprint):
+        # Bit positions by double hashing the two halves of the fingerprint
+        first = int.from_bytes(fingerprint[:8], 'little')
+        second = int.from_bytes(fingerprint[8:16], 'little') | 1
+        return [(first + i * second) % self._size for i in range(self._hashes)]
+
+    def __contains__(self, fingerprint):
+        bits = self._bits
+        return all(bits[bit >> 3] & (1 << (bit & 7)) for bit in self._positions(fingerprint))
+
+    def add(self, fingerprint):
+        # True when some bit of the fingerprint was not set yet
+        bits = self._bits
+        new = False
+        for bit in self._positions(fingerprint):
+            mask = 1 << (bit & 7)
+            if not bits[bit >> 3] & mask:
+                bits[bit >> 3] |= mask
+                new = True
+        if new:
+            self._count += 1
+        return new
+
+    def __len__(self):
+        return self._count
+
+    def memory_usage(self):
+        return sys.getsizeof(self._bits)
@@ -0,0 +1,144 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+
+from .model import Variable
+
+# Value used for each class of equivalent values
+FIRST = 'first'
+ROTATE = 'rotate'
+REPRESENTATIVES = (FIRST, ROTATE)
+
+
+class ValuePartition(object):
+    # The values of each variable in classes that no rule or action guard
+    # can tell apart: every comparison and regex of the machine gives the
+    # same result for all values of a class. Assignments of one value per
+    # class are enough to take every path and satisfy every rule. The values
+    # of a variable are not split when they refer to other machine
+    # variables or other variables refer to it, nor when some rule or guard
+    # can not be analysed.
+
+    def __init__(self, machine):
+        self._names = [variable.name for variable in machine.variables]
+        tests = _machine_tests(machine)
+        references = [machine.variable_references(variable) for variable in machine.variables]
+        referred = set(referred for variables in references for referred in variables)
+        self.classes = []
+        for variable, refers in zip(machine.variables, references):
+            if tests is None or refers or variable in referred:
+                self.classes.append([[value] for value in variable.values])
+            else:
+                self.classes.append(_classes(variable.values, tests.get(variable.name, [])))
+        # Variables with one value for each class, to enumerate assignments
+        self.variables = [Variable(name, [values[0] for values in classes])
+                          for name, classes in zip(self._names, self.classes)]
+        self._class_of = [dict((values[0], index) for index, values in enumerate(classes))
+                          for classes in self.classes]
+
+    def sizes(self):
+        # Number of assignments before and after the partition, rules not
+        # taken into account
+        before, after = 1, 1
+        for classes in self.classes:
+            before *= sum(len(values) for values in classes)
+            after *= len(classes)
+        return before, after
+
+    def split_variables(self):
+        # (name, values, classes) of the variables that have equivalent values
+        return [(name, sum(len(values) for values in classes), len(classes))
+                for name, classes in zip(self._names, self.classes)
+                if any(len(values) > 1 for values in classes)]
+
+    def assignments(self, assignments, representatives=FIRST):
+        # Assignments of self.variables as assignments of the machine
+        # variables. With ROTATE, each use of a class takes the next value
+        # of the class in turn. The turns start over with each call, so the
+        # same assignments always get the same values.
+        if representatives != ROTATE:
+            for values in assignments:
+                yield values
+            return
+        turns = [[0] * len(classes) for classes in self.classes]
+        for values in assignments:
+            yield self._rotated(values, turns)
+
+    def _rotated(self, values, turns):
+        result = []
+        for position, value in enumerate(values):
+            index = self._class_of[position][value]
+            members = self.classes[position][index]
+            turn = turns[position][index]
+            turns[position][index] = turn + 1
+            result.append(members[turn % len(members)])
+        return result
+
+
+def _classes(values, tests):
+    classes = {}
+    for value in values:
+        key = tuple(test(value.strip()) for test in tests)
+        classes.setdefault(key, []).append(value)
+    return list(classes.values())
+
+
+def _machine_tests(machine):
+    # Tests of all rules and guards by variable name, None when some can not
+    # be analysed
+    # Dead actions never tell values apart
+    conditions = list(machine.rules) + [action.condition for state in machine.states for action in state._actions
+                                        if action.condition and action.condition != 'otherwise'
+                                        and action not in machine.dead_actions]
+    compiler = _ValueTests()
+    return compiler.all_of([compiler.compile_rule(condition) for condition in conditions])
+
+
+class _ValueTests(object):
+    # Same interface as rules.RuleCompiler; compiles a rule into the tests
+    # it puts the values of each variable to, {name: [test, ...]}. None
+    # when the rule can not be analysed.
+
+    def compile_rule(self, rule):
+        if not hasattr(rule, 'compile'):
+            return None
+        return rule.compile(self)
+
+    def comparison(self, name, compare, constant):
+        return {name: [lambda value: compare(value, constant)]}
+
+    def regex(self, name, pattern, negated):
+        try:
+            search = re.compile(pattern.strip()).search
+        except re.error:
+            return None
+        return {name: [lambda value: search(value) is None]}
+
+    def negation(self, tests):
+        return tests
+
+    def equivalence(self, first, second):
+        return self.all_of([first, second])
+
+    def all_of(self, operands):
+        if any(tests is None for tests in operands):
+            return None
+        merged = {}
+        for tests in operands:
+            for name, functions in tests.items():
+                merged.setdefault(name, []).extend(functions)
+        return merged
+
+    any_of = all_of
@@ -0,0 +1,358 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+# Hand written line oriented parser for the machine files. Accepts the same
+# language as the pyparsing grammar in parsing.py and builds the same model
+# objects, but reads every line only once instead of trying every longest
+# match alternative on it.
+
+import re
+
+from .model import RoboMachine, State, Action, Variable
+from .rules import (AndRule, Condition, EquivalenceRule, OrRule,
+                    NotRule, ImplicationRule, UnequalCondition,
+                    GreaterThanCondition, GreaterThanOrEqualCondition,
+                    LessThanCondition, LessThanOrEqualCondition,
+                    RegexCondition, RegexNegatedCondition)
+
+
+class ParseError(Exception):
+
+    def __init__(self, msg, lineno, line):
+        Exception.__init__(self, msg)
+        self.msg = msg
+        self.lineno = lineno
+        self.line = line
+
+
+_IGNORABLE = re.compile(r'(?:\s|(?:\A|(?<=\n)|(?<=\s\s))#[^\n]*)*')
+_TABLE_CONTENT = re.compile(r'[^\*]+(?=\*)')
+_SETTINGS_HEADER = '*** Settings ***'
+_VARIABLES_HEADER = '*** Variables ***'
+_MACHINE_HEADER = '*** Machine ***'
+_KEYWORDS_HEADER = '*** Keywords ***'
+_KEYWORDS_HEADER_LINE = re.compile(r'\n *\*\*\* Keywords \*\*\*')
+_MACHINE_HEADER_LINE = re.compile(r'\*\*\* Machine \*\*\*(?:\s\s+#[^\n]*| *)(?:\n|\Z)')
+
+_TRAILING_COMMENT = re.compile(r'\s\s+#.*$')
+_STATE_NAME = re.compile(r'\w+(?: \w+)*$')
+_ACTIONS_HEADER = re.compile(r'( *)\[Actions\]$')
+_ACTION = re.compile(r'(\s*)(?:([\w\$\{\}][ \w\$\{\}]*[\w\}]|\w)\s{2,})?==>\s{2,}(\w+(?: \w+)*)(.*)$')
+_OTHERWISE = re.compile(r' {2,}otherwise$')
+_WHEN = re.compile(r' {2,}when {2,}')
+
+_VALUE = r'[\w\$\{\}!?\-\=\_\.\/]+(?: [\w\$\{\}!?\-\=\_\.\/]+)*'
+_VARIABLE_DEFINITION = re.compile(r'(%s) {2,}any of {2,}(%s(?: {2,}%s)*)$' % (Variable.REGEX, _VALUE, _VALUE))
+_VALUE_SPLITTER = re.compile(r' {2,}')
+
+_CONDITION_START = re.compile(r'(%s) (==|!=|>=|<=|>|<|!~|~|in) ' % Variable.REGEX)
+_CONDITION_VALUE = re.compile(_VALUE)
+_REGEX_VALUE = re.compile(r'[!-~]+(?: [!-~]+)*')
+_IN_VALUES = re.compile(r'\((%s(?:, ?%s)*)\)' % (_VALUE, _VALUE))
+_IN_SPLITTER = re.compile(r', ?')
+_CONDITIONS = {'==': Condition,
+               '!=': UnequalCondition,
+               '>': GreaterThanCondition,
+               '>=': GreaterThanOrEqualCondition,
+               '<': LessThanCondition,
+               '<=': LessThanOrEqualCondition,
+               '~': RegexCondition,
+               '!~': RegexNegatedCondition}
+_EQUIVALENCE = re.compile(r' {2,}<==> {2,}')
+_IMPLICATION = re.compile(r' {2,}==> {2,}')
+_AND = re.compile(r' {2,}and {2,}')
+_OR = re.compile(r' {2,}or {2,}')
+
+
+def parse(text):
+    settings_table, variables_table, keywords_table = [], [], []
+    pos = _IGNORABLE.match(text).end()
+    if text.startswith(_SETTINGS_HEADER, pos):
+        pos, settings_table = _table(text, pos, _SETTINGS_HEADER)
+        pos = _IGNORABLE.match(text, pos).end()
+    if text.startswith(_VARIABLES_HEADER, pos):
+        pos, variables_table = _table(text, pos, _VARIABLES_HEADER)
+        pos = _IGNORABLE.match(text, pos).end()
+    header = _MACHINE_HEADER_LINE.match(text, pos)
+    if not header:
+        raise _error(text, pos, 'Expected "{:s}"'.format(_MACHINE_HEADER))
+    end, keywords = _keywords_table_start(text, header.end())
+    if end < len(text):
+        keywords_table = [_KEYWORDS_HEADER + '\n' + text[keywords + len(_KEYWORDS_HEADER):]]
+    first_lineno = text.count('\n', 0, header.end()) + 1
+    lines = text[header.end():end].split('\n')
+    variables, rules, states = _MachineTableParser(lines, first_lineno).parse()
+    return RoboMachine(states, variables, rules,
+                       settings_table=settings_table,
+                       variables_table=variables_table,
+                       keywords_table=keywords_table)
+
+
+def _table(text, pos, header):
+    start = _IGNORABLE.match(text, pos + len(header)).end()
+    content = _TABLE_CONTENT.match(text, start)
+    if not content:
+        raise _error(text, start, 'Expected content for "{:s}"'.format(header))
+    return content.end(), [header + '\n' + content.group()]
+
+
+def _keywords_table_start(text, pos):
+    # Start of the line of the keywords table header and of the header,
+    # which may be indented
+    match = _KEYWORDS_HEADER_LINE.search(text, pos - 1)
+    if not match:
+        return len(text), len(text)
+    return match.start() + 1, match.end() - len(_KEYWORDS_HEADER)
+
+
+def _error(text, pos, msg):
+    lineno = text.count('\n', 0, pos) + 1
+    start = text.rfind('\n', 0, pos) + 1
+    end = text.find('\n', pos)
+    return ParseError(msg, lineno, text[start:len(text) if end == -1 else end])
+
+
+class _MachineTableParser(object):
+
+    def __init__(self, lines, first_lineno):
+        self._first_lineno = first_lineno
+        self._lines = []
+        for index, line in enumerate(lines):
+            # Whole line comments are ignored together with the empty lines
+            # preceding them, exactly like the comment pattern in parsing.py
+            if line.lstrip().startswith('#'):
+                while self._lines and self._lines[-1][1] == '':
+                    self._lines.pop()
+            else:
+                self._lines.append((first_lineno + index, line))
+        self._index = 0
+
+    def parse(self):
+        self._skip_blank_lines()
+        variables = self._variables()
+        self._skip_blank_lines()
+        rules = self._rules()
+        # Like in the grammar, the spaces before the first state name are
+        # skipped when there are no rules
+        states = self._states(indented=not rules)
+        return variables, rules, states
+
+    def _line(self, index=None):
+        index = self._index if index is None else index
+        if index >= len(self._lines):
+            return None
+        return self._lines[index][1]
+
+    def _content(self, index=None):
+        line = self._line(index)
+        return None if line is None else _TRAILING_COMMENT.sub('', line)
+
+    def _skip_blank_lines(self):
+        skipped = 0
+        while self._line() == '':
+            self._index += 1
+            skipped += 1
+        return skipped
+
+    def _error(self, msg):
+        if not self._lines:
+            return ParseError(msg, self._first_lineno, '')
+        lineno, line = self._lines[min(self._index, len(self._lines) - 1)]
+        return ParseError(msg, lineno, line)
+
+    def _variables(self):
+        variables = []
+        while self._line() is not None:
+            definition = _VARIABLE_DEFINITION.match(self._content())
+            if not definition:
+                break
+            variables.append(Variable(definition.group(1),
+                                      _VALUE_SPLITTER.split(definition.group(2))))
+            self._index += 1
+        return variables
+
+    def _rules(self):
+        rules = []
+        while self._line() is not None:
+            content = self._content().lstrip(' ')
+            if _STATE_NAME.match(content) and (not rules or content == self._content()):
+                break
+            rules.append(self._full_rule(content))
+            self._index += 1
+            self._skip_blank_lines()
+        return rules
+
+    def _full_rule(self, text):
+        parsed = _rule(text, 0)
+        if not parsed or parsed[1] != len(text):
+            raise self._error('Invalid rule')
+        return parsed[0]
+
+    def _states(self, indented=False):
+        states = [self._state(indented)]
+        while self._line() is not None:
+            if not self._skip_blank_lines():
+                raise self._error('Expected an empty line before the next state')
+            if self._line() is None:
+                break
+            states.append(self._state())
+        return states
+
+    def _state(self, indented=False):
+        name = self._content()
+        if indented and name is not None:
+            name = name.lstrip(' ')
+        if name is None or not _STATE_NAME.match(name):
+            raise self._error('Expected a state name')
+        self._index += 1
+        steps = self._steps()
+        actions = self._actions()
+        return State(name, steps, actions)
+
+    def _steps(self):
+        steps = []
+        while self._line() is not None:
+            line = self._line()
+            if not (line.startswith('  ') and line[2] != '['):
+                break
+            steps.append(line)
+            self._index += 1
+        return steps
+
+    def _actions(self):
+        index, blanks = self._next_non_blank()
+        header = _ACTIONS_HEADER.match(self._content(index) or '')
+        if not header or blanks + len(header.group(1)) < 2:
+            return []
+        self._index = index + 1
+        actions = []
+        while True:
+            index, blanks = self._next_non_blank()
+            action = self._action(self._content(index) or '', blanks)
+            if not action:
+                break
+            actions.append(action)
+            self._index = index + 1
+        if not actions:
+            raise self._error('Expected an action')
+        return actions
+
+    def _next_non_blank(self):
+        index = self._index
+        while self._line(index) == '':
+            index += 1
+        return index, index - self._index
+
+    def _action(self, content, blanks):
+        match = _ACTION.match(content)
+        if not match or blanks + len(match.group(1)) < 4:
+            return None
+        condition = match.group(4)
+        if condition:
+            condition = self._condition(condition)
+            if condition is None:
+                return None
+        return Action((match.group(2) or '').rstrip(), match.group(3), condition)
+
+    def _condition(self, text):
+        if _OTHERWISE.match(text):
+            return 'otherwise'
+        when = _WHEN.match(text)
+        if not when:
+            return None
+        parsed = _rule(text, when.end())
+        if not parsed or parsed[1] != len(text):
+            return None
+        return parsed[0]
+
+
+# Rules are parsed with the same longest match semantics as the pyparsing
+# grammar: every alternative starts with a closed rule that is parsed once,
+# and the alternative that reaches furthest wins (first one on ties). Only a
+# parenthesized rule that forms a whole rule on its own may have spaces
+# around its parentheses.
+
+def _rule(text, pos):
+    if text.startswith('not ', pos):
+        closed = _closed(text, pos + 4)
+        return closed and (NotRule(closed[0]), closed[1])
+    best = None
+    first = _closed(text, pos)
+    if first:
+        best = _binary(text, first, _EQUIVALENCE, EquivalenceRule)
+        for candidate in (_binary(text, first, _IMPLICATION, ImplicationRule),
+                          _sequence(text, first, _AND, AndRule),
+                          _sequence(text, first, _OR, OrRule)):
+            if candidate and (not best or candidate[1] > best[1]):
+                best = candidate
+    alone = _closed(text, pos, lenient=True)
+    if alone and (not best or alone[1] > best[1]):
+        best = alone
+    return best
+
+
+def _binary(text, first, operator, rule_class):
+    match = operator.match(text, first[1])
+    if not match:
+        return None
+    second = _closed(text, match.end())
+    return second and (rule_class(first[0], second[0]), second[1])
+
+
+def _sequence(text, first, operator, rule_class):
+    conditions, end = [first[0]], first[1]
+    while True:
+        match = operator.match(text, end)
+        if not match:
+            break
+        closed = _closed(text, match.end())
+        if not closed:
+            break
+        conditions.append(closed[0])
+        end = closed[1]
+    return rule_class(conditions), end
+
+
+def _closed(text, pos, lenient=False):
+    start = _skip_spaces(text, pos) if lenient else pos
+    if text.startswith('(', start):
+        start = _skip_spaces(text, start + 1) if lenient else start + 1
+        inner = _rule(text, start)
+        if not inner:
+            return None
+        end = _skip_spaces(text, inner[1]) if lenient else inner[1]
+        if not text.startswith(')', end):
+            return None
+        return inner[0], end + 1
+    start = _CONDITION_START.match(text, pos)
+    if not start:
+        return None
+    name, operator = start.groups()
+    if operator == 'in':
+        values = _IN_VALUES.match(text, start.end())
+        if not values:
+            return None
+        return (OrRule([Condition(name, value) for value in _IN_SPLITTER.split(values.group(1))]),
+                values.end())
+    value_pattern = _REGEX_VALUE if operator in ('~', '!~') else _CONDITION_VALUE
+    value = value_pattern.match(text, start.end())
+    if not value:
+        return None
+    return _CONDITIONS[operator](name, value.group()), value.end()
+
+
+def _skip_spaces(text, pos):
+    while text.startswith(' ', pos):
+        pos += 1
+    return pos
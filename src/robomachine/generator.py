@@ -15,6 +15,10 @@
 
 from __future__ import print_function
 
+from array import array
+
+from .duplicates import ExactFilter, fingerprint
+from .parallel import parallel_tests
 from .parsing import parse
 from .strategies import DepthFirstSearchStrategy
 
@@ -25,47 +29,177 @@ except ImportError:
 
 
 class Generator(object):
-    def __init__(self):
+    # With switches given, visited_sequences collects the sequences of
+    # switches + 1 consecutive actions the tests take
+    def __init__(self, switches=None):
         self.visited_states = set()
         self.visited_actions = set()
+        self.visited_sequences = set()
+        self.duplicate_filter = None
+        self._switches = switches
 
     def _write_test(self, name, machine, output, test, values):
         output.write('\n{:s}\n'.format(name))
-        if values:
-            machine.write_variable_setting_step(values, output)
-        machine.start_state.write_to(output)
+        self._write_test_body(machine, output, test, values)
         self.visited_states.add(machine.start_state)
         for action in test:
             self.visited_actions.add(action)
             self.visited_states.add(action.next_state)
+        self._visit_sequences(test)
+
+    def _visit_sequences(self, test):
+        if self._switches is None:
+            return
+        length = self._switches + 1
+        for start in range(len(test) - length + 1):
+            self.visited_sequences.add(tuple(test[start:start + length]))
+
+    @staticmethod
+    def _write_test_body(machine, output, test, values):
+        if values:
+            machine.write_variable_setting_step(values, output)
+        machine.start_state.write_to(output)
+        for action in test:
             action.write_to(output)
 
-    def _write_tests(self, machine, max_tests, max_actions, to_state, output, strategy):
+    def _write_tests(self, machine, max_tests, max_actions, to_state, output, strategy, jobs=1,
+                     shard=None):
         i = 1
         skipped = 0
-        generated_tests = set()
+        generated_tests = self.duplicate_filter
 
         strategy_class = strategy(machine, max_actions, to_state)
-        for test, values in strategy_class.tests():
+        # Random tests drawn on their own are numbered and sharded by draw
+        if getattr(strategy_class, 'paths_by_draw', False):
+            return self._write_drawn_tests(machine, max_tests, output, strategy_class, shard)
+        # Depth first search is sharded by assignment, other strategies by
+        # test number. A test's number depends on the duplicates before it,
+        # so those strategies walk every test and only write their share.
+        if shard and getattr(strategy_class, 'PATHS_BY_ASSIGNMENT', False):
+            return self._write_sharded_tests(machine, max_tests, output, strategy_class, shard)
+        # Assignments of a depth first search can be generated in parallel
+        if jobs > 1 and getattr(strategy_class, 'PATHS_BY_ASSIGNMENT', False):
+            return self._write_parallel_tests(machine, max_tests, max_actions, to_state, output,
+                                              strategy, strategy_class, jobs)
+        # Strategies working on a compiled machine produce action index paths
+        # that are mapped back to actions only when written
+        compiled = getattr(strategy_class, 'compiled', None)
+        tests = strategy_class.paths() if compiled else strategy_class.tests()
+        for test, values in tests:
             if i + skipped > max_tests:
                 print('--tests-max generation try limit {:d} reached with {:d} tests generated'.format(max_tests, i - 1))
                 break
-            if (tuple(test), tuple(values)) in generated_tests:
+            # Actions are compared by identity
+            packed_test = array('i', test).tobytes() if compiled else array('Q', map(id, test)).tobytes()
+            if not generated_tests.add(fingerprint(packed_test, values)):
                 skipped += 1
                 continue
-            else:
-                generated_tests.add((tuple(test), tuple(values)))
-            self._write_test('Test {:d}'.format(i), machine, output, test, values)
+            if not shard or _in_shard(i - 1, shard):
+                if compiled:
+                    test = compiled.to_actions(test)
+                self._write_test('Test {:d}'.format(i), machine, output, test, values)
             i += 1
 
+    def _write_drawn_tests(self, machine, max_tests, output, strategy, shard):
+        # Test n is draw n, at most max_tests are drawn and a shard only
+        # makes its own draws. Duplicates of earlier draws are skipped, in a
+        # shard only those of its own draws: a test repeating one of another
+        # shard is written by both.
+        index, count = shard or (1, 1)
+        numbers = range(index - 1, max_tests, count)
+        written = 0
+        number = None
+        for number, test, values in strategy.draws(numbers):
+            if test is None or not self.duplicate_filter.add(fingerprint(array('i', test).tobytes(), values)):
+                continue
+            self._write_test('Test {:d}'.format(number + 1), machine, output, strategy.compiled.to_actions(test), values)
+            written += 1
+        if numbers and number == numbers[-1]:
+            print('--tests-max generation try limit {:d} reached with {:d} tests generated'.format(max_tests, written))
+
+    def _write_sharded_tests(self, machine, max_tests, output, strategy, shard):
+        # Only the assignments of this shard are written. Test names and the
+        # tests-max limit are the same as in an unsharded run. With an exact
+        # duplicate filter, an assignment resolving to values seen before
+        # only has duplicate tests and the paths of other shards are counted
+        # without walking them. Other filters can take a new test for a
+        # duplicate, so every path goes through the filter as it would
+        # unsharded.
+        i = 1
+        skipped = 0
+        generated_tests = self.duplicate_filter
+        exact = getattr(generated_tests, 'exact', False)
+        seen_values = set()
+        for number, values in enumerate(strategy.assignments()):
+            current_values, paths = strategy.assignment_paths(values)
+            duplicate = tuple(current_values) in seen_values
+            seen_values.add(tuple(current_values))
+            if exact and (duplicate or not _in_shard(number, shard)):
+                count = strategy.assignment_count(values)
+                taken = min(count, max(max_tests + 1 - (i + skipped), 0))
+                if duplicate:
+                    skipped += taken
+                else:
+                    i += taken
+                if count > taken:
+                    print('--tests-max generation try limit {:d} reached with {:d} tests generated'.format(max_tests, i - 1))
+                    return
+                continue
+            for test in paths:
+                if i + skipped > max_tests:
+                    print('--tests-max generation try limit {:d} reached with {:d} tests generated'.format(max_tests, i - 1))
+                    return
+                if not generated_tests.add(fingerprint(array('i', test).tobytes(), current_values)):
+                    skipped += 1
+                    continue
+                if _in_shard(number, shard):
+                    self._write_test('Test {:d}'.format(i), machine, output,
+                                     strategy.compiled.to_actions(test), list(current_values))
+                i += 1
+
+    def _write_parallel_tests(self, machine, max_tests, max_actions, to_state, output,
+                              strategy, strategy_class, jobs):
+        # Workers write the test bodies, naming, duplicate filtering and
+        # coverage bookkeeping stay here so the output equals a serial run
+        i = 1
+        skipped = 0
+        generated_tests = self.duplicate_filter
+        visited = set()
+        tests = parallel_tests(strategy_class, (strategy, machine, max_actions, to_state),
+                               self._write_test_body, jobs, max_tests + 1)
+        for packed_test, values, body in tests:
+            if i + skipped > max_tests:
+                print('--tests-max generation try limit {:d} reached with {:d} tests generated'.format(max_tests, i - 1))
+                break
+            if not generated_tests.add(fingerprint(packed_test, values)):
+                skipped += 1
+                continue
+            output.write('\nTest {:d}\n'.format(i))
+            output.write(body)
+            test = array('i')
+            test.frombytes(packed_test)
+            visited.update(test)
+            if self._switches is not None:
+                self._visit_sequences(strategy_class.compiled.to_actions(test))
+            i += 1
+        if i > 1:
+            self.visited_states.add(machine.start_state)
+        for action in strategy_class.compiled.to_actions(sorted(visited)):
+            self.visited_actions.add(action)
+            self.visited_states.add(action.next_state)
+
 
     def generate(self, machine, max_tests=1000, max_actions=None, to_state=None, output=None,
-                 strategy=DepthFirstSearchStrategy):
+                 strategy=DepthFirstSearchStrategy, jobs=1, shard=None, duplicate_filter=ExactFilter):
         max_actions = -1 if max_actions is None else max_actions
+        if shard and not 1 <= shard[0] <= shard[1]:
+            raise AssertionError('ERROR! Invalid shard {:d}/{:d}'.format(*shard))
+        # At most max_tests tests are tried
+        self.duplicate_filter = duplicate_filter(max_tests)
         machine.write_settings_table(output)
         machine.write_variables_table(output)
         output.write('*** Test Cases ***')
-        self._write_tests(machine, max_tests, max_actions, to_state, output, strategy)
+        self._write_tests(machine, max_tests, max_actions, to_state, output, strategy, jobs, shard)
         machine.write_keywords_table(output)
 
 
@@ -73,3 +207,9 @@ class Generator(object):
         output = StringIO()
         self.generate(parse(text), output=output)
         return output.getvalue()
+
+
+def _in_shard(number, shard):
+    # shard is (index, count) with index 1..count
+    index, count = shard
+    return number % count == index - 1
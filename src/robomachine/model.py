@@ -16,15 +16,22 @@ import re
 
 
 class RoboMachine(object):
+    # Actions that pruning.prune found no test can take, left out of the
+    # compiled machine
+    dead_actions = frozenset()
 
     def __init__(self, states, variables, rules, settings_table=None,
                  variables_table=None, keywords_table=None):
         self.states = states or []
         self.variables = variables or []
         self.rules = rules or []
-        self._settings_table = settings_table or []
-        self._variables_table = variables_table or []
-        self._keywords_table = keywords_table or []
+        self._settings_table = list(settings_table or [])
+        self._variables_table = list(variables_table or [])
+        self._keywords_table = list(keywords_table or [])
+        self._states_by_name = self._index_by_name(self.states)
+        self._variables_by_name = self._index_by_name(self.variables)
+        self._values_version = 0
+        self._resolving = []
         for state in self.states:
             state.set_machine(self)
         for variable in self.variables:
@@ -38,17 +45,43 @@ class RoboMachine(object):
     def variable_value_mapping(self):
         return dict((v.name, v.current_value) for v in self.variables)
 
+    @staticmethod
+    def _index_by_name(items):
+        index = {}
+        for item in items:
+            index.setdefault(item.name, item)
+        return index
+
     def find_state_by_name(self, name):
-        for state in self.states:
-            if state.name == name:
-                return state
-        return None
+        return self._states_by_name.get(name)
 
     def find_variable_by_name(self, name):
-        for variable in self.variables:
-            if variable.name == name:
-                return variable
-        return None
+        return self._variables_by_name.get(name)
+
+    def variable_references(self, variable):
+        # The variables that the values of variable refer to
+        references = []
+        for value in variable.values:
+            for name in Variable.PATTERN.findall(value):
+                referred = self.find_variable_by_name(name)
+                if referred and referred not in references:
+                    references.append(referred)
+        return references
+
+    def _start_resolving(self, variable):
+        # The variables being resolved form a path of references, one back
+        # to a variable on the path closes a cycle of the current values
+        if variable in self._resolving:
+            cycle = self._resolving[self._resolving.index(variable):] + [variable]
+            raise AssertionError('ERROR! Circular variable references: {:s}'.format(
+                ' -> '.join(v.name for v in cycle)))
+        self._resolving.append(variable)
+
+    def _end_resolving(self):
+        self._resolving.pop()
+
+    def _values_changed(self):
+        self._values_version += 1
 
     def write_settings_table(self, output):
         for content in self._settings_table:
@@ -129,16 +162,18 @@ class Action(object):
         self._next_state_name = next_state
         self.condition = condition
         self._machine = None
+        self._next_state = None
 
     def set_machine(self, machine):
         self._machine = machine
-        if not self.next_state:
+        self._next_state = machine.find_state_by_name(self._next_state_name)
+        if not self._next_state:
             raise AssertionError('Invalid end state "{:s}" in '.format(self._next_state_name) +
                                  'action "{:s}"!'.format(self.name))
 
     @property
     def next_state(self):
-        return self._machine.find_state_by_name(self._next_state_name)
+        return self._next_state
 
     def is_available(self):
         if not self.condition:
@@ -163,20 +198,38 @@ class Variable(object):
         self.values = values
         self._current_value = Variable._NO_VALUE
         self._machine = None
+        self._resolved = None
+        self._resolved_version = None
 
     def set_machine(self, machine):
         self._machine = machine
 
     def set_current_value(self, value):
         self._current_value = value
+        if self._machine:
+            self._machine._values_changed()
 
     @property
     def current_value(self):
+        # Resolved once after each change of the machine's values, the
+        # variables it refers to first. Only the current values can close a
+        # reference cycle, so cycles are found here.
         if self._current_value is Variable._NO_VALUE:
             raise AssertionError('No current value set')
-        return self._resolve_value(self._current_value)
+        if self._machine is None:
+            return self._resolve_value(self._current_value)
+        if self._resolved_version != self._machine._values_version:
+            self._machine._start_resolving(self)
+            try:
+                self._resolved = self._resolve_value(self._current_value)
+            finally:
+                self._machine._end_resolving()
+            self._resolved_version = self._machine._values_version
+        return self._resolved
 
     def _resolve_value(self, value):
+        if '${' not in value:
+            return value
         return self.PATTERN.sub(self._resolve_variable, value)
 
     def _resolve_variable(self, var_match):
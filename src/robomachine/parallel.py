@@ -0,0 +1,112 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import multiprocessing
+from array import array
+from collections import deque
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+BATCH_SIZE = 8
+BATCHES_PER_JOB = 2
+CHECK_INTERVAL = 64
+
+# State of a worker process, created once from the pickled machine
+_worker = None
+
+
+class _Worker(object):
+    # Writes the tests of batches of assignments. Batch n is in slot
+    # n % len(counts); counts holds the number of tests each unconsumed
+    # batch has written so far and progress the number of tests the parent
+    # has received and the first batch it has not. A batch stops as soon as
+    # it and the batches before it have written limit tests: the parent
+    # never needs more.
+
+    def __init__(self, strategy_arguments, write_test_body, limit, counts, progress):
+        strategy_class, machine, max_actions, to_state = strategy_arguments
+        self._strategy = strategy_class(machine, max_actions, to_state)
+        self._write_test_body = write_test_body
+        self._limit = limit
+        self._counts = counts
+        self._progress = progress
+
+    def generate(self, batch, number):
+        tests = []
+        machine = self._strategy._machine
+        to_actions = self._strategy.compiled.to_actions
+        for values in batch:
+            current_values, paths = self._strategy.assignment_paths(values)
+            current_values = tuple(current_values)
+            for path in paths:
+                body = StringIO()
+                self._write_test_body(machine, body, to_actions(path), current_values)
+                tests.append((array('i', path).tobytes(), current_values, body.getvalue()))
+                if len(tests) % CHECK_INTERVAL == 0:
+                    self._counts[number % len(self._counts)] = len(tests)
+                    if self._enough(number, len(tests)):
+                        return tests
+                if len(tests) >= self._limit:
+                    return tests
+        return tests
+
+    def _enough(self, number, written):
+        with self._progress.get_lock():
+            received, first = self._progress[0], self._progress[1]
+            earlier = sum(self._counts[n % len(self._counts)] for n in range(first, number))
+        return received + earlier + written >= self._limit
+
+
+def _start_worker(*arguments):
+    global _worker
+    _worker = _Worker(*arguments)
+
+
+def _generate(number, batch):
+    return _worker.generate(batch, number)
+
+
+def parallel_tests(strategy, strategy_arguments, write_test_body, jobs, limit, batch_size=BATCH_SIZE):
+    # Tests of strategy.paths() in the same order as (packed path, values,
+    # body), written by jobs worker processes. Batches of assignments are
+    # handed out in order, BATCHES_PER_JOB per worker at a time, and their
+    # tests are merged back in order.
+    window = BATCHES_PER_JOB * jobs
+    counts = multiprocessing.Array('l', window, lock=False)
+    progress = multiprocessing.Array('l', 2)
+    assignments = iter(strategy.assignments())
+    batches = enumerate(iter(lambda: list(itertools.islice(assignments, batch_size)), []))
+    pool = multiprocessing.Pool(jobs, initializer=_start_worker,
+                                initargs=(strategy_arguments, write_test_body, limit, counts, progress))
+    try:
+        pending = deque(pool.apply_async(_generate, batch) for batch in itertools.islice(batches, window))
+        while pending:
+            tests = pending.popleft().get()
+            with progress.get_lock():
+                progress[0] += len(tests)
+                progress[1] += 1
+            for number, batch in itertools.islice(batches, 1):
+                counts[number % window] = 0
+                pending.append(pool.apply_async(_generate, (number, batch)))
+            for test in tests:
+                yield test
+            if progress[0] >= limit:
+                return
+    finally:
+        pool.terminate()
+        pool.join()
@@ -18,6 +18,7 @@ from pyparsing import (CharsNotIn, Forward, Literal, LineEnd, OneOrMore, Optiona
                        Regex, StringEnd, White, Word, ZeroOrMore,
                        delimitedList, printables,
                        ParseBaseException)
+from . import fastparsing
 from .model import RoboMachine, State, Action, Variable
 from .rules import (AndRule, Condition, EquivalenceRule, OrRule,
                                    NotRule, ImplicationRule, UnequalCondition,
@@ -211,10 +212,30 @@ def resolve_whitespace(text):
     return '\n'.join(output_texts).strip() + '\n'
 
 
-def parse(text):
+PYPARSING = 'pyparsing'
+FAST = 'fast'
+ENGINES = (PYPARSING, FAST)
+
+
+def parse(text, engine=PYPARSING, cache=None):
+    if engine not in ENGINES:
+        raise ValueError('Unknown parser engine "{:s}"'.format(engine))
+    if cache is not None:
+        machine = cache.get(text, engine)
+        if machine is not None:
+            return machine
+    machine = _parse(text, engine)
+    if cache is not None:
+        cache.put(text, machine, engine)
+    return machine
+
+
+def _parse(text, engine):
     try:
+        if engine == FAST:
+            return fastparsing.parse(resolve_whitespace(text))
         return machine.parseString(resolve_whitespace(text), parseAll=True)[0]
-    except ParseBaseException as pe:
+    except (ParseBaseException, fastparsing.ParseError) as pe:
         print('Exception at line {:d}'.format(pe.lineno))
         print(pe.msg)
         print('line: "{:s}"'.format(pe.line))
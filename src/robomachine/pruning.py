@@ -0,0 +1,74 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+from collections import deque
+
+from .decisiondiagram import ModelAnalysis
+
+
+class DeadParts(object):
+    # States no test can reach and actions no test can take, with the
+    # reason for each, found before generation. An action is dead when no
+    # valid variable assignment makes its guard true or when its state is
+    # unreachable, and a state is unreachable when no path of live actions
+    # leads to it from the start state. When the rules can not be analysed
+    # only plain reachability is used and error tells why.
+
+    def __init__(self, machine, analysis=None):
+        self.actions = {}
+        self.states = {}
+        self.error = None
+        if analysis is None:
+            try:
+                analysis = ModelAnalysis(machine)
+            except AssertionError as error:
+                self.error = str(error)
+        if analysis is not None:
+            self._find_dead_guards(machine, analysis)
+        self._find_unreachable_states(machine)
+
+    def _find_dead_guards(self, machine, analysis):
+        if not analysis.valid_assignments:
+            for state in machine.states:
+                for action in state._actions:
+                    self.actions[action] = 'no variable values satisfy the rules'
+            return
+        for _, action, count in analysis.guard_counts():
+            if count == 0:
+                self.actions[action] = 'guard "{:s}" is never true with the rules'.format(str(action.condition))
+
+    def _find_unreachable_states(self, machine):
+        reachable = set([machine.start_state])
+        pending = deque([machine.start_state])
+        while pending:
+            state = pending.popleft()
+            for action in state._actions:
+                if action not in self.actions and action.next_state not in reachable:
+                    reachable.add(action.next_state)
+                    pending.append(action.next_state)
+        for state in machine.states:
+            if state in reachable:
+                continue
+            self.states[state] = 'no live action leads to it from {:s}'.format(machine.start_state.name)
+            for action in state._actions:
+                self.actions.setdefault(action, 'state {:s} is unreachable'.format(state.name))
+
+
+def prune(machine):
+    # Leaves the dead actions out of the compiled machine the strategies
+    # work on. Dead actions are never taken, so the tests do not change,
+    # but their guards are no longer evaluated.
+    dead = DeadParts(machine)
+    machine.dead_actions = frozenset(dead.actions)
+    return dead
@@ -12,6 +12,7 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import operator
 import re
 
 
@@ -27,6 +28,10 @@ class EquivalenceRule(object):
     def is_valid(self, value_mapping):
         return self._condition1.is_valid(value_mapping) == self._condition2.is_valid(value_mapping)
 
+    def compile(self, compiler):
+        return compiler.equivalence(compiler.compile_rule(self._condition1),
+                                    compiler.compile_rule(self._condition2))
+
 
 class ImplicationRule(object):
 
@@ -40,6 +45,10 @@ class ImplicationRule(object):
     def is_valid(self, value_mapping):
         return not self._condition1.is_valid(value_mapping) or self._condition2.is_valid(value_mapping)
 
+    def compile(self, compiler):
+        return compiler.any_of([compiler.negation(compiler.compile_rule(self._condition1)),
+                                compiler.compile_rule(self._condition2)])
+
 
 class AndRule(object):
 
@@ -52,6 +61,9 @@ class AndRule(object):
     def is_valid(self, value_mapping):
         return not(any(not(c.is_valid(value_mapping)) for c in self._conditions))
 
+    def compile(self, compiler):
+        return compiler.all_of([compiler.compile_rule(c) for c in self._conditions])
+
 
 class OrRule(object):
 
@@ -64,6 +76,9 @@ class OrRule(object):
     def is_valid(self, value_mapping):
         return any(c.is_valid(value_mapping) for c in self._conditions)
 
+    def compile(self, compiler):
+        return compiler.any_of([compiler.compile_rule(c) for c in self._conditions])
+
 
 class NotRule(object):
 
@@ -76,6 +91,9 @@ class NotRule(object):
     def is_valid(self, value_mapping):
         return not self._condition.is_valid(value_mapping)
 
+    def compile(self, compiler):
+        return compiler.negation(compiler.compile_rule(self._condition))
+
 
 class Condition(object):
 
@@ -89,6 +107,9 @@ class Condition(object):
     def is_valid(self, value_mapping):
         return value_mapping[self._name].strip() == self._value.strip()
 
+    def compile(self, compiler):
+        return compiler.comparison(self._name, operator.eq, self._value)
+
 
 def UnequalCondition(variable_name, value):
     return NotRule(Condition(variable_name, value))
@@ -106,6 +127,9 @@ class GreaterThanCondition(object):
     def is_valid(self, value_mapping):
         return value_mapping[self._name].strip() > self._value.strip()
 
+    def compile(self, compiler):
+        return compiler.comparison(self._name, operator.gt, self._value)
+
 
 class GreaterThanOrEqualCondition(object):
 
@@ -119,6 +143,9 @@ class GreaterThanOrEqualCondition(object):
     def is_valid(self, value_mapping):
         return value_mapping[self._name].strip() >= self._value.strip()
 
+    def compile(self, compiler):
+        return compiler.comparison(self._name, operator.ge, self._value)
+
 
 class LessThanCondition(object):
 
@@ -132,6 +159,9 @@ class LessThanCondition(object):
     def is_valid(self, value_mapping):
         return value_mapping[self._name].strip() < self._value.strip()
 
+    def compile(self, compiler):
+        return compiler.comparison(self._name, operator.lt, self._value)
+
 
 class LessThanOrEqualCondition(object):
 
@@ -145,6 +175,9 @@ class LessThanOrEqualCondition(object):
     def is_valid(self, value_mapping):
         return value_mapping[self._name].strip() <= self._value.strip()
 
+    def compile(self, compiler):
+        return compiler.comparison(self._name, operator.le, self._value)
+
 
 class RegexCondition(object):
 
@@ -158,6 +191,9 @@ class RegexCondition(object):
     def is_valid(self, value_mapping):
         return re.search(self._value.strip(), value_mapping[self._name].strip()) is not None
 
+    def compile(self, compiler):
+        return compiler.regex(self._name, self._value, negated=False)
+
 
 class RegexNegatedCondition(object):
 
@@ -170,3 +206,155 @@ class RegexNegatedCondition(object):
 
     def is_valid(self, value_mapping):
         return re.search(self._value.strip(), value_mapping[self._name].strip()) is None
+
+    def compile(self, compiler):
+        return compiler.regex(self._name, self._value, negated=True)
+
+
+class _Compiled(object):
+
+    def __init__(self, predicate, cost, probability, reorderable=True):
+        self.predicate = predicate
+        self.cost = cost
+        self.probability = probability
+        self.reorderable = reorderable
+
+
+def _always(values):
+    return True
+
+
+class RuleCompiler(object):
+    # Compiles rules into predicates over a tuple of variable values given in
+    # the order of the variables. Constants are stripped and regular
+    # expressions compiled once. Operands of and/or are evaluated cheapest and
+    # most likely to decide first, estimated from the variable domains.
+    # Operands that may raise (unknown variables) are never reordered.
+    COMPARISON_COST = 1.0
+    REGEX_COST = 4.0
+
+    def __init__(self, variables):
+        self._names = [variable.name for variable in variables]
+        self._indexes = dict((variable.name, index) for index, variable in enumerate(variables))
+        self._domains = [[value.strip() for value in variable.values] for variable in variables]
+
+    def compile(self, rule):
+        return self.compile_rule(rule).predicate
+
+    def compile_all(self, rules):
+        if not rules:
+            return _always
+        return self.all_of([self.compile_rule(rule) for rule in rules]).predicate
+
+    def compile_rule(self, rule):
+        if hasattr(rule, 'compile'):
+            return rule.compile(self)
+        names = self._names
+        is_valid = rule.is_valid
+        return _Compiled(lambda values: is_valid(dict(zip(names, values))),
+                         self.REGEX_COST, 0.5, reorderable=False)
+
+    def comparison(self, name, compare, constant):
+        index = self._indexes.get(name)
+        if index is None:
+            return self._missing(name)
+        return _Compiled(lambda values: compare(values[index].strip(), constant),
+                         self.COMPARISON_COST,
+                         self._probability(index, lambda value: compare(value, constant)))
+
+    def regex(self, name, pattern, negated):
+        index = self._indexes.get(name)
+        if index is None:
+            return self._missing(name)
+        try:
+            search = re.compile(pattern.strip()).search
+        except re.error as error:
+            return self._failing(error)
+        if negated:
+            test = lambda value: search(value) is None
+            predicate = lambda values: search(values[index].strip()) is None
+        else:
+            test = lambda value: search(value) is not None
+            predicate = lambda values: search(values[index].strip()) is not None
+        return _Compiled(predicate, self.REGEX_COST, self._probability(index, test))
+
+    def negation(self, compiled):
+        predicate = compiled.predicate
+        return _Compiled(lambda values: not predicate(values), compiled.cost,
+                         1.0 - compiled.probability, compiled.reorderable)
+
+    def equivalence(self, first, second):
+        predicate1, predicate2 = first.predicate, second.predicate
+        probability = first.probability * second.probability + \
+                      (1.0 - first.probability) * (1.0 - second.probability)
+        return _Compiled(lambda values: predicate1(values) == predicate2(values),
+                         first.cost + second.cost, probability,
+                         first.reorderable and second.reorderable)
+
+    def all_of(self, operands):
+        # Cheapest and most likely to be false first
+        operands = self._ordered(operands, lambda c: c.cost / max(1.0 - c.probability, 1e-9))
+        probability = 1.0
+        for operand in operands:
+            probability *= operand.probability
+        return self._sequence(operands, False, probability)
+
+    def any_of(self, operands):
+        # Cheapest and most likely to be true first
+        operands = self._ordered(operands, lambda c: c.cost / max(c.probability, 1e-9))
+        probability = 1.0
+        for operand in operands:
+            probability *= 1.0 - operand.probability
+        return self._sequence(operands, True, 1.0 - probability)
+
+    @staticmethod
+    def _ordered(operands, key):
+        if all(operand.reorderable for operand in operands):
+            return sorted(operands, key=key)
+        return list(operands)
+
+    @staticmethod
+    def _sequence(operands, decisive, probability):
+        # decisive is the operand result that decides the whole sequence:
+        # True for or, False for and
+        cost, reach = 0.0, 1.0
+        for operand in operands:
+            cost += reach * operand.cost
+            reach *= (1.0 - operand.probability) if decisive else operand.probability
+        reorderable = all(operand.reorderable for operand in operands)
+        predicates = tuple(operand.predicate for operand in operands)
+        if not predicates:
+            return _Compiled(lambda values: not decisive, 0.0, 0.0 if decisive else 1.0)
+        if len(predicates) == 1:
+            return operands[0]
+        if len(predicates) == 2:
+            first, second = predicates
+            if decisive:
+                predicate = lambda values: first(values) or second(values)
+            else:
+                predicate = lambda values: first(values) and second(values)
+            return _Compiled(predicate, cost, probability, reorderable)
+
+        def predicate(values):
+            for operand in predicates:
+                if operand(values) is decisive:
+                    return decisive
+            return not decisive
+        return _Compiled(predicate, cost, probability, reorderable)
+
+    def _probability(self, index, test):
+        domain = self._domains[index]
+        if not domain:
+            return 0.5
+        return sum(1 for value in domain if test(value)) / float(len(domain))
+
+    @classmethod
+    def _missing(cls, name):
+        return cls._failing(KeyError(name))
+
+    @staticmethod
+    def _failing(error):
+        # Raised only when evaluated, as is_valid does
+        def predicate(values):
+            raise error
+        return _Compiled(predicate, 0.0, 0.5, reorderable=False)
@@ -15,20 +15,30 @@
 from __future__ import print_function
 
 import os
+import random
 import re
 import subprocess
 import sys
-from .parsing import RoboMachineParsingException, parse
+from .parsing import RoboMachineParsingException, parse, ENGINES, PYPARSING
+from .cache import CoveringArrayCache, MachineCache
 
-from . import __version__
+from . import __version__, analyze, count_tests
 import argparse
+import functools
 
+from .duplicates import BloomFilter, ExactFilter
+from .equivalence import REPRESENTATIVES, ValuePartition
+from .pruning import DeadParts, prune
+from .allpairsstrategy import AllPairsRandomStrategy
 from .generator import Generator
-from .strategies import DepthFirstSearchStrategy, RandomStrategy
+from .strategies import DepthFirstSearchStrategy, RandomStrategy, ShortestFirstStrategy, SwitchCoverageStrategy, \
+    TransitionTourStrategy
 
 if sys.version_info.major == 3:
     unicode = str
 
+RANDOM_ALGORITHMS = ('random', 'allpairs-random')
+
 parser = argparse.ArgumentParser(description='RoboMachine {:s} - '.format(__version__) +
                                  'a test data generator for Robot Framework',
                                  formatter_class=argparse.RawTextHelpFormatter)
@@ -46,12 +56,86 @@ parser.add_argument('--actions-max', '-a',
                     type=int, default=100,
                     help='maximum number of actions to generate (default 100)')
 parser.add_argument('--generation-algorithm', '-g',
-                    type=str, default='dfs', choices=['dfs', 'random', 'allpairs-random'],
+                    type=str, default='dfs', choices=['dfs', 'random', 'allpairs-random', 'tour', 'switch'],
                     help='''\
 Use test generation algorithm:
-allpairs-random = generate tests randomly, use allpairs algorithm for parameter value selection
+allpairs-random = generate tests randomly, take the variable values from
+                  a covering array of all value pairs (see --strength)
 dfs = depth first search  (default)
-random = generate tests randomly''')
+random = generate tests randomly
+switch = few tests that together take every reachable sequence of
+         N + 1 consecutive actions (N-switch, see --switches)
+tour = few tests that together take every reachable action''')
+parser.add_argument('--switches', '-N',
+                    type=int, default=None,
+                    help='N of the N-switch coverage reported in the coverage\n' +
+                    'summary and targeted by the switch algorithm (default 1\n' +
+                    'with the switch algorithm, otherwise not reported)')
+parser.add_argument('--strength',
+                    type=int, default=2, choices=AllPairsRandomStrategy.STRENGTHS,
+                    help='allpairs-random: cover all value combinations of this\n' +
+                    'many variables (default 2, all pairs)')
+parser.add_argument('--value-classes',
+                    type=str, default=None, choices=REPRESENTATIVES,
+                    help='''\
+dfs and allpairs-random: enumerate one value of each class of values that
+no rule or action guard tells apart, and report the reduction:
+first  = always the first value of the class
+rotate = the values of the class in turn''')
+parser.add_argument('--shortest-first', action='store_true', default=False,
+                    help='dfs: generate the tests with fewest actions first, so that\n' +
+                    'a run cut by --tests-max gets the shortest tests (not used\n' +
+                    'with --jobs, --shard splits by test number)')
+parser.add_argument('--unique-tests', '-u', action='store_true', default=False,
+                    help='random algorithms: never generate the same test twice\n' +
+                    'and stop when there are no new tests left')
+parser.add_argument('--jobs', '-j',
+                    type=int, default=1,
+                    help='number of processes generating dfs tests (default 1,\n' +
+                    'not used with --shard)')
+parser.add_argument('--shard', '-S',
+                    type=str, default=None,
+                    help='generate only shard I of N (given as I/N) of the tests.\n' +
+                    'Test names are the same as without sharding and all\n' +
+                    'shards together give the unsharded tests. With random\n' +
+                    'algorithms every shard needs the same --seed, test n is\n' +
+                    'the n:th random draw and a test drawn in two shards is\n' +
+                    'written by both. With --unique-tests every shard walks\n' +
+                    'all tests, only writing its own')
+parser.add_argument('--duplicate-filter',
+                    type=str, default='exact', choices=['exact', 'bloom'],
+                    help='''\
+Detect duplicate tests with:
+exact = a set of 128 bit test fingerprints (default)
+bloom = a fixed size Bloom filter, skips a new test as a duplicate
+        with at most --false-positive-rate probability''')
+parser.add_argument('--false-positive-rate',
+                    type=float, default=BloomFilter.DEFAULT_FALSE_POSITIVE_RATE,
+                    help='false positive rate of the bloom duplicate filter\n' +
+                    '(default {:g})'.format(BloomFilter.DEFAULT_FALSE_POSITIVE_RATE))
+parser.add_argument('--seed', type=int, default=None,
+                    help='seed for the random generation algorithms')
+parser.add_argument('--parser', '-P',
+                    type=str, default=PYPARSING, choices=ENGINES,
+                    help='''\
+Use machine file parser:
+pyparsing = pyparsing based grammar (default)
+fast = hand written line based parser, much faster with big machines''')
+parser.add_argument('--no-cache', action='store_true', default=False,
+                    help='Do not use or update the cache of parsed machines and\n' +
+                    'allpairs-random covering arrays\n' +
+                    '(default location ~/.cache/robomachine, see ROBOMACHINE_CACHE_DIR)')
+parser.add_argument('--count-only', action='store_true', default=False,
+                    help='Only count the tests dfs would generate without\n' +
+                    '--tests-max, by their number of actions')
+parser.add_argument('--analyze', action='store_true', default=False,
+                    help='Only report how many variable assignments are valid,\n' +
+                    'how many each rule removes and how many enable each\n' +
+                    'action guard')
+parser.add_argument('--prune', action='store_true', default=False,
+                    help='Leave out the states no test can reach and the actions\n' +
+                    'no test can take before generation, and tell why they\n' +
+                    'are not covered')
 parser.add_argument('--do-not-execute', action='store_true', default=False,
                     help='Do not execute generated tests with pybot command')
 parser.add_argument('--generate-dot-graph', '-D',
@@ -63,22 +147,71 @@ png  - bitmap
 svg  - vector''')
 
 
+def _parse_shard(text):
+    match = re.match(r'^(\d+)/(\d+)$', text)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        parser.error('argument --shard: expected I/N with 1 <= I <= N, got "{:s}"'.format(text))
+    return int(match.group(1)), int(match.group(2))
+
+
 def main():
     args = parser.parse_args()
-    generator = Generator()
+    shard = _parse_shard(args.shard) if args.shard else None
+    if shard and args.generation_algorithm in RANDOM_ALGORITHMS and args.seed is None:
+        parser.error('argument --shard: random generation algorithms need --seed')
+    if not 0 < args.false_positive_rate < 1:
+        parser.error('argument --false-positive-rate: expected a rate between 0 and 1')
+    if args.count_only and args.generation_algorithm != 'dfs':
+        parser.error('argument --count-only: only dfs tests can be counted')
+    if args.value_classes and args.generation_algorithm not in ('dfs', 'allpairs-random'):
+        parser.error('argument --value-classes: only used with dfs and allpairs-random')
+    if args.switches is not None and args.switches < 0:
+        parser.error('argument --switches: expected a non-negative number')
+    if args.seed is not None:
+        random.seed(args.seed)
+    switches = 1 if args.generation_algorithm == 'switch' and args.switches is None else args.switches
+    generator = Generator(switches)
     strategy_class = _select_strategy(args.generation_algorithm)
+    if args.shortest_first and args.generation_algorithm == 'dfs':
+        strategy_class = ShortestFirstStrategy
+    if args.generation_algorithm == 'switch':
+        strategy_class = functools.partial(strategy_class, switches=switches)
+    if args.generation_algorithm == 'allpairs-random':
+        strategy_class = functools.partial(strategy_class, strength=args.strength,
+                                           cache=None if args.no_cache else CoveringArrayCache())
+    if args.unique_tests and args.generation_algorithm in RANDOM_ALGORITHMS:
+        strategy_class = functools.partial(strategy_class, unique=True)
+    if args.value_classes:
+        strategy_class = functools.partial(strategy_class, representatives=args.value_classes)
     all_actions = set()
 
     if args.input.endswith('.txt') and not args.output:
         sys.exit('txt input not allowed when no output')
     try:
         with open(args.input, 'r') as inp:
-            machine = parse(inp.read())
+            machine = parse(inp.read(), engine=args.parser,
+                            cache=None if args.no_cache else MachineCache())
     except IOError as e:
         sys.exit(unicode(e))
     except RoboMachineParsingException as e:
         sys.exit(1)
 
+    if args.analyze:
+        try:
+            analysis = analyze(machine)
+        except AssertionError as e:
+            sys.exit(unicode(e))
+        _print_analysis(analysis, DeadParts(machine, analysis))
+        return
+    dead = prune(machine) if args.prune else None
+    if dead:
+        _print_dead_parts(dead)
+    if args.value_classes:
+        _print_value_classes(ValuePartition(machine))
+    if args.count_only:
+        _print_test_counts(machine, args)
+        return
+
     # File names:
     output_base_name = os.path.splitext(args.output or args.input)[0]
     output_test_file = output_base_name + '.robot'
@@ -139,8 +272,12 @@ def main():
                            max_actions=args.actions_max,
                            to_state=args.to_state,
                            output=out,
-                           strategy=strategy_class)
+                           strategy=strategy_class,
+                           jobs=args.jobs,
+                           shard=shard,
+                           duplicate_filter=_select_duplicate_filter(args))
     print('Generated test file: {:s}'.format(output_test_file))
+    _print_memory_usage(generator.duplicate_filter)
 
     # Coverage information:
     covered_states = generator.visited_states
@@ -172,14 +309,19 @@ def main():
     if uncovered_states:
         print('\nUncovered states ({:d}/{:d}):'.format(len(uncovered_states), len(machine.states)))
         for state in uncovered_states:
-            print('    {:s}'.format(state.name))
+            print('    {:s}{:s}'.format(state.name, _dead_reason(dead.states if dead else {}, state)))
     #
     # Uncovered actions:
     if uncovered_actions:
         print('\nUncovered actions ({:d}/{:d}):'.format(len(uncovered_actions), len(all_actions)))
         for action in uncovered_actions:
             action_name = action.name if action.name != '' else '[tau]'
-            print('    {:s} ({:s} -> {:s})'.format(action_name, action._parent_state.name, action.next_state.name))
+            print('    {:s} ({:s} -> {:s}){:s}'.format(action_name, action._parent_state.name, action.next_state.name,
+                                                   _dead_reason(dead.actions if dead else {}, action)))
+    #
+    # N-switch coverage:
+    if switches is not None:
+        _print_switch_coverage(machine, args, switches, generator.visited_sequences)
     print('-' * 78)
 
     # Run tests:
@@ -189,20 +331,104 @@ def main():
         sys.exit(retcode)
 
 
+def _select_duplicate_filter(args):
+    if args.duplicate_filter == 'bloom':
+        return functools.partial(BloomFilter, false_positive_rate=args.false_positive_rate)
+    return ExactFilter
+
+
+def _print_memory_usage(duplicate_filter):
+    print('Duplicate filter ({:s}): {:d} tests in {:.1f} KiB'.format(
+        duplicate_filter.name, len(duplicate_filter), duplicate_filter.memory_usage() / 1024.0))
+    try:
+        import resource
+    except ImportError:
+        return
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024
+    print('Peak memory usage: {:.1f} MiB'.format(peak / 1024.0))
+
+
+def _print_test_counts(machine, args):
+    counts = count_tests(machine, args.actions_max, args.to_state, args.value_classes)
+    print('Tests: {:d}'.format(sum(counts)))
+    print('Tests by number of actions:')
+    for length, count in enumerate(counts):
+        if count:
+            print('  {:6d}  {:d}'.format(length, count))
+
+
+def _print_dead_parts(dead):
+    if dead.error:
+        print('Guards not analysed: {:s}'.format(dead.error))
+    print('Pruned {:d} unreachable states and {:d} dead actions'.format(len(dead.states), len(dead.actions)))
+
+
+def _dead_reason(reasons, element):
+    if element not in reasons:
+        return ''
+    return '  [dead: {:s}]'.format(reasons[element])
+
+
+def _print_analysis(analysis, dead):
+    print('Assignments: {:d}'.format(analysis.assignments))
+    print('Valid assignments: {:d} ({:.1f}%)'.format(
+        analysis.valid_assignments, 100.0 * analysis.valid_assignments / max(analysis.assignments, 1)))
+    impacts = analysis.rule_impacts()
+    if impacts:
+        print('Assignments removed by each rule (alone, by no other rule):')
+        for rule, alone, only in impacts:
+            print('  {:>12d} {:>12d}  {:s}'.format(alone, only, str(rule)))
+    guards = analysis.guard_counts()
+    if guards:
+        print('Valid assignments enabling each guarded action:')
+        for state, action, count in guards:
+            if count is None:
+                text = 'can not be analysed'
+            elif count == 0:
+                text = 'NEVER ENABLED'
+            else:
+                text = '{:d}'.format(count)
+            print('  {:>12s}  {:s}: {:s}  when  {:s}'.format(text, state.name, action.name or '[tau]',
+                                                          str(action.condition)))
+    if dead.states:
+        print('Unreachable states:')
+        for state, reason in dead.states.items():
+            print('  {:s}: {:s}'.format(state.name, reason))
+
+
+def _print_value_classes(partition):
+    before, after = partition.sizes()
+    print('Value classes: {:d} assignments reduced to {:d} ({:.1f}x)'.format(before, after, before / float(after or 1)))
+    for name, values, classes in partition.split_variables():
+        print('  {:s}: {:d} values in {:d} classes'.format(name, values, classes))
+
+
+def _print_switch_coverage(machine, args, switches, visited):
+    # Reachable sequences as the switch algorithm finds them
+    reachable = SwitchCoverageStrategy(machine, args.actions_max, args.to_state, switches).coverable_sequences()
+    uncovered = reachable.difference(visited)
+    print('\n{:d}-switch coverage ({:d}/{:d} sequences of {:d} actions)'.format(
+        switches, len(reachable) - len(uncovered), len(reachable), switches + 1))
+    if uncovered:
+        print('  Uncovered:')
+        for sequence in sorted(uncovered, key=lambda s: [a.name for a in s]):
+            print('    {:s}'.format('  ->  '.join(a.name or '[tau]' for a in sequence)))
+
+
 def _select_strategy(strategy):
     if strategy == 'random':
         return RandomStrategy
     if strategy == 'dfs':
         return DepthFirstSearchStrategy
+    if strategy == 'tour':
+        return TransitionTourStrategy
+    if strategy == 'switch':
+        return SwitchCoverageStrategy
     if strategy == 'allpairs-random':
-        try:
-            from src.robomachine.allpairsstrategy import AllPairsRandomStrategy
-            return AllPairsRandomStrategy
-        except ImportError:
-            print('ERROR! allpairs-random strategy needs the AllPairs module')
-            print('please install it from Python Package Index')
-            print('pip install allpairspy')
-            raise
+        return AllPairsRandomStrategy
 
 
 if __name__ == '__main__':
@@ -11,7 +11,15 @@
 #  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
+import itertools
 import random
+from collections import deque
+
+from .assignments import AssignmentSearch
+from .compiledmachine import CompiledMachine
+from .equivalence import ValuePartition
+from .vectorrules import VectorizedRules
+
 
 class _Strategy(object):
 
@@ -20,68 +28,764 @@ class _Strategy(object):
         self._max_actions = max_actions
         self._to_state = to_state
         assert not to_state or self._machine.find_state_by_name(to_state)
+        self.compiled = CompiledMachine(machine)
+        self._to_states = self.compiled.state_indexes(to_state) if to_state else None
+        self._distances = {}
+        self._counts = {}
+
+    def tests(self):
+        for path, values in self.paths():
+            yield self.compiled.to_actions(path), values
+
+    def _matching_to_state(self, path):
+        return not self._to_state or self.compiled.targets[path[-1]] in self._to_states
 
-    def _matching_to_state(self, test):
-        return not self._to_state or self._to_state == test[-1].next_state.name
+    def _distances_to_target(self, current_values):
+        # Distances to the to state for the actions enabled under the current
+        # values, shared by all assignments that enable the same guards
+        if not self._to_state:
+            return None
+        key = self.compiled.guard_values(current_values)
+        if key not in self._distances:
+            self._distances[key] = self.compiled.distances(self._to_states, current_values)
+        return self._distances[key]
+
+    def _current_values(self):
+        return [v.current_value for v in self._machine.variables]
+
+    def _variable_value_sets(self, variables):
+        # Backtracking search unless checking the whole product with NumPy
+        # is estimated to be cheaper
+        if not variables:
+            return ([],)
+        search = AssignmentSearch(variables, self._machine.rules)
+        vectorized = VectorizedRules.create(variables, self._machine.rules)
+        if vectorized and vectorized.size < VectorizedRules.ROWS_PER_NODE * search.estimated_nodes():
+            return vectorized.valid_assignments()
+        return iter(search)
 
 
 class DepthFirstSearchStrategy(_Strategy):
+    # paths() yields the paths of one assignment after another, so that
+    # the assignments can be split between processes and shards
+    PATHS_BY_ASSIGNMENT = True
 
-    def tests(self):
-        for values in self._variable_value_sets(self._machine.variables):
+    def __init__(self, machine, max_actions, to_state=None, representatives=None):
+        # With representatives (equivalence.FIRST or ROTATE) only one value
+        # of each class of equivalent values is enumerated
+        _Strategy.__init__(self, machine, max_actions, to_state)
+        self._representatives = representatives
+        self.partition = ValuePartition(machine) if representatives else None
+
+    def paths(self):
+        for values in self.assignments():
+            current_values, paths = self.assignment_paths(values)
+            for path in paths:
+                yield path, list(current_values)
+
+    def assignments(self):
+        if self.partition is None:
+            return self._variable_value_sets(self._machine.variables)
+        return self.partition.assignments(self._variable_value_sets(self.partition.variables),
+                                          self._representatives)
+
+    def assignment_count(self, values):
+        # Number of paths assignment_paths(values) yields, counted without
+        # walking them and shared by assignments that enable the same guards
+        self._machine.apply_variable_values(values)
+        current_values = self._current_values()
+        key = self.compiled.guard_values(current_values)
+        if key not in self._counts:
+            self._counts[key] = self._count_paths(current_values)
+        return self._counts[key]
+
+    def length_counts(self):
+        # counts[n] is the number of different tests of n actions paths()
+        # yields, counted for each assignment without walking the paths.
+        # Assignments resolving to the same values have the same tests.
+        variables = self._machine.variables if self.partition is None else self.partition.variables
+        if not self.compiled.predicates and not self._machine.rules and \
+                not any('${' in value for variable in variables for value in variable.values):
+            # Every assignment is valid, different and has the same paths
+            assignments = 1
+            for variable in variables:
+                assignments *= len(variable.values)
+            self._machine.apply_variable_values([variable.values[0] for variable in variables])
+            counts = [count * assignments for count in self._count_paths_by_length(self._current_values())]
+            return _trimmed(counts)
+        counts = []
+        by_guards = {}
+        seen = set()
+        for values in self.assignments():
             self._machine.apply_variable_values(values)
-            for test in self._generate_all_from(self._machine.start_state, self._max_actions):
-                yield test, [v.current_value for v in self._machine.variables]
+            current_values = self._current_values()
+            if tuple(current_values) in seen:
+                continue
+            seen.add(tuple(current_values))
+            key = self.compiled.guard_values(current_values)
+            if key not in by_guards:
+                by_guards[key] = self._count_paths_by_length(current_values)
+            _add_counts(counts, by_guards[key])
+        return _trimmed(counts)
 
-    def _variable_value_sets(self, variables):
-            if not variables:
-                return ([],)
-            return (vs for vs in self._var_set(variables) if self._machine.rules_are_ok(vs))
-
-    def _var_set(self, vars):
-        if not vars:
-            return [[]]
-        return ([val]+sub_set for val in vars[0].values for sub_set in self._var_set(vars[1:]))
-
-    def _generate_all_from(self, state, max_actions):
-        if not state.actions or max_actions == 0:
-            if self._to_state and self._to_state != state.name:
+    def assignment_paths(self, values):
+        # The paths of one variable assignment are independent of the others
+        self._machine.apply_variable_values(values)
+        current_values = self._current_values()
+        return current_values, self._generate_all_from(CompiledMachine.START, self._max_actions, current_values)
+
+    def _count_paths(self, current_values):
+        # paths[s] is the number of paths from state s with the actions left
+        # in the current round, rounds go from 0 up to max actions
+        targets = self.compiled.targets
+        to_states = self._to_states if self._to_state else None
+        states = range(len(self.compiled.states))
+        enabled = self.compiled.enabled_table(current_values)
+        ends = [1 if to_states is None or state in to_states else 0 for state in states]
+        if self._max_actions < 0:
+            return self._count_unlimited_paths(enabled, ends, self._distances_to_target(current_values))
+        paths = list(ends)
+        for _ in range(self._max_actions):
+            previous = paths
+            paths = []
+            for state in states:
+                if not enabled[state]:
+                    paths.append(ends[state])
+                    continue
+                count = sum(previous[targets[action]] for action in enabled[state])
+                if not count and to_states is not None:
+                    count = ends[state]
+                paths.append(count)
+        return paths[CompiledMachine.START]
+
+    def _count_paths_by_length(self, current_values):
+        # As _count_paths with the number of paths of each length: paths[s][n]
+        # is the number of paths of n actions from state s
+        targets = self.compiled.targets
+        to_states = self._to_states if self._to_state else None
+        states = range(len(self.compiled.states))
+        enabled = self.compiled.enabled_table(current_values)
+        ends = [1 if to_states is None or state in to_states else 0 for state in states]
+        if self._max_actions < 0:
+            return self._count_unlimited_paths_by_length(enabled, ends, self._distances_to_target(current_values))
+        paths = [[end] for end in ends]
+        for _ in range(self._max_actions):
+            previous = paths
+            paths = []
+            for state in states:
+                counts = [0]
+                for action in enabled[state]:
+                    _add_counts(counts, previous[targets[action]], 1)
+                if not enabled[state] or (not any(counts) and to_states is not None):
+                    counts = [ends[state]]
+                paths.append(counts)
+        return paths[CompiledMachine.START]
+
+    def _count_unlimited_paths_by_length(self, enabled, ends, distances):
+        targets = self.compiled.targets
+        counts = {}
+        for state in _unlimited_order(enabled, targets, distances):
+            total = [0]
+            for action in enabled[state]:
+                _add_counts(total, counts.get(targets[action], [0]), 1)
+            if not enabled[state] or (not any(total) and self._to_state):
+                total = [ends[state]]
+            counts[state] = total
+        return counts.get(CompiledMachine.START, [0])
+
+    def _count_unlimited_paths(self, enabled, ends, distances):
+        targets = self.compiled.targets
+        counts = {}
+        for state in _unlimited_order(enabled, targets, distances):
+            total = sum(counts.get(targets[action], 0) for action in enabled[state])
+            if not enabled[state] or (not total and self._to_state):
+                total = ends[state]
+            counts[state] = total
+        return counts.get(CompiledMachine.START, 0)
+
+    def _generate_all_from(self, state, max_actions, current_values):
+        # Depth first search with an explicit stack. A frame holds a state on
+        # the path, its enabled actions, the index of the next action to try
+        # and the number of paths yielded when the state was entered. All
+        # frames share one path buffer that is copied when a path is yielded.
+        # States that can not reach the to state within the remaining
+        # actions are not entered: nothing below them would be yielded.
+        enabled, targets = self.compiled.enabled_table(current_values), self.compiled.targets
+        to_states = self._to_states if self._to_state else None
+        distances = self._distances_to_target(current_values)
+        limit = max_actions if max_actions >= 0 else CompiledMachine.UNREACHABLE - 1
+        path = []
+        frames = []
+        # Without a maximum, the states on the path, to find cycles
+        on_path = set()
+        yielded = 0
+        while True:
+            if distances is None or distances[state] <= limit - len(path):
+                actions = enabled[state]
+                if not actions or len(path) == max_actions:
+                    if to_states is None or state in to_states:
+                        yielded += 1
+                        yield list(path)
+                elif max_actions < 0 and state in on_path:
+                    raise AssertionError(_ENDLESS_PATHS)
+                else:
+                    frames.append([state, actions, 0, yielded])
+                    if max_actions < 0:
+                        on_path.add(state)
+            while frames:
+                frame = frames[-1]
+                depth = len(frames) - 1
+                del path[depth:]
+                if frame[2] < len(frame[1]):
+                    action = frame[1][frame[2]]
+                    frame[2] += 1
+                    path.append(action)
+                    state = targets[action]
+                    break
+                frames.pop()
+                on_path.discard(frame[0])
+                if to_states is not None and frame[3] == yielded and frame[0] in to_states:
+                    yielded += 1
+                    yield list(path)
+            else:
+                return
+
+class ShortestFirstStrategy(DepthFirstSearchStrategy):
+    # The depth first search tests ordered by their number of actions, and
+    # in depth first search order among tests of the same length. Each
+    # length is an iterative deepening pass over the assignments. Bit n of
+    # a length mask is set when the search yields a path of n more actions
+    # from a state, so a pass only enters the subtrees holding paths of its
+    # length. The lengths are collected from the assignments first, until
+    # every combination of guard results has been seen.
+    PATHS_BY_ASSIGNMENT = False
+
+    def __init__(self, machine, max_actions, to_state=None, representatives=None):
+        DepthFirstSearchStrategy.__init__(self, machine, max_actions, to_state, representatives)
+        self._masks = {}
+
+    def paths(self):
+        for length in self._lengths():
+            for values in self.assignments():
+                self._machine.apply_variable_values(values)
+                current_values = self._current_values()
+                masks = self._length_masks(current_values)
+                if masks(CompiledMachine.START, 0) >> length & 1:
+                    for path in self._generate_length_from(current_values, masks, length):
+                        yield path, list(current_values)
+
+    def _lengths(self):
+        lengths = 0
+        seen = set()
+        combinations = 2 ** len(self.compiled.predicates)
+        for values in self.assignments():
+            self._machine.apply_variable_values(values)
+            current_values = self._current_values()
+            seen.add(self.compiled.guard_values(current_values))
+            lengths |= self._length_masks(current_values)(CompiledMachine.START, 0)
+            if len(seen) == combinations:
+                break
+        return [length for length in range(lengths.bit_length()) if lengths >> length & 1]
+
+    def _length_masks(self, current_values):
+        # masks(state, depth) is the length mask of state entered at depth
+        key = self.compiled.guard_values(current_values)
+        if key not in self._masks:
+            self._masks[key] = self._compute_length_masks(current_values)
+        return self._masks[key]
+
+    def _compute_length_masks(self, current_values):
+        # As _count_paths with a bit for each length instead of counts
+        targets = self.compiled.targets
+        to_states = self._to_states if self._to_state else None
+        states = range(len(self.compiled.states))
+        enabled = self.compiled.enabled_table(current_values)
+        ends = [1 if to_states is None or state in to_states else 0 for state in states]
+        if self._max_actions < 0:
+            masks = self._unlimited_length_masks(enabled, ends, self._distances_to_target(current_values))
+            return lambda state, depth: masks[state]
+        row = ends
+        rows = [row]
+        for _ in range(self._max_actions):
+            previous = row
+            row = []
+            for state in states:
+                mask = 0
+                for action in enabled[state]:
+                    mask |= previous[targets[action]]
+                row.append(mask << 1 if mask else ends[state])
+            rows.append(row)
+        max_actions = self._max_actions
+        return lambda state, depth: rows[max_actions - depth][state]
+
+    def _unlimited_length_masks(self, enabled, ends, distances):
+        targets = self.compiled.targets
+        masks = [0] * len(self.compiled.states)
+        for state in _unlimited_order(enabled, targets, distances):
+            total = 0
+            for action in enabled[state]:
+                total |= masks[targets[action]]
+            masks[state] = total << 1 if total else ends[state]
+        return masks
+
+    def _generate_length_from(self, current_values, masks, length):
+        # The paths of length actions _generate_all_from yields, in the same
+        # order. Only states with a path of the missing length are entered.
+        enabled, targets = self.compiled.enabled_table(current_values), self.compiled.targets
+        state = CompiledMachine.START
+        path = []
+        frames = []
+        while True:
+            if len(path) == length:
+                yield list(path)
+            else:
+                frames.append([enabled[state], 0])
+            while frames:
+                frame = frames[-1]
+                depth = len(frames)
+                del path[depth - 1:]
+                if frame[1] < len(frame[0]):
+                    action = frame[0][frame[1]]
+                    frame[1] += 1
+                    if masks(targets[action], depth) >> (length - depth) & 1:
+                        path.append(action)
+                        state = targets[action]
+                        break
+                    continue
+                frames.pop()
+            else:
                 return
-            yield []
+
+
+_ENDLESS_PATHS = 'ERROR! Paths through a cycle of actions never end, set the maximum number of actions'
+
+
+def _unlimited_order(enabled, targets, distances=None):
+    # The states reachable from the start state, each after the states its
+    # enabled actions lead to, found with an explicit stack. With distances
+    # to the to state, states that can not reach it are left out. Paths
+    # without a maximum number of actions never end on a cycle.
+    def entered(state):
+        return distances is None or distances[state] != CompiledMachine.UNREACHABLE
+    if not entered(CompiledMachine.START):
+        return []
+    order = []
+    done = set()
+    on_path = set([CompiledMachine.START])
+    stack = [(CompiledMachine.START, iter(enabled[CompiledMachine.START]))]
+    while stack:
+        state, actions = stack[-1]
+        for action in actions:
+            target = targets[action]
+            if target in done or not entered(target):
+                continue
+            if target in on_path:
+                raise AssertionError(_ENDLESS_PATHS)
+            on_path.add(target)
+            stack.append((target, iter(enabled[target])))
+            break
         else:
-            at_least_one_generated = False
-            for action in state.actions:
-                for test in self._generate_all_from(action.next_state, max_actions-1):
-                    at_least_one_generated = True
-                    yield [action]+test
-            if not at_least_one_generated and self._to_state == state.name:
-                yield []
+            stack.pop()
+            on_path.discard(state)
+            done.add(state)
+            order.append(state)
+    return order
+
+
+def _add_counts(counts, other, shift=0):
+    # Adds the counts by length of other, shifted by shift actions
+    if len(counts) < len(other) + shift:
+        counts.extend([0] * (len(other) + shift - len(counts)))
+    for length, count in enumerate(other, shift):
+        counts[length] += count
+
+
+def _trimmed(counts):
+    while counts and not counts[-1]:
+        counts.pop()
+    return counts
+
+
+class _WalkTree(object):
+    # The random walks taken under one assignment of current values. A node
+    # is [children, open]: children maps the actions taken from it to their
+    # nodes, or to None once every walk through them has been taken, and
+    # open is the number of such unsaturated actions (None before the node
+    # is first entered). paths holds the trimmed paths already produced.
+
+    def __init__(self):
+        self.root = [{}, None]
+        self.paths = set()
+
+    def saturated(self):
+        return self.root[1] == 0
 
 
 class RandomStrategy(_Strategy):
+    # With unique=True no test is produced twice: a walk only takes
+    # actions with walks not taken before and paths() ends once all walks
+    # of all valid assignments are taken, or with more than
+    # MAX_INDEXED_ASSIGNMENTS of them, once draws keep finding none.
+    MAX_INDEXED_ASSIGNMENTS = 100000
+    MAX_REJECTED_DRAWS = 1000
 
-    def tests(self):
-        while True:
-            test = self._generate_test(self._generate_variable_values())
-            if not test and self._to_state and self._to_state != self._machine.start_state.name:
+    def __init__(self, machine, max_actions, to_state=None, unique=False):
+        _Strategy.__init__(self, machine, max_actions, to_state)
+        self._unique = unique
+        self._walk_trees = {}
+        self._valid_assignments = None
+        self._random = random
+
+    @property
+    def paths_by_draw(self):
+        # Without unique each test is drawn on its own, see draws
+        return not self._unique
+
+    def paths(self):
+        if self._unique:
+            for test in self._unique_paths():
+                yield test
+            return
+        for _, path, values in self.draws(itertools.count()):
+            yield path, values
+
+    def draws(self, indexes):
+        # (index, path, values) of the tests drawn at the given increasing
+        # indexes. Each draw takes its random numbers from a substream of
+        # its own, seeded by a number from the random module and the index,
+        # so a draw is made without the draws before it. Assignments are
+        # drawn from those that reach the to state within max_actions, so
+        # every walk ends in it.
+        seed = random.getrandbits(64)
+        for index in indexes:
+            self._random = self._substream(seed, index)
+            yield index, self._generate_path(self._generate_variable_values()), self._current_values()
+
+    def _unique_paths(self):
+        # Valid assignments reaching the to state are drawn uniformly from
+        # those that still have new paths and dropped once they have none
+        if self._valid_assignments is None:
+            self._valid_assignments = self._index_valid_assignments()
+        if not self._valid_assignments:
+            for test in self._sampled_unique_paths():
+                yield test
+            return
+        assignments = list(self._valid_assignments)
+        while assignments:
+            index = self._random.randrange(len(assignments))
+            path = self._generate_unique_path(assignments[index])
+            if path is None:
+                assignments[index] = assignments[-1]
+                assignments.pop()
+                continue
+            yield path, self._current_values()
+
+    def _sampled_unique_paths(self):
+        # Too many assignments to list: they are drawn by rejection and
+        # those without new paths are remembered. Paths end once
+        # MAX_REJECTED_DRAWS draws in a row find no new path.
+        exhausted = set()
+        rejected = 0
+        while rejected < self.MAX_REJECTED_DRAWS:
+            values = self._generate_variable_values()
+            path = None if tuple(values) in exhausted else self._generate_unique_path(values)
+            if path is None:
+                exhausted.add(tuple(values))
+                rejected += 1
                 continue
-            yield test, [v.current_value for v in self._machine.variables]
+            rejected = 0
+            yield path, self._current_values()
 
-    def _generate_test(self, values):
-        test = []
+    def _generate_path(self, values):
+        path = []
         self._machine.apply_variable_values(values)
-        current_state = self._machine.start_state
-        while self._max_actions > len(test) and current_state.actions:
-            action = random.choice(current_state.actions)
-            current_state = action.next_state
-            test.append(action)
-        while test and not self._matching_to_state(test):
-            test.pop()
-        return test
+        current_values = self._current_values()
+        enabled, targets = self.compiled.enabled_table(current_values), self.compiled.targets
+        distances = self._distances_to_target(current_values)
+        state = CompiledMachine.START
+        while True:
+            actions = self._walk_actions(state, len(path), enabled, distances)
+            if not actions:
+                break
+            action = self._random.choice(actions)
+            state = targets[action]
+            path.append(action)
+        self._trim(path)
+        return path
+
+    def _generate_unique_path(self, values):
+        # A path not produced before under the same current values, or None
+        # when every walk has been taken
+        self._machine.apply_variable_values(values)
+        current_values = self._current_values()
+        tree = self._walk_trees.setdefault(tuple(current_values), _WalkTree())
+        enabled = self.compiled.enabled_table(current_values)
+        distances = self._distances_to_target(current_values)
+        while not tree.saturated():
+            path = self._take_new_walk(tree, enabled, distances)
+            self._trim(path)
+            if not path and self._to_state and self._to_state != self._machine.start_state.name:
+                continue
+            if tuple(path) not in tree.paths:
+                tree.paths.add(tuple(path))
+                return path
+        return None
+
+    def _take_new_walk(self, tree, enabled, distances):
+        # Random walk through unsaturated actions only. Its last node is then
+        # saturated and so are the ancestors left without unsaturated actions.
+        targets = self.compiled.targets
+        node = tree.root
+        taken = []
+        path = []
+        state = CompiledMachine.START
+        while True:
+            actions = self._walk_actions(state, len(path), enabled, distances)
+            children = node[0]
+            if node[1] is None:
+                node[1] = len(actions)
+            actions = [action for action in actions if action not in children or children[action] is not None]
+            if not actions:
+                break
+            action = self._random.choice(actions)
+            taken.append(node)
+            node = children.setdefault(action, [{}, None])
+            state = targets[action]
+            path.append(action)
+        node[1] = 0
+        for parent, action in zip(reversed(taken), reversed(path)):
+            parent[0][action] = None
+            parent[1] -= 1
+            if parent[1]:
+                break
+        return path
+
+    def _walk_actions(self, state, length, enabled, distances):
+        if length >= self._max_actions:
+            return ()
+        actions = enabled[state]
+        if distances is not None:
+            # Only actions that can still end in the to state
+            remaining = self._max_actions - length - 1
+            targets = self.compiled.targets
+            actions = [action for action in actions if distances[targets[action]] <= remaining]
+        return actions
+
+    def _trim(self, path):
+        while path and not self._matching_to_state(path):
+            path.pop()
 
     def _generate_variable_values(self):
+        # Uniformly from the valid assignments, by index when they are few
+        # enough to list and by rejection otherwise
+        if self._valid_assignments is None:
+            self._valid_assignments = self._index_valid_assignments()
+        if len(self._valid_assignments) == 1:
+            return list(self._valid_assignments[0])
+        if self._valid_assignments:
+            return list(self._random.choice(self._valid_assignments))
         while True:
-            candidate = [random.choice(v.values) for v in self._machine.variables]
-            if self._machine.rules_are_ok(candidate):
+            candidate = [self._random.choice(v.values) for v in self._machine.variables]
+            if self.compiled.rules_are_ok(candidate) and self._reaches_to_state(candidate):
                 return candidate
 
+    def _index_valid_assignments(self):
+        # Empty when there are more than MAX_INDEXED_ASSIGNMENTS. With a to
+        # state only the assignments reaching it are kept.
+        valid = iter(self._variable_value_sets(self._machine.variables))
+        first = next(valid, None)
+        if first is None:
+            raise AssertionError('ERROR! No variable values satisfy the rules')
+        valid = itertools.chain([first], valid)
+        if self._to_state:
+            valid = (values for values in valid if self._reaches_to_state(values))
+        assignments = [tuple(values) for values in itertools.islice(valid, self.MAX_INDEXED_ASSIGNMENTS + 1)]
+        if not assignments:
+            raise AssertionError('ERROR! No valid variable values reach state {:s} within {:d} actions'.format(
+                self._to_state, self._max_actions))
+        if len(assignments) > self.MAX_INDEXED_ASSIGNMENTS:
+            return ()
+        return assignments
+
+    @staticmethod
+    def _substream(seed, index):
+        return random.Random('{:d}:{:d}'.format(seed, index))
+
+    def _reaches_to_state(self, values):
+        if not self._to_state:
+            return True
+        self._machine.apply_variable_values(values)
+        distance = self._distances_to_target(self._current_values())[CompiledMachine.START]
+        return distance <= max(self._max_actions, 0)
+
+
+class _TourAssignment(object):
+    # An assignment of the variables with its table of enabled actions, the
+    # distances to the to state (None without one) and the action sequences
+    # that a test of at most limit actions can take under it
+
+    def __init__(self, values, current_values, enabled, distances, coverable):
+        self.values = values
+        self.current_values = current_values
+        self.enabled = enabled
+        self.distances = distances
+        self.coverable = coverable
+
+
+class TransitionTourStrategy(_Strategy):
+    # A small set of tests that together take every sequence of switches + 1
+    # consecutive actions (every action with switches=0) some valid
+    # assignment enables within max actions, ending in the to state when one
+    # is given. Each test uses the assignment enabling the most sequences not
+    # taken yet and walks to the nearest such sequence until none is in
+    # reach. The walks are searched over nodes (state, last switches
+    # actions), so a sequence is one step from its node.
+    # Assignments that give the guards the same results are interchangeable,
+    # the first one of them is used. The search for them ends when all
+    # combinations of guard results or all sequences are found, or after
+    # MAX_ASSIGNMENTS valid assignments.
+    MAX_ASSIGNMENTS = 100000
+
+    def __init__(self, machine, max_actions, to_state=None, switches=0):
+        _Strategy.__init__(self, machine, max_actions, to_state)
+        if switches < 0:
+            raise AssertionError('ERROR! Number of switches can not be negative')
+        self._switches = switches
+
+    def paths(self):
+        assignments = self._tour_assignments()
+        untaken = set()
+        for assignment in assignments:
+            untaken.update(assignment.coverable)
+        if not untaken:
+            if assignments and (self._to_state is None or CompiledMachine.START in self._to_states):
+                yield [], list(assignments[0].current_values)
+            return
+        while untaken:
+            assignment = max(assignments, key=lambda a: len(a.coverable & untaken))
+            path = self._tour(assignment, untaken)
+            untaken.difference_update(self._sequences(path))
+            yield path, list(assignment.current_values)
+
+    def coverable_sequences(self):
+        # The action sequences the tests take together, as actions
+        coverable = set()
+        for assignment in self._tour_assignments():
+            coverable.update(assignment.coverable)
+        return set(tuple(self.compiled.to_actions(sequence)) for sequence in coverable)
+
+    def _limit(self):
+        return self._max_actions if self._max_actions >= 0 else CompiledMachine.UNREACHABLE - 1
+
+    def _sequences(self, path):
+        length = self._switches + 1
+        return [tuple(path[i:i + length]) for i in range(len(path) - length + 1)]
+
+    def _step(self, node, action):
+        window = (node[1] + (action,))[-self._switches:] if self._switches else ()
+        return self.compiled.targets[action], window
+
+    def _sequence(self, node, action):
+        # The sequence taken by action from node, None when it is shorter
+        if len(node[1]) < self._switches:
+            return None
+        return node[1] + (action,)
+
+    def _tour_assignments(self):
+        assignments = []
+        seen = set()
+        coverable = set()
+        combinations = 2 ** len(self.compiled.predicates)
+        for values in itertools.islice(self._variable_value_sets(self._machine.variables), self.MAX_ASSIGNMENTS):
+            self._machine.apply_variable_values(values)
+            current_values = self._current_values()
+            key = self.compiled.guard_values(current_values)
+            if key in seen:
+                continue
+            seen.add(key)
+            enabled = self.compiled.enabled_table(current_values)
+            distances = self._distances_to_target(current_values)
+            assignments.append(_TourAssignment(list(values), current_values, enabled, distances,
+                                               self._coverable(enabled, distances)))
+            coverable.update(assignments[-1].coverable)
+            if len(seen) == combinations or (not self._switches and len(coverable) == len(self.compiled.actions)):
+                break
+        return assignments
+
+    def _coverable(self, enabled, distances):
+        # Sequences ending at most limit actions from the start with the to
+        # state still reachable within the limit
+        targets = self.compiled.targets
+        limit = self._limit()
+        start = (CompiledMachine.START, ())
+        depths = {start: 0}
+        queue = deque([start])
+        coverable = set()
+        while queue:
+            node = queue.popleft()
+            for action in enabled[node[0]]:
+                if depths[node] + 1 + (distances[targets[action]] if distances else 0) > limit:
+                    continue
+                sequence = self._sequence(node, action)
+                if sequence is not None:
+                    coverable.add(sequence)
+                following = self._step(node, action)
+                if following not in depths:
+                    depths[following] = depths[node] + 1
+                    queue.append(following)
+        return coverable
+
+    def _tour(self, assignment, untaken):
+        targets = self.compiled.targets
+        path = []
+        node = (CompiledMachine.START, ())
+        untaken = set(untaken) & assignment.coverable
+        while untaken:
+            steps = self._nearest_untaken(assignment, node, self._limit() - len(path), untaken)
+            if steps is None:
+                break
+            for action in steps:
+                node = self._step(node, action)
+            path.extend(steps)
+            untaken.difference_update(self._sequences(path))
+        state = node[0]
+        distances = assignment.distances
+        while distances and distances[state]:
+            # Shortest way to the to state
+            action = next(action for action in assignment.enabled[state]
+                          if distances[targets[action]] == distances[state] - 1)
+            path.append(action)
+            state = targets[action]
+        return path
+
+    def _nearest_untaken(self, assignment, start, remaining, untaken):
+        # Breadth first search for the shortest walk from node start that
+        # ends with an untaken sequence and leaves the to state within
+        # remaining actions, None when there is none
+        enabled, distances, targets = assignment.enabled, assignment.distances, self.compiled.targets
+        parents = {start: None}
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            for action in enabled[node[0]]:
+                if depth + 1 + (distances[targets[action]] if distances else 0) > remaining:
+                    continue
+                if self._sequence(node, action) in untaken:
+                    steps = [action]
+                    while parents[node] is not None:
+                        node, previous = parents[node]
+                        steps.append(previous)
+                    return steps[::-1]
+                following = self._step(node, action)
+                if following not in parents:
+                    parents[following] = (node, action)
+                    queue.append((following, depth + 1))
+        return None
+
+
+class SwitchCoverageStrategy(TransitionTourStrategy):
+    # Tests taking every reachable sequence of switches + 1 consecutive
+    # actions, action pairs by default
+
+    def __init__(self, machine, max_actions, to_state=None, switches=1):
+        TransitionTourStrategy.__init__(self, machine, max_actions, to_state, switches)
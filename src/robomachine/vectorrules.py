@@ -0,0 +1,153 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class _NotVectorizable(Exception):
+    pass
+
+
+class VectorizedRules(object):
+    # Evaluates the machine rules over the whole Cartesian product of the
+    # variable values with NumPy, one chunk of the product at a time.
+    # Assignment i of the product encodes the value of each variable as an
+    # integer code (the first variable is the most significant digit, as in
+    # itertools.product) and every condition is a truth table over the values
+    # of its variable.
+    CHUNK_SIZE = 1 << 16
+    MIN_PRODUCT = 1024
+    MAX_PRODUCT = 1 << 62
+    # Checking one assignment here costs about as much as 1/16 of a value
+    # tried by assignments.AssignmentSearch
+    ROWS_PER_NODE = 16
+
+    def __init__(self, variables, rules, chunk_size=CHUNK_SIZE):
+        if numpy is None:
+            raise _NotVectorizable('NumPy is not installed')
+        self._domains = [list(variable.values) for variable in variables]
+        self._sizes = [len(domain) for domain in self._domains]
+        self.size = 1
+        for size in self._sizes:
+            self.size *= size
+        if self.size > self.MAX_PRODUCT:
+            raise _NotVectorizable('Too many assignments')
+        self._strides = []
+        stride = 1
+        for size in reversed(self._sizes):
+            self._strides.insert(0, stride)
+            stride *= size
+        self._chunk_size = chunk_size
+        self._evaluate = _VectorCompiler(variables).compile_all(rules)
+
+    @classmethod
+    def create(cls, variables, rules, min_product=MIN_PRODUCT):
+        # None when NumPy is missing, the product is too small to be worth it
+        # or some rule can not be vectorized
+        try:
+            vectorized = cls(variables, rules)
+        except _NotVectorizable:
+            return None
+        if vectorized.size < min_product:
+            return None
+        return vectorized
+
+    def valid_indexes(self):
+        for start, codes, mask in self._chunks():
+            yield start + numpy.flatnonzero(mask)
+
+    def valid_assignments(self):
+        domains = self._domains
+        for _, codes, mask in self._chunks():
+            columns = [domain_codes[mask].tolist() for domain_codes in codes]
+            for row in zip(*columns):
+                yield [domains[index][code] for index, code in enumerate(row)]
+
+    def count(self):
+        return sum(int(numpy.count_nonzero(mask)) for _, _, mask in self._chunks())
+
+    def _chunks(self):
+        for start in range(0, self.size, self._chunk_size):
+            flat = numpy.arange(start, min(start + self._chunk_size, self.size), dtype=numpy.int64)
+            codes = [(flat // stride) % size for stride, size in zip(self._strides, self._sizes)]
+            yield start, codes, self._evaluate(codes, len(flat))
+
+
+class _VectorCompiler(object):
+    # Same interface as rules.RuleCompiler: rules compile themselves by
+    # calling these methods. Results are functions from the code columns of
+    # a chunk to a boolean mask.
+
+    def __init__(self, variables):
+        self._indexes = dict((variable.name, index) for index, variable in enumerate(variables))
+        self._domains = [[value.strip() for value in variable.values] for variable in variables]
+
+    def compile_all(self, rules):
+        if not rules:
+            return lambda codes, length: numpy.ones(length, dtype=bool)
+        evaluate = self.all_of([self.compile_rule(rule) for rule in rules])
+        return lambda codes, length: evaluate(codes)
+
+    def compile_rule(self, rule):
+        if not hasattr(rule, 'compile'):
+            raise _NotVectorizable('Rule {:s} can not be vectorized'.format(type(rule).__name__))
+        return rule.compile(self)
+
+    def comparison(self, name, compare, constant):
+        return self._table(name, lambda value: compare(value, constant))
+
+    def regex(self, name, pattern, negated):
+        try:
+            search = re.compile(pattern.strip()).search
+        except re.error as error:
+            raise _NotVectorizable(str(error))
+        return self._table(name, lambda value: (search(value) is None) == negated)
+
+    def negation(self, evaluate):
+        return lambda codes: ~evaluate(codes)
+
+    def equivalence(self, first, second):
+        return lambda codes: first(codes) == second(codes)
+
+    def all_of(self, operands):
+        return self._reduce(operands, numpy.logical_and, True)
+
+    def any_of(self, operands):
+        return self._reduce(operands, numpy.logical_or, False)
+
+    @staticmethod
+    def _reduce(operands, combine, empty):
+        if not operands:
+            return lambda codes: numpy.full(len(codes[0]) if codes else 1, empty, dtype=bool)
+        if len(operands) == 1:
+            return operands[0]
+
+        def evaluate(codes):
+            result = operands[0](codes)
+            for operand in operands[1:]:
+                result = combine(result, operand(codes))
+            return result
+        return evaluate
+
+    def _table(self, name, test):
+        index = self._indexes.get(name)
+        if index is None:
+            raise _NotVectorizable('Unknown variable {:s}'.format(name))
+        table = numpy.array([test(value) for value in self._domains[index]], dtype=bool)
+        return lambda codes: table[codes[index]]
@@ -0,0 +1,101 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import random
+import unittest
+from src.robomachine.assignments import AssignmentSearch
+from src.robomachine.model import RoboMachine, State, Variable
+from src.robomachine.rules import (Condition, UnequalCondition, ImplicationRule,
+                                   OrRule, AndRule, NotRule, RegexCondition)
+
+
+class AssignmentSearchTestCase(unittest.TestCase):
+
+    def _machine(self, variables, rules):
+        return RoboMachine([State('start', [], [])], variables, rules)
+
+    def _filtered(self, machine):
+        return [list(values) for values in itertools.product(*[v.values for v in machine.variables])
+                if machine.rules_are_ok(values)]
+
+    def _random_machine(self, rnd):
+        variables = [Variable('${{V{:d}}}'.format(i), ['v{:d}'.format(v) for v in range(rnd.randrange(1, 5))])
+                     for i in range(rnd.randrange(1, 6))]
+
+        def condition():
+            variable = rnd.choice(variables)
+            kind = rnd.choice([Condition, UnequalCondition, RegexCondition])
+            return kind(variable.name, rnd.choice(variable.values + ['v[12]']))
+        rules = []
+        for _ in range(rnd.randrange(0, 6)):
+            rule = rnd.choice([lambda: ImplicationRule(condition(), condition()),
+                               lambda: OrRule([condition(), condition()]),
+                               lambda: NotRule(AndRule([condition(), condition()])),
+                               condition])()
+            rules.append(rule)
+        return self._machine(variables, rules)
+
+    def test_same_assignments_as_filtering_the_product(self):
+        rnd = random.Random(42)
+        for _ in range(200):
+            machine = self._random_machine(rnd)
+            expected = self._filtered(machine)
+            self.assertEqual(expected, list(AssignmentSearch(machine.variables, machine.rules)))
+            pruning = AssignmentSearch(machine.variables, machine.rules, ordered=False)
+            self.assertEqual(sorted(expected), sorted(pruning))
+            self.assertEqual(len(expected), pruning.count())
+
+    def test_rules_are_checked_when_their_variables_are_bound(self):
+        variables = [Variable('${A}', ['1', '2']), Variable('${B}', ['1', '2']), Variable('${C}', ['1', '2'])]
+        rules = [Condition('${C}', '1'), Condition('${A}', '2')]
+        search = AssignmentSearch(variables, rules, ordered=False)
+        self.assertEqual([0, 2], sorted(search.order[:2]))
+        self.assertEqual([['2', '1', '1'], ['2', '2', '1']], sorted(search))
+        self.assertEqual(2 + 2 + 4, AssignmentSearch(variables, rules).estimated_nodes())
+
+    def test_unanalysable_rules_are_checked_on_complete_assignments(self):
+        variables = [Variable('${A}', ['1', '2'])]
+        rules = [Condition('${A}', '1'), Condition('${UNKNOWN}', '1')]
+        search = AssignmentSearch(variables, rules)
+        self.assertRaises(KeyError, list, search)
+
+    def test_completion_agrees_with_fixed_values(self):
+        rnd = random.Random(7)
+        for _ in range(100):
+            machine = self._random_machine(rnd)
+            variables = list(machine.variables)
+            valid = self._filtered(machine)
+            search = AssignmentSearch(variables, machine.rules, ordered=False)
+            fixed = [rnd.choice(v.values + [None]) for v in variables]
+            agreeing = [values for values in valid
+                        if all(f is None or f == value for f, value in zip(fixed, values))]
+            completion = search.completion(fixed)
+            if agreeing:
+                self.assertTrue(completion in agreeing)
+            else:
+                self.assertEqual(None, completion)
+
+    def test_constrained_positions(self):
+        variables = [Variable('${A}', ['1', '2']), Variable('${B}', ['1', '2']), Variable('${C}', ['1', '2'])]
+        self.assertEqual(frozenset([0, 2]), AssignmentSearch(variables, [ImplicationRule(
+            Condition('${C}', '1'), Condition('${A}', '2'))]).constrained)
+        self.assertEqual(None, AssignmentSearch(variables, [Condition('${UNKNOWN}', '1')]).constrained)
+
+    def test_no_variables(self):
+        self.assertEqual([[]], list(AssignmentSearch([], [])))
+
+
+if __name__ == '__main__':
+    unittest.main()
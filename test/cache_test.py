@@ -0,0 +1,172 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+try:
+    from StringIO import StringIO
+except:
+    from io import StringIO
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from src import robomachine
+from src.robomachine.allpairsstrategy import AllPairsRandomStrategy, _RuleSignature
+from src.robomachine.cache import CoveringArrayCache, MachineCache
+from src.robomachine.model import RoboMachine, State, Variable
+from src.robomachine.parsing import FAST, PYPARSING
+from src.robomachine.rules import Condition, ImplicationRule, RegexCondition, UnequalCondition
+from test.robomachina_test import _MACHINA, _TESTS
+from test.variable_test import _LOGIN_MACHINE, _LOGIN_TESTS_GENERATE_ALL_DFS
+
+
+class MachineCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._cache = MachineCache(self._directory)
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _entry(self, text):
+        return self._cache._path(MachineCache._text(text, PYPARSING))
+
+    def test_miss_returns_none(self):
+        self.assertEqual(None, self._cache.get(_MACHINA))
+
+    def test_cached_machine_generates_same_tests(self):
+        robomachine.parse(_LOGIN_MACHINE, cache=self._cache)
+        machine = self._cache.get(_LOGIN_MACHINE)
+        self.assertEqual(['Login Page', 'Welcome Page', 'Error Page'], [s.name for s in machine.states])
+        out = StringIO()
+        robomachine.generate(machine, output=out)
+        self.assertEqual(_LOGIN_TESTS_GENERATE_ALL_DFS, out.getvalue())
+
+    def test_cached_tables_are_written(self):
+        robomachine.parse(_MACHINA, cache=self._cache)
+        out = StringIO()
+        robomachine.generate(robomachine.parse(_MACHINA, cache=self._cache), output=out)
+        self.assertEqual(_TESTS, out.getvalue())
+
+    def test_hit_does_not_parse(self):
+        self._cache.put('not a machine', robomachine.parse(_MACHINA))
+        machine = robomachine.parse('not a machine', cache=self._cache)
+        self.assertEqual(['Start State', 'End State'], [s.name for s in machine.states])
+
+    def test_key_depends_on_version(self):
+        self._cache.put(_MACHINA, robomachine.parse(_MACHINA))
+        self.assertEqual(None, MachineCache(self._directory, version='0.0.0').get(_MACHINA))
+
+    def test_key_depends_on_format(self):
+        self._cache.put(_MACHINA, robomachine.parse(_MACHINA))
+        cache = MachineCache(self._directory)
+        cache.FORMAT += 1
+        self.assertEqual(None, cache.get(_MACHINA))
+
+    def test_key_depends_on_parser_engine(self):
+        robomachine.parse(_MACHINA, engine=FAST, cache=self._cache)
+        self.assertNotEqual(None, self._cache.get(_MACHINA, engine=FAST))
+        self.assertEqual(None, self._cache.get(_MACHINA, engine=PYPARSING))
+
+    def test_corrupted_entry_is_a_miss(self):
+        self._cache.put(_MACHINA, robomachine.parse(_MACHINA))
+        with open(self._entry(_MACHINA), 'wb') as data:
+            data.write(b'garbage')
+        self.assertEqual(None, self._cache.get(_MACHINA))
+        self.assertFalse(os.path.exists(self._entry(_MACHINA)))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        texts = [_MACHINA, _LOGIN_MACHINE, _MACHINA + '\n']
+        for age, text in enumerate(texts):
+            self._cache.put(text, robomachine.parse(text))
+            os.utime(self._entry(text), (age, age))
+        self._cache.get(_MACHINA)
+        self._cache.max_size = sum(os.path.getsize(self._entry(t)) for t in texts[:2])
+        self._cache.put(_MACHINA + '\n\n', robomachine.parse(_MACHINA))
+        self.assertNotEqual(None, self._cache.get(_MACHINA))
+        self.assertEqual(None, self._cache.get(_LOGIN_MACHINE))
+
+
+class CoveringArrayCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._cache = CoveringArrayCache(self._directory)
+
+    def tearDown(self):
+        shutil.rmtree(self._directory)
+
+    def _machine(self, values, rules=()):
+        variables = [Variable('${{V{:d}}}'.format(i), list(domain)) for i, domain in enumerate(values)]
+        return RoboMachine([State('s', [], [])], variables, list(rules))
+
+    def _tests(self, machine, cache):
+        random.seed(7)
+        return list(AllPairsRandomStrategy(machine, 1, 's', cache=cache).tests())
+
+    def test_rows_round_trip(self):
+        rows = [[0, None, 2], [1, 1, None]]
+        self.assertTrue(self._cache.put([2, 2, 300], 2, 'rules', rows))
+        self.assertEqual(rows, self._cache.get([2, 2, 300], 2, 'rules'))
+        self.assertEqual(None, self._cache.get([2, 2, 300], 3, 'rules'))
+        self._cache.put([], 2, 'rules', [[]])
+        self.assertEqual([[]], self._cache.get([], 2, 'rules'))
+
+    def test_shares_directory_with_machine_cache(self):
+        machines = MachineCache(self._directory)
+        machines.put(_MACHINA, robomachine.parse(_MACHINA))
+        self._cache.put([2, 2], 2, 'rules', [[0, 1]])
+        self.assertFalse(isinstance(self._cache, MachineCache))
+        self.assertEqual(1, len(machines._entries()))
+        self._cache.clear()
+        self.assertEqual(None, self._cache.get([2, 2], 2, 'rules'))
+        self.assertEqual(['Start State', 'End State'], [s.name for s in machines.get(_MACHINA).states])
+
+    def test_cached_array_gives_same_tests(self):
+        machine = self._machine(['abc', 'def', 'gh', 'ij'], [ImplicationRule(Condition('${V0}', 'a'),
+                                                                              UnequalCondition('${V1}', 'd'))])
+        uncached = self._tests(machine, None)
+        self.assertEqual(uncached, self._tests(machine, self._cache))
+        self.assertEqual(1, len(self._cache._entries()))
+        self.assertEqual(uncached, self._tests(machine, self._cache))
+
+    def test_hit_does_not_generate(self):
+        machine = self._machine(['ab', 'cd'])
+        self._cache.put([2, 2], 2, _RuleSignature(list(machine.variables)).signature([]), [[1, None]])
+        tests = self._tests(machine, self._cache)
+        self.assertEqual(1, len(tests))
+        self.assertEqual('b', tests[0][1][0])
+
+    def test_array_is_shared_by_models_of_same_shape(self):
+        first = self._machine(['abc', 'def'], [Condition('${V0}', 'b')])
+        second = self._machine(['xyz', 'uvw'], [RegexCondition('${V0}', '^y$')])
+        self._tests(first, self._cache)
+        self._tests(second, self._cache)
+        self.assertEqual(1, len(self._cache._entries()))
+        self._tests(self._machine(['abc', 'def'], [Condition('${V0}', 'c')]), self._cache)
+        self.assertEqual(2, len(self._cache._entries()))
+
+    def test_rule_signature(self):
+        variables = list(self._machine(['abc', 'def']).variables)
+        signature = _RuleSignature(variables).signature
+        first, second = Condition('${V0}', 'a'), UnequalCondition('${V1}', 'e')
+        self.assertEqual(signature([first, second]), signature([second, first]))
+        self.assertNotEqual(signature([first]), signature([second]))
+        self.assertEqual(None, signature([Condition('${UNKNOWN}', 'a')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import unittest
+from src import robomachine
+from src.robomachine.compiledmachine import CompiledMachine
+from test.variable_test import _LOGIN_MACHINE
+from test.robomachina_test import _MACHINA2
+
+
+class CompiledMachineTestCase(unittest.TestCase):
+
+    def test_transition_table(self):
+        compiled = CompiledMachine(robomachine.parse(_MACHINA2))
+        self.assertEqual([0, 3, 5, 5, 5], list(compiled.offsets))
+        self.assertEqual([1, 2, 3, 0, 2], list(compiled.targets))
+        self.assertEqual(['first', 'second', '', 'something else', 'other thing'],
+                         [a.name for a in compiled.to_actions(range(5))])
+        self.assertEqual([CompiledMachine.NO_GUARD] * 5, list(compiled.guards))
+
+    def test_enabled_actions_match_state_actions(self):
+        machine = robomachine.parse(_LOGIN_MACHINE)
+        compiled = CompiledMachine(machine)
+        for values in [['demo', 'mode'], ['demo', 'demo'], ['invalid', 'mode']]:
+            machine.apply_variable_values(values)
+            for index, state in enumerate(machine.states):
+                enabled = compiled.enabled(index, [v.current_value for v in machine.variables])
+                self.assertEqual(state.actions, compiled.to_actions(enabled))
+
+    def test_enabled_table(self):
+        machine = robomachine.parse(_LOGIN_MACHINE)
+        compiled = CompiledMachine(machine)
+        tables = []
+        for values in [['demo', 'mode'], ['invalid', 'mode'], ['demo', 'mode']]:
+            machine.apply_variable_values(values)
+            tables.append(compiled.enabled_table([v.current_value for v in machine.variables]))
+            self.assertEqual([state.actions for state in machine.states],
+                             [compiled.to_actions(actions) for actions in tables[-1]])
+        self.assertTrue(tables[0] is tables[2])
+        self.assertEqual(2 * len(compiled.predicates), compiled.guard_evaluations)
+
+    def test_enabled_table_shared_by_same_guard_results(self):
+        machine = robomachine.parse(_LOGIN_MACHINE)
+        compiled = CompiledMachine(machine)
+        # Neither assignment passes the login guard
+        self.assertTrue(compiled.enabled_table(['invalid', 'mode']) is compiled.enabled_table(['demo', 'x']))
+
+    def test_rules_are_ok(self):
+        compiled = CompiledMachine(robomachine.parse(_LOGIN_MACHINE))
+        self.assertTrue(compiled.rules_are_ok(['mode', 'demo']))
+        self.assertFalse(compiled.rules_are_ok(['mode', 'invalid']))
+
+    def test_distances(self):
+        machine = robomachine.parse(_LOGIN_MACHINE)
+        compiled = CompiledMachine(machine)
+        targets = compiled.state_indexes('Welcome Page')
+        machine.apply_variable_values(['demo', 'mode'])
+        valid = compiled.distances(targets, [v.current_value for v in machine.variables])
+        machine.apply_variable_values(['invalid', 'mode'])
+        invalid = compiled.distances(targets, [v.current_value for v in machine.variables])
+        self.assertEqual([1, 0, CompiledMachine.UNREACHABLE], list(valid))
+        self.assertEqual([CompiledMachine.UNREACHABLE, 0, CompiledMachine.UNREACHABLE], list(invalid))
+
+    def test_state_indexes(self):
+        compiled = CompiledMachine(robomachine.parse(_MACHINA2))
+        self.assertEqual(frozenset([2]), compiled.state_indexes('C'))
+        self.assertEqual(frozenset(), compiled.state_indexes('E'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import collections
+import re
+import unittest
+from src import robomachine
+from test.helpers import atest_machine, generate
+from test.sharding_test import _ALIASED_MACHINE
+from test.variable_test import _LOGIN_MACHINE
+
+
+class CountTestsTestCase(unittest.TestCase):
+
+    def _generated_tests(self, machine, max_actions, to_state):
+        output = generate(machine, max_tests=100000, max_actions=max_actions, to_state=to_state)
+        return len(re.findall(r'\nTest \d+\n', output))
+
+    def _assert_counts(self, machine, max_actions, to_state=None):
+        counts = robomachine.count_tests(machine, max_actions, to_state)
+        self.assertEqual(self._generated_tests(machine, max_actions, to_state), sum(counts))
+
+    def test_counts_match_generated_tests(self):
+        for max_actions, to_state in ((0, None), (2, None), (4, None), (4, 'End State')):
+            self._assert_counts(atest_machine('testingmachine.robomachine'), max_actions, to_state)
+        for max_actions, to_state in ((3, None), (None, None), (None, 'Error Page')):
+            self._assert_counts(robomachine.parse(_LOGIN_MACHINE), max_actions, to_state)
+        for max_actions in (1, 3, 5):
+            self._assert_counts(robomachine.parse(_ALIASED_MACHINE), max_actions)
+
+    def test_counts_by_length(self):
+        machine = robomachine.parse(_LOGIN_MACHINE)
+        counts = robomachine.count_tests(machine, 3)
+        lengths = collections.Counter(len(test) for test, _ in
+                                      robomachine.DepthFirstSearchStrategy(machine, 3).tests())
+        self.assertEqual([lengths[length] for length in range(len(counts))], counts)
+        self.assertEqual([0, 9, 9, 18], robomachine.count_tests(atest_machine('testingmachine.robomachine'), 3))
+
+    def test_astronomical_counts(self):
+        counts = robomachine.count_tests(atest_machine('infinite.robomachine'), 100)
+        self.assertEqual(101, len(counts))
+        self.assertTrue(sum(counts) > 10 ** 100)
+
+    def test_unlimited_paths_on_cycle(self):
+        self.assertRaises(AssertionError, robomachine.count_tests, atest_machine('testingmachine.robomachine'))
+
+
+if __name__ == '__main__':
+    unittest.main()
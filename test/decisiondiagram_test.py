@@ -0,0 +1,124 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import random
+import unittest
+from src import robomachine
+from src.robomachine.compiledmachine import CompiledMachine
+from src.robomachine.decisiondiagram import DecisionDiagram, ModelAnalysis, _DiagramCompiler
+from src.robomachine.model import Action, RoboMachine, State, Variable
+from src.robomachine.rules import (Condition, UnequalCondition, ImplicationRule, EquivalenceRule,
+                                   OrRule, AndRule, NotRule, RegexCondition, GreaterThanCondition)
+from test.helpers import atest_machine
+
+_REFERENCES_MACHINE = """\
+*** Machine ***
+${A}  any of  x  y  z
+${B}  any of  ${A}  q  pre${A}
+${C}  any of  ${B}  w
+
+${A} != z  or  ${C} == w
+
+S
+  [Actions]
+    Go  ==>  S  when  ${C} == x
+    Prefixed  ==>  S  when  ${C} ~ ^pre
+    Never  ==>  S  when  ${C} == z  and  ${A} == x
+    Other  ==>  S  when  ${B} == q  and  ${C} != w
+    Back  ==>  S  otherwise
+"""
+
+
+class ModelAnalysisTestCase(unittest.TestCase):
+
+    def _random_machine(self, rnd):
+        variables = [Variable('${{V{:d}}}'.format(i), ['v{:d}'.format(v) for v in range(rnd.randrange(1, 5))])
+                     for i in range(rnd.randrange(1, 6))]
+
+        def condition():
+            variable = rnd.choice(variables)
+            kind = rnd.choice([Condition, UnequalCondition, RegexCondition, GreaterThanCondition])
+            return kind(variable.name, rnd.choice(variable.values + ['v[12]']))
+        rules = []
+        for _ in range(rnd.randrange(0, 6)):
+            rules.append(rnd.choice([lambda: ImplicationRule(condition(), condition()),
+                                     lambda: EquivalenceRule(condition(), condition()),
+                                     lambda: OrRule([condition(), condition()]),
+                                     lambda: NotRule(AndRule([condition(), condition(), condition()])),
+                                     condition])())
+        return RoboMachine([State('s', [], [])], variables, rules)
+
+    def _valid(self, machine, rules):
+        return sum(1 for values in itertools.product(*[v.values for v in machine.variables])
+                   if all(rule.is_valid(dict(zip([v.name for v in machine.variables], values))) for rule in rules))
+
+    def test_counts_match_enumeration(self):
+        rnd = random.Random(3)
+        for _ in range(200):
+            machine = self._random_machine(rnd)
+            analysis = ModelAnalysis(machine)
+            self.assertEqual(self._valid(machine, []), analysis.assignments)
+            self.assertEqual(self._valid(machine, machine.rules), analysis.valid_assignments)
+            for index, (rule, alone, only) in enumerate(analysis.rule_impacts()):
+                others = machine.rules[:index] + machine.rules[index + 1:]
+                self.assertEqual(analysis.assignments - self._valid(machine, [rule]), alone)
+                self.assertEqual(self._valid(machine, others) - analysis.valid_assignments, only)
+
+    def test_guards_see_resolved_values(self):
+        machine = robomachine.parse(_REFERENCES_MACHINE)
+        compiled = CompiledMachine(machine)
+        expected = [0] * len(compiled.predicates)
+        for values in itertools.product(*[v.values for v in machine.variables]):
+            if machine.rules_are_ok(values):
+                machine.apply_variable_values(values)
+                current_values = [v.current_value for v in machine.variables]
+                for guard, predicate in enumerate(compiled.predicates):
+                    expected[guard] += bool(predicate(current_values))
+        counts = ModelAnalysis(machine).guard_counts()
+        self.assertEqual(['Go', 'Prefixed', 'Never', 'Other'], [action.name for _, action, _ in counts])
+        self.assertEqual(expected, [count for _, _, count in counts])
+        self.assertEqual(0, counts[2][2])
+
+    def test_guards_skip_circular_references(self):
+        variables = [Variable('${A}', ['x', '${B}']), Variable('${B}', ['y', '${A}'])]
+        states = [State('s', [], [Action('a', 's', Condition('${A}', 'y')), Action('b', 's', Condition('${B}', 'x'))])]
+        machine = RoboMachine(states, variables, [OrRule([Condition('${A}', 'x'), Condition('${B}', 'y')])])
+        analysis = ModelAnalysis(machine)
+        self.assertEqual(3, analysis.valid_assignments)
+        self.assertEqual([1, 1], [count for _, _, count in analysis.guard_counts()])
+
+    def test_counts_without_enumerating(self):
+        analysis = robomachine.analyze(atest_machine('infinite.robomachine'))
+        self.assertEqual(16 ** 8, analysis.valid_assignments)
+
+    def test_equal_functions_are_the_same_node(self):
+        variables = [Variable('${A}', ['x', 'y', 'z']), Variable('${B}', ['x', 'y'])]
+        machine = RoboMachine([State('s', [], [])], variables, [])
+        diagram = DecisionDiagram(variables)
+        compiler = _DiagramCompiler(diagram, machine, resolved=False)
+        self.assertEqual(compiler.compile_rule(OrRule([Condition('${A}', 'x'), Condition('${A}', 'y')])),
+                         compiler.compile_rule(UnequalCondition('${A}', 'z')))
+        self.assertEqual(compiler.compile_rule(OrRule([Condition('${B}', 'x'), Condition('${B}', 'y')])),
+                         compiler.compile_rule(ImplicationRule(Condition('${A}', 'x'), Condition('${A}', 'x'))))
+
+    def test_unanalysable_rules(self):
+        variables = [Variable('${A}', ['x', 'y'])]
+        for rule in (Condition('${UNKNOWN}', 'x'), RegexCondition('${A}', '(')):
+            machine = RoboMachine([State('s', [], [])], variables, [rule])
+            self.assertRaises(AssertionError, ModelAnalysis, machine)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import functools
+import unittest
+from array import array
+from src.robomachine.duplicates import BloomFilter, ExactFilter, fingerprint
+from test.helpers import atest_machine, generate
+
+
+class FingerprintTestCase(unittest.TestCase):
+
+    def test_fixed_size(self):
+        self.assertEqual(16, len(fingerprint(b'', [])))
+        self.assertEqual(16, len(fingerprint(array('i', range(1000)).tobytes(), ['x'] * 100)))
+
+    def test_value_boundaries_are_kept(self):
+        self.assertNotEqual(fingerprint(b'', ['ab', 'c']), fingerprint(b'', ['a', 'bc']))
+        self.assertNotEqual(fingerprint(b'', ['a']), fingerprint(b'', ['a', '']))
+        self.assertEqual(fingerprint(b'\x01', ('a', 'b')), fingerprint(b'\x01', ['a', 'b']))
+
+
+class DuplicateFilterTestCase(unittest.TestCase):
+
+    def _fingerprints(self, count, offset=0):
+        return [fingerprint(array('i', [n]).tobytes(), []) for n in range(offset, offset + count)]
+
+    def test_exact_filter(self):
+        duplicates = ExactFilter()
+        self.assertEqual([True, True, False, False], [duplicates.add(f) for f in self._fingerprints(2) * 2])
+        self.assertEqual(2, len(duplicates))
+        self.assertTrue(self._fingerprints(1)[0] in duplicates)
+        self.assertFalse(self._fingerprints(1, offset=2)[0] in duplicates)
+        self.assertTrue(duplicates.memory_usage() > 0)
+
+    def test_bloom_filter_finds_all_duplicates(self):
+        duplicates = BloomFilter(1000, 0.01)
+        fingerprints = self._fingerprints(1000)
+        for f in fingerprints:
+            duplicates.add(f)
+        self.assertFalse(any(duplicates.add(f) for f in fingerprints))
+
+    def test_bloom_filter_false_positive_rate(self):
+        duplicates = BloomFilter(10000, 0.01)
+        for f in self._fingerprints(10000):
+            duplicates.add(f)
+        false_positives = sum(f in duplicates for f in self._fingerprints(10000, offset=10000))
+        self.assertTrue(false_positives < 200, false_positives)
+        self.assertTrue(duplicates.memory_usage() < 10000 * 16)
+
+    def test_invalid_false_positive_rate(self):
+        self.assertRaises(AssertionError, BloomFilter, 10, 0)
+        self.assertRaises(AssertionError, BloomFilter, 10, 1)
+
+
+class GenerationWithDuplicateFilterTestCase(unittest.TestCase):
+
+    def _generate(self, **kwargs):
+        return generate(atest_machine('testingmachine.robomachine'), max_tests=500, max_actions=4, **kwargs)
+
+    def test_bloom_filter_output(self):
+        self.assertEqual(self._generate(),
+                         self._generate(duplicate_filter=functools.partial(BloomFilter, false_positive_rate=1e-6)))
+        self.assertEqual(self._generate(),
+                         self._generate(duplicate_filter=BloomFilter, jobs=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
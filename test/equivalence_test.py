@@ -0,0 +1,140 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import functools
+import unittest
+from src import robomachine
+from src.robomachine.allpairsstrategy import AllPairsRandomStrategy
+from src.robomachine.equivalence import FIRST, ROTATE, ValuePartition
+from src.robomachine.strategies import DepthFirstSearchStrategy, ShortestFirstStrategy
+from test.helpers import generate
+
+_MACHINE = """\
+*** Machine ***
+${USER}  any of  admin  guest  bob  alice  eve
+${PASSWORD}  any of  good  bad1  bad2  bad3
+${BROWSER}  any of  Chrome  Firefox  Safari
+${MODE}  any of  fast  slow  slower
+
+${USER} == eve  ==>  ${MODE} == fast
+
+Login
+  [Actions]
+    Admin  ==>  Admin Page  when  ${USER} == admin  and  ${PASSWORD} == good
+    User  ==>  User Page  when  ${USER} != admin  and  ${PASSWORD} == good
+    Fail  ==>  Login  when  ${PASSWORD} != good
+    Slow  ==>  Login  when  ${MODE} ~ ^slow
+
+Admin Page
+  [Actions]
+    Out  ==>  Login
+
+User Page
+  [Actions]
+    Out  ==>  Login
+"""
+
+
+class ValuePartitionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._machine = robomachine.parse(_MACHINE)
+
+    def test_values_that_nothing_tells_apart_share_a_class(self):
+        partition = ValuePartition(self._machine)
+        self.assertEqual([[['admin'], ['guest', 'bob', 'alice'], ['eve']],
+                          [['good'], ['bad1', 'bad2', 'bad3']],
+                          [['Chrome', 'Firefox', 'Safari']],
+                          [['fast'], ['slow', 'slower']]], partition.classes)
+        self.assertEqual((5 * 4 * 3 * 3, 3 * 2 * 1 * 2), partition.sizes())
+        self.assertEqual([('${USER}', 5, 3), ('${PASSWORD}', 4, 2), ('${BROWSER}', 3, 1), ('${MODE}', 3, 2)],
+                         partition.split_variables())
+
+    def test_referred_variables_are_not_split(self):
+        machine = robomachine.parse(_MACHINE.replace('${MODE}  any of  fast  slow  slower',
+                                                     '${MODE}  any of  fast  slow  ${BROWSER}'))
+        classes = ValuePartition(machine).classes
+        self.assertEqual([['Chrome'], ['Firefox'], ['Safari']], classes[2])
+        self.assertEqual([['fast'], ['slow'], ['${BROWSER}']], classes[3])
+        self.assertEqual([['good'], ['bad1', 'bad2', 'bad3']], classes[1])
+
+    def test_unanalysable_rule_splits_nothing(self):
+        class Opaque(object):
+            def is_valid(self, value_mapping):
+                return True
+        self._machine.rules.append(Opaque())
+        self.assertEqual((180, 180), ValuePartition(self._machine).sizes())
+
+    def _paths(self, strategy):
+        return set(tuple(action.name for action in test) for test, _ in strategy.tests())
+
+    def test_representatives_take_the_same_paths(self):
+        for max_actions in (1, 3):
+            every = DepthFirstSearchStrategy(self._machine, max_actions)
+            for representatives in (FIRST, ROTATE):
+                reduced = DepthFirstSearchStrategy(self._machine, max_actions, representatives=representatives)
+                self.assertEqual(self._paths(every), self._paths(reduced))
+                # eve with slow for both password classes breaks the rule
+                self.assertEqual(3 * 2 * 1 * 2 - 2, sum(1 for _ in reduced.assignments()))
+
+    def test_rotation_uses_every_value(self):
+        strategy = DepthFirstSearchStrategy(self._machine, 1, representatives=ROTATE)
+        assignments = list(strategy.assignments())
+        self.assertEqual(set(['Chrome', 'Firefox', 'Safari']), set(values[2] for values in assignments))
+        self.assertEqual(assignments, list(strategy.assignments()))
+        self.assertTrue(all(self._machine.rules_are_ok(values) for values in assignments))
+        first = DepthFirstSearchStrategy(self._machine, 1, representatives=FIRST)
+        self.assertEqual(set(['Chrome']), set(values[2] for values in first.assignments()))
+
+    def test_counted_tests(self):
+        for representatives in (FIRST, ROTATE):
+            counts = robomachine.count_tests(self._machine, 2, representatives=representatives)
+            strategy = DepthFirstSearchStrategy(self._machine, 2, representatives=representatives)
+            self.assertEqual(sum(1 for _ in strategy.paths()), sum(counts))
+        shortest = ShortestFirstStrategy(self._machine, 2, representatives=FIRST)
+        self.assertEqual(sum(robomachine.count_tests(self._machine, 2, representatives=FIRST)),
+                         sum(1 for _ in shortest.paths()))
+
+    def test_shortest_first_rotation_orders_dfs_tests(self):
+        dfs = list(DepthFirstSearchStrategy(self._machine, 3, representatives=ROTATE).paths())
+        shortest = list(ShortestFirstStrategy(self._machine, 3, representatives=ROTATE).paths())
+        self.assertEqual(sorted(dfs, key=lambda test: len(test[0])), shortest)
+
+    def test_pairwise_covers_pairs_of_classes(self):
+        partition = ValuePartition(self._machine)
+        strategy = AllPairsRandomStrategy(self._machine, 1, representatives=FIRST)
+        rows = strategy._generate_all_pairs_variable_values()
+        self.assertTrue(all(self._machine.rules_are_ok(values) for values in rows))
+        covered = set()
+        for values in rows:
+            classes = [[index for index, members in enumerate(partition.classes[position]) if value in members][0]
+                       for position, value in enumerate(values)]
+            covered.update(((first, classes[first]), (second, classes[second]))
+                           for first in range(4) for second in range(first + 1, 4))
+        # eve needs fast, the only pair of classes the rule removes
+        self.assertEqual(3 * 2 + 3 * 1 + 3 * 2 + 2 * 1 + 2 * 2 + 1 * 2 - 1, len(covered))
+
+    def _generated_tests(self, strategy):
+        return generate(robomachine.parse(_MACHINE), max_tests=10000, max_actions=2,
+                        strategy=strategy).count('\nTest ')
+
+    def test_generate_with_representatives(self):
+        every = self._generated_tests(DepthFirstSearchStrategy)
+        reduced = self._generated_tests(functools.partial(DepthFirstSearchStrategy, representatives=ROTATE))
+        self.assertEqual(sum(robomachine.count_tests(self._machine, 2, representatives=ROTATE)), reduced)
+        self.assertTrue(0 < reduced < every)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import glob
+import os
+import unittest
+from src.robomachine import parsing
+from src.robomachine.parsing import RoboMachineParsingException
+from test import robomachina_test, variable_test
+
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_RULES_MACHINE = """\
+*** Machine ***
+${A}  any of  x  y z  1
+${B}  any of  a.b  -  ${A}
+${C}  any of  foo  bar  # comment
+
+${A} == x  ==>  ${B} != -
+  ${A} in (x, y z,1)
+${B} ~ ^a.*  <==>  (${C} !~ b  or  ${C} >= bar)
+not (${A} < 1  and  ${C} <= foo)
+( ${A} > x )
+(${A} == x)  and  ( (${B} == -))
+
+# comment
+State 1  # comment
+  Log  step  # is kept
+  [Actions]
+    Go to  ${A}  ==>  State 2  when  ${A} == x  and  (${B} == a.b  or  ${C} == foo)
+
+    ==>  State 1  otherwise
+    other  ==>  State 2  # comment
+
+State 2
+  Log  last
+"""
+
+# The grammar skips the spaces before the first state when there are no
+# rules, and before the keywords table header
+_INDENTED_MACHINES = ["""\
+*** Machine ***
+ S0
+  [Actions]
+    go  ==>  S0
+""", """\
+*** Machine ***
+${A}  any of  x  y
+
+  S0  # comment
+  Log  ${A}
+""", """\
+*** Machine ***
+S0
+  Log  x
+
+  *** Keywords ***
+Log
+  No Operation
+"""]
+
+_BROKEN_MACHINES = ["""\
+*** Machine ***
+${A}  any of  x  y
+${A} == x  and  ${A} == y  or  ${A} == x
+State
+""", """\
+*** Machine ***
+State 1
+State 2
+""", """\
+*** Machine ***
+State 1
+  [Actions]
+""", """\
+*** Machine ***
+State 1
+  [Actions]
+    ==>  State 1  when  ${A} == x  # comment  foo
+    ==>  State 1 when  ${A} == x
+""", """\
+*** Machine ***
+${A}  any of  x  y
+${A} == x
+ S0
+"""]
+
+
+def _describe(machine):
+    def rule(r):
+        return r if isinstance(r, str) else (type(r).__name__, str(r))
+    return (list(machine._settings_table), list(machine._variables_table),
+            list(machine._keywords_table),
+            [(v.name, v.values) for v in machine.variables],
+            [rule(r) for r in machine.rules],
+            [(s.name, s.steps,
+              [(a.name, a._next_state_name, rule(a.condition)) for a in s._actions])
+             for s in machine.states])
+
+
+class FastParserConformanceTestCase(unittest.TestCase):
+
+    def test_atest_and_example_models(self):
+        paths = glob.glob(os.path.join(_ROOT, 'atest', '*.robomachine')) + \
+                glob.glob(os.path.join(_ROOT, 'example', '*', '*.robomachine'))
+        self.assertTrue(paths)
+        for path in paths:
+            with open(path) as model:
+                self._assert_conforms(model.read())
+
+    def test_unit_test_models(self):
+        for text in [robomachina_test._MACHINA, robomachina_test._MACHINA2,
+                     robomachina_test._VAR_PROBLEM_MACHINE,
+                     variable_test._LOGIN_MACHINE, _RULES_MACHINE]:
+            self._assert_conforms(text)
+
+    def test_indented_first_state_and_keywords_table(self):
+        for text in _INDENTED_MACHINES:
+            self._assert_conforms(text)
+
+    def test_broken_models(self):
+        for text in _BROKEN_MACHINES + [robomachina_test._INVALID_STATE_MACHINE]:
+            for engine in parsing.ENGINES:
+                self.assertRaises(RoboMachineParsingException, parsing.parse, text, engine)
+
+    def test_many_empty_lines_between_states(self):
+        m = parsing.parse('*** Machine ***\nA\n  No Operation\n\n\nB\n', parsing.FAST)
+        self.assertEqual(['A', 'B'], [s.name for s in m.states])
+
+    def test_unknown_engine(self):
+        self.assertRaises(ValueError, parsing.parse, robomachina_test._MACHINA, 'unknown')
+
+    def _assert_conforms(self, text):
+        self.assertEqual(_describe(parsing.parse(text, parsing.PYPARSING)),
+                         _describe(parsing.parse(text, parsing.FAST)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import contextlib
+import io
+import os
+from src import robomachine
+
+ATEST = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'atest')
+
+
+def atest_machine(name):
+    with open(os.path.join(ATEST, name)) as model:
+        return robomachine.parse(model.read())
+
+
+def generate(machine, generator=None, **kwargs):
+    # Generated tests as text, without the notes printed on the way
+    output = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()):
+        (generator or robomachine.Generator()).generate(machine, output=output, **kwargs)
+    return output.getvalue()
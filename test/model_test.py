@@ -13,7 +13,7 @@
 #  limitations under the License.
 
 import unittest
-from src.robomachine.model import RoboMachine, Variable
+from src.robomachine.model import RoboMachine, State, Action, Variable
 
 
 class MachinaModelTestCase(unittest.TestCase):
@@ -39,5 +39,58 @@ class MachinaModelTestCase(unittest.TestCase):
         var_model.set_current_value('bar')
         self.assertEqual('bar', var_model.current_value)
 
+    def test_find_by_name_returns_first_match(self):
+        states = [State('a', [], []), State('b', [], []), State('a', [], [])]
+        variables = [Variable('${A}', ['1']), Variable('${A}', ['2'])]
+        machine = RoboMachine(states, variables, [])
+        self.assertIs(states[0], machine.find_state_by_name('a'))
+        self.assertIs(states[1], machine.find_state_by_name('b'))
+        self.assertIs(variables[0], machine.find_variable_by_name('${A}'))
+        self.assertEqual(None, machine.find_variable_by_name('${B}'))
+
+    def test_action_next_state_is_resolved(self):
+        action = Action('go', 'b')
+        states = [State('a', [], [action]), State('b', [], [])]
+        RoboMachine(states, [], [])
+        self.assertIs(states[1], action.next_state)
+
+    def test_action_with_invalid_next_state(self):
+        self.assertRaises(AssertionError, RoboMachine, [State('a', [], [Action('go', 'c')])], [], [])
+
+    def test_nested_variable_references(self):
+        variables = [Variable('${A}', ['${B}-${C}']), Variable('${B}', ['b', '${C}']), Variable('${C}', ['c'])]
+        machine = RoboMachine([], variables, [])
+        self.assertEqual([variables[1], variables[2]], machine.variable_references(variables[0]))
+        machine.apply_variable_values(['${B}-${C}', 'b', 'c'])
+        self.assertEqual(['b-c', 'b', 'c'], [v.current_value for v in variables])
+        machine.apply_variable_values(['${B}-${C}', '${C}', 'c'])
+        self.assertEqual(['c-c', 'c', 'c'], [v.current_value for v in variables])
+        variables[2].set_current_value('x')
+        self.assertEqual('x-x', variables[0].current_value)
+
+    def test_circular_variable_references(self):
+        for variables in ([Variable('${A}', ['${A}'])],
+                          [Variable('${A}', ['a', 'x${B}']), Variable('${B}', ['${C}']), Variable('${C}', ['${A}'])]):
+            machine = RoboMachine([], variables, [])
+            machine.apply_variable_values([v.values[-1] for v in variables])
+            try:
+                variables[0].current_value
+                self.fail('should throw assertion error on circular references')
+            except AssertionError as error:
+                self.assertTrue('${A} -> ' in str(error), str(error))
+
+    def test_circular_references_of_other_values(self):
+        variables = [Variable('${A}', ['a', 'x${B}']), Variable('${B}', ['${C}']), Variable('${C}', ['${A}'])]
+        machine = RoboMachine([], variables, [])
+        machine.apply_variable_values(['x${B}', '${C}', '${A}'])
+        self.assertRaises(AssertionError, getattr, variables[1], 'current_value')
+        machine.apply_variable_values(['a', '${C}', '${A}'])
+        self.assertEqual(['a', 'a', 'a'], [v.current_value for v in variables])
+
+    def test_references_to_unknown_variables_are_kept(self):
+        variable = Variable('${A}', ['${X}'])
+        RoboMachine([], [variable], []).apply_variable_values(['${X}'])
+        self.assertEqual('${X}', variable.current_value)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import random
+import unittest
+from src.robomachine.generator import Generator
+from src.robomachine.strategies import RandomStrategy, ShortestFirstStrategy
+from test.helpers import atest_machine, generate
+
+
+class ParallelGenerationTestCase(unittest.TestCase):
+
+    def _generate(self, name, **kwargs):
+        random.seed(1)
+        return generate(atest_machine(name), **kwargs)
+
+    def _assert_same_as_serial(self, name, **kwargs):
+        serial = self._generate(name, **kwargs)
+        self.assertEqual(serial, self._generate(name, jobs=3, **kwargs))
+        return serial
+
+    def test_same_output_as_serial_run(self):
+        self._assert_same_as_serial('testingmachine.robomachine', max_tests=500, max_actions=4)
+        self._assert_same_as_serial('selenium_demo_machine.robomachine', max_tests=100, max_actions=3)
+
+    def test_tests_max_and_to_state(self):
+        output = self._assert_same_as_serial('infinite.robomachine', max_tests=300, max_actions=3,
+                                             to_state='State 3')
+        self.assertEqual(300, output.count('\nTest '))
+        self._assert_same_as_serial('testingmachine.robomachine', max_tests=50, max_actions=5,
+                                    to_state='End State')
+
+    def test_same_coverage_as_serial_run(self):
+        machine = atest_machine('testingmachine.robomachine')
+        generators = [Generator(switches=1), Generator(switches=1)]
+        for jobs, generator in enumerate(generators, 1):
+            generate(machine, generator, max_tests=20, max_actions=3, jobs=jobs)
+        self.assertEqual(generators[0].visited_states, generators[1].visited_states)
+        self.assertEqual(generators[0].visited_actions, generators[1].visited_actions)
+        self.assertEqual(generators[0].visited_sequences, generators[1].visited_sequences)
+        self.assertTrue(generators[0].visited_sequences)
+
+    def test_other_strategies_run_serially(self):
+        self.assertEqual(self._generate('testingmachine.robomachine', strategy=ShortestFirstStrategy,
+                                        max_tests=30, max_actions=3),
+                         self._generate('testingmachine.robomachine', strategy=ShortestFirstStrategy,
+                                        max_tests=30, max_actions=3, jobs=2))
+        self.assertEqual(self._generate('one_state_no_actions.robomachine', strategy=RandomStrategy,
+                                        max_tests=3, max_actions=2),
+                         self._generate('one_state_no_actions.robomachine', strategy=RandomStrategy,
+                                        max_tests=3, max_actions=2, jobs=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
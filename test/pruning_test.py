@@ -0,0 +1,113 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import pickle
+import random
+import unittest
+from src import robomachine
+from src.robomachine.compiledmachine import CompiledMachine
+from src.robomachine.pruning import DeadParts, prune
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy, TransitionTourStrategy
+from test.helpers import generate
+
+_DEAD_MACHINE = """\
+*** Machine ***
+${USER}  any of  admin  guest  eve
+${MODE}  any of  fast  slow
+
+${USER} == eve  ==>  ${MODE} == fast
+
+Login
+  [Actions]
+    Admin  ==>  Admin Page  when  ${USER} == admin
+    Secret  ==>  Secret Page  when  ${USER} == eve  and  ${MODE} == slow
+    Stay  ==>  Login
+
+Admin Page
+  [Actions]
+    Out  ==>  Login
+
+Secret Page
+  [Actions]
+    Hidden  ==>  Hidden Page
+
+Hidden Page
+  [Actions]
+    Back  ==>  Login
+
+Orphan
+  [Actions]
+    Go  ==>  Login
+"""
+
+
+class PruningTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._machine = robomachine.parse(_DEAD_MACHINE)
+
+    def _state(self, name):
+        return self._machine.find_state_by_name(name)
+
+    def _action(self, state, name):
+        return [action for action in self._state(state)._actions if action.name == name][0]
+
+    def test_dead_parts_and_reasons(self):
+        dead = DeadParts(self._machine)
+        self.assertEqual(['Secret Page', 'Hidden Page', 'Orphan'], [state.name for state in dead.states])
+        self.assertEqual('no live action leads to it from Login', dead.states[self._state('Orphan')])
+        self.assertEqual(set(['Secret', 'Hidden', 'Back', 'Go']), set(action.name for action in dead.actions))
+        self.assertEqual('guard "${USER} == eve  and  ${MODE} == slow" is never true with the rules',
+                         dead.actions[self._action('Login', 'Secret')])
+        self.assertEqual('state Hidden Page is unreachable', dead.actions[self._action('Hidden Page', 'Back')])
+        self.assertEqual(None, dead.error)
+
+    def _generated(self, machine, strategy):
+        random.seed(5)
+        return generate(machine, max_tests=200, max_actions=4, strategy=strategy)
+
+    def test_pruning_does_not_change_tests(self):
+        for strategy in (DepthFirstSearchStrategy, RandomStrategy, TransitionTourStrategy):
+            expected = self._generated(robomachine.parse(_DEAD_MACHINE), strategy)
+            prune(self._machine)
+            self.assertEqual(expected, self._generated(self._machine, strategy))
+
+    def test_dead_guards_are_not_evaluated(self):
+        self.assertEqual(2, len(CompiledMachine(self._machine).predicates))
+        prune(self._machine)
+        compiled = CompiledMachine(pickle.loads(pickle.dumps(self._machine)))
+        self.assertEqual(1, len(compiled.predicates))
+        self.assertEqual(['Admin', 'Stay', 'Out'], [action.name for action in compiled.actions])
+
+    def test_no_valid_assignments(self):
+        machine = robomachine.parse(_DEAD_MACHINE.replace('${USER} == eve  ==>  ${MODE} == fast',
+                                                        '${USER} == eve\n${USER} == admin'))
+        dead = DeadParts(machine)
+        self.assertEqual(7, len(dead.actions))
+        self.assertEqual('no variable values satisfy the rules', dead.actions[machine.states[0]._actions[-1]])
+        self.assertEqual(4, len(dead.states))
+
+    def test_unanalysable_rules_leave_reachability(self):
+        class Opaque(object):
+            def is_valid(self, value_mapping):
+                return True
+        self._machine.rules.append(Opaque())
+        dead = DeadParts(self._machine)
+        self.assertTrue(dead.error)
+        self.assertEqual(['Orphan'], [state.name for state in dead.states])
+        self.assertEqual(['Go'], [action.name for action in dead.actions])
+
+
+if __name__ == '__main__':
+    unittest.main()
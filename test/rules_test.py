@@ -12,8 +12,10 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import random
 import unittest
-from src.robomachine.rules import (Condition, AndRule, EquivalenceRule, OrRule,
+from src.robomachine.model import Variable
+from src.robomachine.rules import (RuleCompiler, Condition, AndRule, EquivalenceRule, OrRule,
                                    NotRule, ImplicationRule, UnequalCondition,
                                    GreaterThanCondition, GreaterThanOrEqualCondition,
                                    LessThanCondition, LessThanOrEqualCondition,
@@ -97,5 +99,73 @@ class RulesTestCases(unittest.TestCase):
         self.assertFalse(ImplicationRule(self._TRUE, self._FALSE).is_valid({}))
         self.assertTrue(ImplicationRule(self._FALSE, self._FALSE).is_valid({}))
 
+
+class _TrueRule(object):
+    # A rule of a plugin: it can be evaluated but not compiled
+
+    def __str__(self):
+        return 'true'
+
+    def is_valid(self, value_mapping):
+        return True
+
+
+class RuleCompilerTestCases(unittest.TestCase):
+
+    _VALUES = ['0', '1', '2', ' 1', 'foo', 'bar ', 'foob']
+    _CONDITIONS = [Condition, UnequalCondition, GreaterThanCondition,
+                   GreaterThanOrEqualCondition, LessThanCondition,
+                   LessThanOrEqualCondition, RegexCondition, RegexNegatedCondition]
+
+    def setUp(self):
+        self._random = random.Random(1234)
+        self._variables = [Variable('${%s}' % name, self._random.sample(self._VALUES, 3))
+                           for name in 'ABCD']
+
+    def _rule(self, depth):
+        if depth == 0 or self._random.random() < 0.3:
+            condition = self._random.choice(self._CONDITIONS)
+            value = self._random.choice(self._VALUES + ['^f', 'o+b', '[12]$'])
+            return condition(self._random.choice(self._variables).name, value)
+        kind = self._random.randrange(5)
+        if kind == 0:
+            return NotRule(self._rule(depth - 1))
+        if kind == 1:
+            return EquivalenceRule(self._rule(depth - 1), self._rule(depth - 1))
+        if kind == 2:
+            return ImplicationRule(self._rule(depth - 1), self._rule(depth - 1))
+        rules = [self._rule(depth - 1) for _ in range(self._random.randrange(1, 5))]
+        return AndRule(rules) if kind == 3 else OrRule(rules)
+
+    def test_compiled_rules_match_is_valid(self):
+        compiler = RuleCompiler(self._variables)
+        for _ in range(300):
+            rule = self._rule(4)
+            predicate = compiler.compile(rule)
+            for _ in range(20):
+                values = [self._random.choice(self._VALUES) for _ in self._variables]
+                mapping = dict((v.name, value) for v, value in zip(self._variables, values))
+                self.assertEqual(rule.is_valid(mapping), predicate(values))
+
+    def test_compile_all(self):
+        rules = [Condition('${A}', '1'), LessThanCondition('${B}', '2')]
+        rules_are_ok = RuleCompiler(self._variables).compile_all(rules)
+        self.assertTrue(rules_are_ok(['1', '0', 'x', 'x']))
+        self.assertTrue(rules_are_ok([' 1', '1', 'x', 'x']))
+        self.assertFalse(rules_are_ok(['1', '2', 'x', 'x']))
+        self.assertTrue(RuleCompiler(self._variables).compile_all([])(['x'] * 4))
+
+    def test_unknown_variable_fails_only_when_evaluated(self):
+        compiler = RuleCompiler(self._variables)
+        rule = OrRule([Condition('${A}', '1'), Condition('${UNKNOWN}', '1')])
+        predicate = compiler.compile(rule)
+        self.assertTrue(predicate(['1', '0', '0', '0']))
+        self.assertRaises(KeyError, predicate, ['0', '0', '0', '0'])
+
+    def test_uncompilable_rules_use_is_valid(self):
+        predicate = RuleCompiler(self._variables).compile(AndRule([_TrueRule(), Condition('${A}', '1')]))
+        self.assertTrue(predicate(['1', '0', '0', '0']))
+        self.assertFalse(predicate(['0', '0', '0', '0']))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,140 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import functools
+import random
+import re
+import unittest
+from src import robomachine
+from src.robomachine.allpairsstrategy import AllPairsRandomStrategy
+from src.robomachine.duplicates import BloomFilter
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy, ShortestFirstStrategy
+from test.helpers import atest_machine, generate
+from test.variable_test import _LOGIN_MACHINE
+
+_ALIASED_MACHINE = """\
+*** Machine ***
+${A}  any of  x  y
+${B}  any of  ${A}  x  y
+
+Start
+  [Actions]
+    Go  ==>  Middle  when  ${B} == x
+    Stay  ==>  Start
+
+Middle
+  [Actions]
+    Back  ==>  Start
+"""
+
+
+class ShardingTestCase(unittest.TestCase):
+
+    def _tests(self, machine, shard=None, **kwargs):
+        random.seed(3)
+        text = generate(machine, shard=shard, **kwargs)
+        cases = text[text.index('*** Test Cases ***'):text.index('*** Keywords ***')]
+        return dict((test.split('\n', 1)[0], test.rstrip('\n')) for test in re.split(r'\n(?=Test \d+\n)', cases)[1:])
+
+    def _assert_shards_make_whole(self, machine, **kwargs):
+        whole = self._tests(machine, **kwargs)
+        for count in (1, 2, 3, 5):
+            union = {}
+            for index in range(1, count + 1):
+                shard = self._tests(machine, shard=(index, count), **kwargs)
+                self.assertFalse(set(shard) & set(union))
+                union.update(shard)
+            self.assertEqual(whole, union)
+        return whole
+
+    def test_dfs_shards(self):
+        self._assert_shards_make_whole(atest_machine('testingmachine.robomachine'), max_tests=1000, max_actions=4)
+        self._assert_shards_make_whole(robomachine.parse(_LOGIN_MACHINE), max_tests=100, max_actions=2)
+
+    def test_dfs_shards_with_tests_max_and_to_state(self):
+        whole = self._assert_shards_make_whole(atest_machine('infinite.robomachine'), max_tests=40,
+                                               max_actions=2, to_state='State 2')
+        self.assertEqual(40, len(whole))
+        self._assert_shards_make_whole(atest_machine('testingmachine.robomachine'), max_tests=30,
+                                       max_actions=5, to_state='End State')
+
+    def test_dfs_shards_with_duplicate_assignments(self):
+        for max_tests in (3, 4, 5, 100):
+            self._assert_shards_make_whole(robomachine.parse(_ALIASED_MACHINE), max_tests=max_tests, max_actions=2)
+
+    def test_dfs_shards_with_bloom_filter(self):
+        # False positives skip the same tests as in an unsharded run
+        machine = atest_machine('testingmachine.robomachine')
+        bloom = functools.partial(BloomFilter, false_positive_rate=0.5)
+        whole = self._assert_shards_make_whole(machine, max_tests=1000, max_actions=4, duplicate_filter=bloom)
+        self.assertTrue(len(whole) < len(self._tests(machine, max_tests=1000, max_actions=4)))
+
+    def _assert_shards_make_whole_with_repeats(self, machine, **kwargs):
+        # Shards of drawn tests skip only repeats of their own draws
+        whole = self._tests(machine, **kwargs)
+        bodies = set(test.split('\n', 1)[1] for test in whole.values())
+        for count in (1, 2, 3, 5):
+            union = {}
+            for index in range(1, count + 1):
+                union.update(self._tests(machine, shard=(index, count), **kwargs))
+            self.assertEqual(whole, dict((name, union[name]) for name in whole))
+            for name in set(union) - set(whole):
+                self.assertIn(union[name].split('\n', 1)[1], bodies)
+        return whole
+
+    def test_random_shards(self):
+        whole = self._assert_shards_make_whole_with_repeats(atest_machine('testingmachine.robomachine'),
+                                                            max_tests=50, max_actions=4, strategy=RandomStrategy)
+        self.assertTrue(0 < len(whole) < 50)
+
+    def test_allpairs_shards(self):
+        self._assert_shards_make_whole_with_repeats(atest_machine('testingmachine.robomachine'), max_tests=50,
+                                                    max_actions=4, strategy=AllPairsRandomStrategy)
+
+    def test_random_shard_makes_only_its_draws(self):
+        walks = []
+
+        class _Counted(RandomStrategy):
+            def _generate_path(self, values):
+                walks.append(values)
+                return RandomStrategy._generate_path(self, values)
+
+        self._tests(atest_machine('testingmachine.robomachine'), shard=(2, 5), max_tests=50,
+                    max_actions=4, strategy=_Counted)
+        self.assertEqual(10, len(walks))
+
+    def test_shortest_first_shards(self):
+        self._assert_shards_make_whole(atest_machine('testingmachine.robomachine'), max_tests=40,
+                                       max_actions=4, strategy=ShortestFirstStrategy)
+
+    def test_invalid_shard(self):
+        self.assertRaises(AssertionError, self._tests, robomachine.parse(_LOGIN_MACHINE), shard=(3, 2))
+
+    def test_path_counts(self):
+        cyclic = atest_machine('testingmachine.robomachine')
+        acyclic = robomachine.parse(_LOGIN_MACHINE)
+        for machine, max_actions, to_state in ((cyclic, 0, None), (cyclic, 3, None), (cyclic, 4, 'End State'),
+                                               (acyclic, -1, None), (acyclic, -1, 'Error Page')):
+            strategy = DepthFirstSearchStrategy(machine, max_actions, to_state)
+            for values in strategy.assignments():
+                _, paths = strategy.assignment_paths(values)
+                self.assertEqual(sum(1 for _ in paths), strategy.assignment_count(values))
+
+    def test_unlimited_path_count_on_cycle(self):
+        strategy = DepthFirstSearchStrategy(atest_machine('testingmachine.robomachine'), -1)
+        self.assertRaises(AssertionError, strategy.assignment_count, next(iter(strategy.assignments())))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -12,11 +12,16 @@
 #  See the License for the specific language governing permissions and
 #  limitations under the License.
 
+import collections
+import functools
+import itertools
+import random
 import unittest
 from src.robomachine.model import RoboMachine, State, Action, Variable
 from src.robomachine.rules import *
-from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy
-from src.robomachine.allpairsstrategy import AllPairsRandomStrategy
+from src.robomachine.strategies import DepthFirstSearchStrategy, RandomStrategy, ShortestFirstStrategy, \
+    SwitchCoverageStrategy, TransitionTourStrategy
+from src.robomachine.allpairsstrategy import AllPairsRandomStrategy, _RuleConstraints, covering_array
 
 class StrategyTestCase(object):
 
@@ -97,32 +102,353 @@ class StrategyTestCase(object):
 class DepthFirstSearchStrategyTestCase(StrategyTestCase, unittest.TestCase):
     strategy_class = DepthFirstSearchStrategy
 
+    def _cycle(self):
+        return [State('s1', [], [Action('a12', 's2'), Action('a13', 's3')]),
+                State('s2', [], [Action('a21', 's1')]),
+                State('s3', [], [])]
+
+    def test_paths_in_depth_first_order(self):
+        names = [[a.name for a in test] for test, _ in
+                 DepthFirstSearchStrategy(RoboMachine(self._cycle(), [], []), 4).tests()]
+        self.assertEqual([['a12', 'a21', 'a12', 'a21'], ['a12', 'a21', 'a13'], ['a13']], names)
+
+    def test_paths_deeper_than_recursion_limit(self):
+        test, _ = next(DepthFirstSearchStrategy(RoboMachine(self._cycle(), [], []), 5000).tests())
+        self.assertEqual(5000, len(test))
+
+    def test_unlimited_paths_on_cycle(self):
+        tests = DepthFirstSearchStrategy(RoboMachine(self._cycle(), [], []), -1).tests()
+        self.assertRaises(AssertionError, next, tests)
+
+    def _chain(self, length):
+        return [State('c{:d}'.format(i), [], [Action('next', 'c{:d}'.format(i + 1))]) for i in range(length)] + \
+               [State('c{:d}'.format(length), [], [])]
+
+    def test_unlimited_paths_on_deep_acyclic_machine(self):
+        strategy = self.strategy_class(RoboMachine(self._chain(2000), [], []), -1)
+        self.assertEqual([2000], [len(test) for test, _ in strategy.tests()])
+        self.assertEqual([0] * 2000 + [1], strategy.length_counts())
+        self.assertEqual(1, strategy.assignment_count([]))
+
+    def test_unlimited_paths_beside_cycle_not_reaching_to_state(self):
+        states = [State('s1', [], [Action('loop', 's2'), Action('out', 'end')]),
+                  State('s2', [], [Action('back', 's3')]),
+                  State('s3', [], [Action('again', 's2')]),
+                  State('end', [], [])]
+        strategy = self.strategy_class(RoboMachine(states, [], []), -1, 'end')
+        self.assertEqual([['out']], [[a.name for a in test] for test, _ in strategy.tests()])
+        self.assertEqual(1, strategy.assignment_count([]))
+
+class ShortestFirstStrategyTestCase(DepthFirstSearchStrategyTestCase):
+    strategy_class = ShortestFirstStrategy
+
+    def _machine(self):
+        variables = [Variable('${MODE}', ['on', 'off'])]
+        states = [State('s1', [], [Action('a12', 's2'), Action('a13', 's3', Condition('${MODE}', 'on'))]),
+                  State('s2', [], [Action('a21', 's1'), Action('a2end', 'end')]),
+                  State('s3', [], [Action('a31', 's1')]),
+                  State('end', [], [])]
+        return RoboMachine(states, variables, [])
+
+    def _assert_dfs_tests_by_length(self, machine, max_actions, to_state=None):
+        dfs = [(test, values) for test, values in DepthFirstSearchStrategy(machine, max_actions, to_state).tests()]
+        tests = list(ShortestFirstStrategy(machine, max_actions, to_state).tests())
+        self.assertEqual(sorted(dfs, key=lambda test: len(test[0])), tests)
+
+    def test_paths_in_depth_first_order(self):
+        names = [[a.name for a in test] for test, _ in
+                 ShortestFirstStrategy(RoboMachine(self._cycle(), [], []), 4).tests()]
+        self.assertEqual([['a13'], ['a12', 'a21', 'a13'], ['a12', 'a21', 'a12', 'a21']], names)
+
+    def test_paths_deeper_than_recursion_limit(self):
+        test, _ = next(ShortestFirstStrategy(RoboMachine(self._cycle(), [], []), 2000).tests())
+        self.assertEqual(1, len(test))
+
+    def test_depth_first_search_tests_shortest_first(self):
+        machine = self._machine()
+        for max_actions, to_state in ((0, None), (1, None), (3, None), (6, None), (3, 'end'), (6, 's1'), (5, 's3')):
+            self._assert_dfs_tests_by_length(machine, max_actions, to_state)
+        self._assert_dfs_tests_by_length(RoboMachine(self._cycle()[:1] + [State('s2', [], []), State('s3', [], [])],
+                                                     [], []), -1)
+
+    def test_unlimited_paths_on_cycle(self):
+        tests = ShortestFirstStrategy(RoboMachine(self._cycle(), [], []), -1).tests()
+        self.assertRaises(AssertionError, next, tests)
+
+
 class RandomStrategyTestCase(StrategyTestCase, unittest.TestCase):
     strategy_class = RandomStrategy
 
+    def test_walks_only_towards_to_state(self):
+        states = [State('s1', [], [Action('trap', 'trap'), Action('a12', 's2')]),
+                  State('s2', [], [Action('trap', 'trap'), Action('a23', 's3'), Action('a21', 's1')]),
+                  State('s3', [], [Action('a32', 's2')]),
+                  State('trap', [], [Action('loop', 'trap')])]
+        tests = RandomStrategy(RoboMachine(states, [], []), 4, 's3').tests()
+        for _ in range(50):
+            test, _ = next(tests)
+            self.assertFalse('trap' in [a.name for a in test])
+            self.assertEqual('s3', test[-1].next_state.name)
+            self.assertTrue(len(test) <= 4)
+
+    def _rules_machine(self):
+        variables = [Variable('${A}', list('abcd')), Variable('${B}', list('abcd'))]
+        rules = [OrRule([Condition('${A}', 'a'), UnequalCondition('${B}', 'a')])]
+        return RoboMachine([State('s', [], [])], variables, rules)
+
+    def _assert_uniform(self, strategy):
+        random.seed(5)
+        counts = collections.Counter(tuple(strategy._generate_variable_values()) for _ in range(13000))
+        # 13 valid assignments out of 16
+        self.assertEqual(13, len(counts))
+        for count in counts.values():
+            self.assertTrue(850 < count < 1150, counts)
+
+    def test_valid_assignments_are_drawn_uniformly(self):
+        self._assert_uniform(RandomStrategy(self._rules_machine(), 0))
+
+    def test_rejection_sampling_when_too_many_assignments(self):
+        strategy = RandomStrategy(self._rules_machine(), 0)
+        strategy.MAX_INDEXED_ASSIGNMENTS = 4
+        self._assert_uniform(strategy)
+        self.assertEqual((), strategy._valid_assignments)
+
+    def test_unsatisfiable_rules(self):
+        machine = RoboMachine([State('s', [], [])], [Variable('${V}', ['x'])], [Condition('${V}', 'y')])
+        self.assertRaises(AssertionError, next, RandomStrategy(machine, 2).tests())
+
+    def test_unsatisfiable_rules_with_to_state(self):
+        machine = self._guarded_machine()
+        machine.rules.append(Condition('${V}', 'z'))
+        try:
+            next(RandomStrategy(machine, 3, 'c').tests())
+            self.fail('Should raise exception')
+        except AssertionError as error:
+            self.assertEqual('ERROR! No variable values satisfy the rules', str(error))
+
+    def _guarded_machine(self):
+        states = [State('a', [], [Action('ab', 'b'), Action('ac', 'c', Condition('${V}', 'y'))]),
+                  State('b', [], [Action('ba', 'a')]),
+                  State('c', [], [])]
+        return RoboMachine(states, [Variable('${V}', ['x', 'y'])], [])
+
+    def test_unreachable_to_state(self):
+        machine = self._guarded_machine()
+        machine.states[0]._actions.pop()
+        self.assertRaises(AssertionError, next, RandomStrategy(machine, 5, 'c').tests())
+        self.assertRaises(AssertionError, next, RandomStrategy(self._guarded_machine(), 0, 'c').tests())
+
+    def test_draws_only_assignments_reaching_to_state(self):
+        strategy = RandomStrategy(self._guarded_machine(), 3, 'c')
+        for _ in range(20):
+            test, values = next(strategy.tests())
+            self.assertEqual(['y'], values)
+            self.assertEqual('c', test[-1].next_state.name)
+        strategy.MAX_INDEXED_ASSIGNMENTS = 0
+        strategy._valid_assignments = None
+        self.assertEqual([['y']] * 20, [next(strategy.tests())[1] for _ in range(20)])
+
+class UniqueRandomStrategyTestCase(StrategyTestCase, unittest.TestCase):
+    strategy_class = functools.partial(RandomStrategy, unique=True)
+
+    def _machine(self):
+        states = [State('s1', [], [Action('a12', 's2'), Action('a13', 's3')]),
+                  State('s2', [], [Action('a21', 's1'), Action('a23', 's3')]),
+                  State('s3', [], [Action('a31', 's1')])]
+        return RoboMachine(states, [Variable('${V}', ['x', 'y', 'z'])], [UnequalCondition('${V}', 'z')])
+
+    def test_no_duplicates_until_exhausted(self):
+        machine = self._machine()
+        tests = [(tuple(test), tuple(values)) for test, values in self.strategy_class(machine, 4).tests()]
+        # Without a to state the walks are the depth first search paths
+        dfs = [(tuple(test), tuple(values)) for test, values in DepthFirstSearchStrategy(machine, 4).tests()]
+        self.assertEqual(16, len(tests))
+        self.assertEqual(set(dfs), set(tests))
+
+    def test_no_duplicates_until_exhausted_when_too_many_assignments(self):
+        machine = self._machine()
+        strategy = self.strategy_class(machine, 4)
+        strategy.MAX_INDEXED_ASSIGNMENTS = 1
+        tests = [(tuple(test), tuple(values)) for test, values in strategy.tests()]
+        dfs = [(tuple(test), tuple(values)) for test, values in DepthFirstSearchStrategy(machine, 4).tests()]
+        self.assertEqual((), strategy._valid_assignments)
+        self.assertEqual(16, len(tests))
+        self.assertEqual(set(dfs), set(tests))
+
+    def test_no_duplicates_with_to_state(self):
+        tests = [(tuple(test), tuple(values)) for test, values in
+                 self.strategy_class(self._machine(), 4, 's3').tests()]
+        self.assertEqual(len(tests), len(set(tests)))
+        for test, _ in tests:
+            self.assertEqual('s3', test[-1].next_state.name)
+            self.assertTrue(len(test) <= 4)
+
+    def test_unsatisfiable_rules(self):
+        machine = RoboMachine([State('s', [], [])], [Variable('${V}', ['x'])], [Condition('${V}', 'y')])
+        self.assertRaises(AssertionError, next, self.strategy_class(machine, 2).tests())
+
+
+class TransitionTourStrategyTestCase(StrategyTestCase, unittest.TestCase):
+    strategy_class = TransitionTourStrategy
+
+    def _machine(self):
+        variables = [Variable('${MODE}', ['on', 'off', 'broken'])]
+        states = [State('start', [], [Action('toggle', 'middle', Condition('${MODE}', 'on')),
+                                      Action('skip', 'end'),
+                                      Action('fix', 'start', Condition('${MODE}', 'broken'))]),
+                  State('middle', [], [Action('back', 'start'), Action('forward', 'end')]),
+                  State('end', [], [Action('restart', 'start'), Action('dead end', 'trap')]),
+                  State('trap', [], [])]
+        return RoboMachine(states, variables, [])
+
+    def _taken(self, tests):
+        return set(action for test, _ in tests for action in test)
+
+    def test_obeys_to_state(self):
+        states = [State('s1', [], [Action('s1->s2', 's2')]),
+                  State('s2', [], [Action('s2->s1', 's1'), Action('s2->s3', 's3')]),
+                  State('s3', [], [Action('s3->s1', 's1')])]
+        tests = list(TransitionTourStrategy(RoboMachine(states, [], []), 17, 's3').tests())
+        self.assertEqual(set(a for s in states for a in s._actions), self._taken(tests))
+        for test, _ in tests:
+            self.assertEqual('s3', test[-1].next_state.name)
+
+    def test_takes_every_action_dfs_takes(self):
+        machine = self._machine()
+        for max_actions, to_state in ((1, None), (2, None), (3, None), (6, None), (-1, None),
+                                      (3, 'end'), (4, 'start'), (2, 'trap')):
+            tour = list(TransitionTourStrategy(machine, max_actions, to_state).tests())
+            if max_actions < 0:
+                self.assertEqual(set(a for s in machine.states for a in s._actions), self._taken(tour))
+                continue
+            dfs = list(DepthFirstSearchStrategy(machine, max_actions, to_state).tests())
+            self.assertEqual(self._taken(dfs), self._taken(tour))
+            self.assertTrue(len(tour) < len(dfs) or len(dfs) <= 2, (max_actions, to_state, len(tour), len(dfs)))
+            for test, _ in tour:
+                self.assertTrue(len(test) <= max_actions)
+                if to_state:
+                    self.assertEqual(to_state, test[-1].next_state.name if test else 'start')
+
+    def test_tests_use_enabling_assignment(self):
+        for test, values in TransitionTourStrategy(self._machine(), 3).tests():
+            names = [action.name for action in test]
+            if 'toggle' in names:
+                self.assertEqual(['on'], values)
+            if 'fix' in names:
+                self.assertEqual(['broken'], values)
+
+
+class SwitchCoverageStrategyTestCase(TransitionTourStrategyTestCase):
+    strategy_class = SwitchCoverageStrategy
+
+    def _sequences(self, tests, switches):
+        return set(tuple(test[i:i + switches + 1]) for test, _ in tests for i in range(len(test) - switches))
+
+    def test_takes_every_sequence_dfs_takes(self):
+        machine = self._machine()
+        for switches in (0, 1, 2, 3):
+            for max_actions, to_state in ((2, None), (4, None), (6, None), (4, 'end'), (5, 'start')):
+                strategy = SwitchCoverageStrategy(machine, max_actions, to_state, switches)
+                tests = list(strategy.tests())
+                dfs = list(DepthFirstSearchStrategy(machine, max_actions, to_state).tests())
+                self.assertEqual(self._sequences(dfs, switches), self._sequences(tests, switches))
+                self.assertEqual(self._sequences(dfs, switches), strategy.coverable_sequences())
+                self.assertTrue(len(tests) <= len(dfs))
+
+    def test_zero_switches_is_transition_tour(self):
+        machine = self._machine()
+        self.assertEqual(list(TransitionTourStrategy(machine, 5).paths()),
+                         list(SwitchCoverageStrategy(machine, 5, switches=0).paths()))
+
+
 class AllPairsRandomStrategyTestCase(StrategyTestCase, unittest.TestCase):
     strategy_class = AllPairsRandomStrategy
 
-    def test_generates_all_pairs(self):
+    def _machine(self, rules=()):
         variables = [Variable('${A}', list('123')),
                      Variable('${B}', list('456')),
-                     Variable('${C}', list('789'))]
-        tests = list(AllPairsRandomStrategy(RoboMachine([State('s', [], [])], variables, []), 1, 's').tests())
-        self.assertEqual(len(tests), 9)
+                     Variable('${C}', list('789')),
+                     Variable('${D}', list('xy'))]
+        return RoboMachine([State('s', [], [])], variables, list(rules))
+
+    def _combinations(self, machine, strength, rules_are_ok=lambda values: True):
+        # Value combinations of strength variables that some valid
+        # assignment has
+        variables = list(machine.variables)
+        combinations = set()
+        for values in itertools.product(*[v.values for v in variables]):
+            if rules_are_ok(values):
+                for positions in itertools.combinations(range(len(variables)), strength):
+                    combinations.add((positions, tuple(values[p] for p in positions)))
+        return combinations
+
+    def _covered(self, tests, strength):
+        return set((positions, tuple(values[p] for p in positions))
+                   for _, values in tests
+                   for positions in itertools.combinations(range(len(values)), strength))
+
+    def test_generates_all_pairs(self):
+        machine = self._machine()
+        tests = list(AllPairsRandomStrategy(machine, 1, 's').tests())
+        self.assertEqual(self._combinations(machine, 2), self._covered(tests, 2))
+        self.assertTrue(len(tests) < 3 * 3 * 3 * 2)
+
+    def test_higher_strengths(self):
+        machine = self._machine()
+        for strength in (3, 4):
+            tests = list(AllPairsRandomStrategy(machine, 1, 's', strength=strength).tests())
+            self.assertEqual(self._combinations(machine, strength), self._covered(tests, strength))
+        self.assertEqual(54, len(list(AllPairsRandomStrategy(machine, 1, 's', strength=4).tests())))
+
+    def test_invalid_strength(self):
+        self.assertRaises(AssertionError, AllPairsRandomStrategy, self._machine(), 1, 's', strength=5)
 
     def test_obeys_to_state(self):
         # NOT APPLICABLE
         pass
 
-    def test_obeys_rules(self):
-        # NOT APPLICABLE
-        pass
+    def test_rules_are_hard_constraints(self):
+        rules = [OrRule([UnequalCondition('${A}', '1'), UnequalCondition('${B}', '4')]),
+                 EquivalenceRule(Condition('${C}', '7'), Condition('${D}', 'x'))]
+        machine = self._machine(rules)
+        rules_are_ok = lambda values: all(rule.is_valid(value_mapping=dict(zip(['${A}', '${B}', '${C}', '${D}'], values)))
+                                          for rule in rules)
+        for strength in (2, 3):
+            tests = list(AllPairsRandomStrategy(machine, 1, 's', strength=strength).tests())
+            self.assertTrue(all(rules_are_ok(values) for _, values in tests))
+            self.assertEqual(self._combinations(machine, strength, rules_are_ok), self._covered(tests, strength))
 
-    def test_all_pairs_raises_error_if_rules(self):
-        variables = [Variable('${A}', list('123')),
-                     Variable('${B}', list('456'))]
-        rules = [OrRule([UnequalCondition('${A}', '1'), UnequalCondition('${B}', '4')])]
-        self.assertRaises(AssertionError, lambda: AllPairsRandomStrategy(RoboMachine([State('s', [], [])], variables, rules), 1, 's').tests())
+    def test_free_cells_take_random_allowed_values(self):
+        rules = [OrRule([Condition('${A}', '3'), Condition('${B}', '4')]),
+                 EquivalenceRule(Condition('${C}', '7'), Condition('${D}', 'x'))]
+        machine = self._machine(rules)
+        constraints = _RuleConstraints(list(machine.variables), rules)
+        random.seed(3)
+        completions = [constraints.complete([None, None, None, None]) for _ in range(200)]
+        self.assertTrue(all(machine.rules_are_ok(values) for values in completions))
+        for position, variable in enumerate(machine.variables):
+            self.assertEqual(set(variable.values), set(values[position] for values in completions))
+
+    def test_unsatisfiable_rules(self):
+        machine = self._machine([Condition('${A}', '1'), Condition('${A}', '2')])
+        self.assertRaises(AssertionError, lambda: list(AllPairsRandomStrategy(machine, 1, 's').tests()))
+
+
+class CoveringArrayTestCase(unittest.TestCase):
+
+    def _assert_covers(self, rows, sizes, strength):
+        rows = [[0 if value is None else value for value in row] for row in rows]
+        for positions in itertools.combinations(range(len(sizes)), strength):
+            self.assertEqual(set(itertools.product(*[range(sizes[p]) for p in positions])),
+                             set(tuple(row[p] for p in positions) for row in rows))
+
+    def test_covers_every_combination(self):
+        for sizes, strength in (([3, 3, 3], 2), ([2] * 10, 3), ([5, 1, 3, 2, 4], 2), ([3] * 6, 4)):
+            self._assert_covers(covering_array(sizes, strength), sizes, strength)
+
+    def test_fewer_variables_than_strength(self):
+        self.assertEqual([[0], [1]], covering_array([2], 3))
+        self.assertEqual([[]], covering_array([], 2))
 
 if __name__ == '__main__':
     unittest.main()
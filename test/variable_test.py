@@ -17,6 +17,7 @@ try:
 except:
     from io import StringIO
 
+import re
 import unittest
 from src.robomachine import parsing
 from src import robomachine
@@ -229,6 +230,18 @@ class VariableMachineParsingTestCases(unittest.TestCase):
         self.assertEqual('Error Page', m.states[0].actions[0].next_state.name)
 
 
+    def test_circular_variable_references_fail_only_when_taken(self):
+        text = ('*** Machine ***\n${A}  any of  x  ${B}\n${B}  any of  y  ${A}\n\n'
+                '${A} == x  or  ${B} == y\n\nState\n  Log  ${A} ${B}\n')
+        for engine in parsing.ENGINES:
+            out = StringIO()
+            robomachine.generate(parsing.parse(text, engine), output=out)
+            self.assertEqual(['x  y', 'x  x', 'y  y'],
+                             re.findall(r'Set Machine Variables  (.*)\n', out.getvalue()))
+        machine = parsing.parse(text.replace('${A} == x  or  ${B} == y', ''))
+        self.assertRaises(AssertionError, robomachine.generate, machine, output=StringIO())
+
+
 class TestGenerationTestCases(unittest.TestCase):
 
     def test_generate_all_dfs(self):
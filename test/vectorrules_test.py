@@ -0,0 +1,86 @@
+#  Copyright 2011-2012 Mikko Korpela
+#
+#  Licensed under the Apache License, Version 2.0 (the "License");
+#  you may not use this file except in compliance with the License.
+#  You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+#  Unless required by applicable law or agreed to in writing, software
+#  distributed under the License is distributed on an "AS IS" BASIS,
+#  WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#  See the License for the specific language governing permissions and
+#  limitations under the License.
+
+import itertools
+import unittest
+from src.robomachine import vectorrules
+from src.robomachine.model import RoboMachine, State, Variable
+from src.robomachine.rules import (Condition, AndRule, OrRule, NotRule,
+                                   ImplicationRule, EquivalenceRule,
+                                   GreaterThanCondition, RegexCondition,
+                                   RegexNegatedCondition, UnequalCondition)
+from src.robomachine.vectorrules import VectorizedRules
+
+
+def _machine(variables, rules):
+    return RoboMachine([State('start', [], [])], variables, rules)
+
+
+@unittest.skipUnless(vectorrules.numpy, 'NumPy is not installed')
+class VectorizedRulesTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self._variables = [Variable('${A}', ['1', '2', '3', ' 4']),
+                           Variable('${B}', ['foo', 'bar', 'baz']),
+                           Variable('${C}', ['x', 'y']),
+                           Variable('${D}', ['1', '2', '3', '4', '5'])]
+        self._rules = [ImplicationRule(Condition('${A}', '1'), RegexCondition('${B}', '^ba')),
+                       OrRule([UnequalCondition('${C}', 'x'), GreaterThanCondition('${D}', '2')]),
+                       EquivalenceRule(NotRule(Condition('${C}', 'y')),
+                                       AndRule([RegexNegatedCondition('${B}', 'z$'),
+                                                Condition('${D}', '3')]))]
+
+    def _expected(self, machine):
+        return [list(values) for values in itertools.product(*[v.values for v in machine.variables])
+                if machine.rules_are_ok(values)]
+
+    def test_same_assignments_in_same_order_as_rules_are_ok(self):
+        machine = _machine(self._variables, self._rules)
+        for chunk_size in (1, 7, 1000):
+            vectorized = VectorizedRules(machine.variables, machine.rules, chunk_size=chunk_size)
+            self.assertEqual(self._expected(machine), list(vectorized.valid_assignments()))
+
+    def test_valid_indexes_and_count(self):
+        machine = _machine(self._variables, self._rules)
+        vectorized = VectorizedRules(machine.variables, machine.rules, chunk_size=16)
+        indexes = [int(i) for chunk in vectorized.valid_indexes() for i in chunk]
+        product = list(itertools.product(*[v.values for v in machine.variables]))
+        self.assertEqual(self._expected(machine), [list(product[i]) for i in indexes])
+        self.assertEqual(len(indexes), vectorized.count())
+
+    def test_no_rules(self):
+        machine = _machine(self._variables, [])
+        self.assertEqual(4 * 3 * 2 * 5, VectorizedRules(machine.variables, []).count())
+
+    def test_small_products_and_unknown_variables_are_not_vectorized(self):
+        machine = _machine(self._variables, self._rules)
+        self.assertEqual(None, VectorizedRules.create(machine.variables, machine.rules))
+        self.assertTrue(VectorizedRules.create(machine.variables, machine.rules, min_product=1))
+        self.assertEqual(None, VectorizedRules.create(machine.variables, [Condition('${E}', '1')],
+                                                      min_product=1))
+
+
+class VectorizedRulesFallbackTestCase(unittest.TestCase):
+
+    def test_nothing_is_vectorized_without_numpy(self):
+        numpy, vectorrules.numpy = vectorrules.numpy, None
+        try:
+            variables = [Variable(name, [str(i) for i in range(100)]) for name in ('${A}', '${B}')]
+            self.assertEqual(None, VectorizedRules.create(variables, [], min_product=1))
+        finally:
+            vectorrules.numpy = numpy
+
+
+if __name__ == '__main__':
+    unittest.main()